@@ -3,12 +3,21 @@ set -euo pipefail
 
 NOIZ_KEY_FILE="$HOME/.noiz_api_key"
 NOIZ_BASE_URL="https://noiz.ai/v1"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+VOICE_REGISTRY="$SCRIPT_DIR/../../tts/scripts/voice_registry.py"
+# Normalized key and auto-selected voice, so steady-state calls spawn no
+# python and make a single HTTP request.
+SPEAK_CACHE_DIR="${XDG_CACHE_HOME:-$HOME/.cache}/noiz/speak"
+VOICE_CACHE_TTL="${NOIZ_VOICE_CACHE_TTL:-86400}"
 
 usage() {
   cat <<'EOF'
 Usage:
   speak.sh [--preset MODE] [options]   — speak with companion presets
-  speak.sh config [--set-api-key KEY]  — check / set NOIZ_API_KEY
+  speak.sh warmup [--preset MODE]... [--phrases FILE] [--refresh] [voice options]
+                                       — pre-render preset phrases for instant replies
+  speak.sh config [--set-api-key KEY] [--clear-cache]
+                                       — check / set NOIZ_API_KEY, drop cached key/voice
 
 Presets (auto-set emotion + speed; explicit flags override):
   goodnight    gentle, warm, sleepy       (speed 0.85)
@@ -29,6 +38,9 @@ Options:
   --ref-audio FILE       Reference audio for voice cloning (Noiz)
   --backend BACKEND      Force backend: kokoro | noiz
   --lang LANG            Language code
+  --phrases FILE         warmup: phrase list, lines under [preset] headers
+                         (default: preset_phrases.txt next to this script)
+  --refresh              warmup: re-render phrases that are already cached
   -h, --help             Show this help
 
 Examples:
@@ -36,6 +48,7 @@ Examples:
   speak.sh --preset goodnight -t "Sweet dreams~" -o night.wav
   speak.sh --preset comfort -t "I'm here for you." --backend noiz --voice-id abc -o comfort.mp3
   speak.sh -t "Haha nice!" --emo '{"Joy":0.8}' --speed 1.1 -o reply.wav
+  speak.sh warmup --preset goodnight --preset morning --voice-id abc
 EOF
   exit "${1:-0}"
 }
@@ -53,20 +66,90 @@ resolve_preset() {
   esac
 }
 
+# ── Cache ─────────────────────────────────────────────────────────────
+
+now_epoch() {
+  if [[ -n "${EPOCHSECONDS:-}" ]]; then
+    echo "$EPOCHSECONDS"
+  else
+    date +%s
+  fi
+}
+
+ensure_cache_dir() {
+  [[ -d "$SPEAK_CACHE_DIR" ]] || mkdir -p -m 700 "$SPEAK_CACHE_DIR"
+}
+
+# Write a cache file atomically with owner-only permissions.
+write_cache_file() {
+  local path="$1" content="$2" tmp
+  ensure_cache_dir || return 1
+  tmp="$path.$$"
+  (umask 077 && printf '%s\n' "$content" > "$tmp") && mv -f "$tmp" "$path"
+}
+
+clear_cache() {
+  rm -f "$SPEAK_CACHE_DIR/api_key" "$SPEAK_CACHE_DIR/auto_voice"
+}
+
 # ── API key ───────────────────────────────────────────────────────────
 
+# Normalizing either keeps the key as is or base64-encodes it, so the cache
+# only records which, next to a sha256 of the raw key: "<sha256> same|encode".
+# No copy of the key itself is written. Recomputed (one python call) only
+# when the raw key changes.
+_b64_encode() {
+  printf '%s' "$1" | base64 | tr -d '\n'
+}
+
+normalize_api_key_cached() {
+  local raw="$1" raw_hash cached_hash="" mode="" norm cache="$SPEAK_CACHE_DIR/api_key"
+  raw_hash="$(printf '%s' "$raw" | sha256_hex)"
+  if [[ -f "$cache" ]]; then
+    read -r cached_hash mode < "$cache" || true
+    if [[ "$cached_hash" == "$raw_hash" ]]; then
+      case "$mode" in
+        same) printf '%s' "$raw"; return 0 ;;
+        encode) _b64_encode "$raw"; return 0 ;;
+      esac
+    fi
+  fi
+  norm="$(normalize_api_key_base64 "$raw")"
+  mode=""
+  if [[ -n "$norm" && "$norm" == "$raw" ]]; then
+    mode="same"
+  elif [[ -n "$norm" && "$norm" == "$(_b64_encode "$raw")" ]]; then
+    mode="encode"
+  fi
+  [[ -n "$mode" ]] && write_cache_file "$cache" "$raw_hash $mode" 2>/dev/null || true
+  printf '%s' "$norm"
+}
+
+# Memoized per run. Subshells such as $(detect_backend) inherit the flag
+# but cannot set it, so the main script loads the key before calling them.
+_api_key_state=""
+
 load_api_key() {
+  case "$_api_key_state" in
+    ok) return 0 ;;
+    missing) return 1 ;;
+  esac
+  local raw=""
   if [[ -n "${NOIZ_API_KEY:-}" ]]; then
-    NOIZ_API_KEY="$(normalize_api_key_base64 "$NOIZ_API_KEY")"
-    export NOIZ_API_KEY
-    return 0
+    raw="$NOIZ_API_KEY"
+  elif [[ -f "$NOIZ_KEY_FILE" ]]; then
+    raw="$(<"$NOIZ_KEY_FILE")"
+    raw="${raw//[[:space:]]/}"
   fi
-  if [[ -f "$NOIZ_KEY_FILE" ]]; then
-    NOIZ_API_KEY="$(tr -d '[:space:]' < "$NOIZ_KEY_FILE")"
-    NOIZ_API_KEY="$(normalize_api_key_base64 "$NOIZ_API_KEY")"
+  if [[ -n "$raw" ]]; then
+    NOIZ_API_KEY="$(normalize_api_key_cached "$raw")"
     export NOIZ_API_KEY
-    [[ -n "$NOIZ_API_KEY" ]] && return 0
+    if [[ -n "$NOIZ_API_KEY" ]]; then
+      _api_key_state=ok
+      return 0
+    fi
   fi
+  _api_key_state=missing
   return 1
 }
 
@@ -75,6 +158,7 @@ save_api_key() {
   normalized="$(normalize_api_key_base64 "$1")"
   printf '%s' "$normalized" > "$NOIZ_KEY_FILE"
   chmod 600 "$NOIZ_KEY_FILE"
+  clear_cache
 }
 
 normalize_api_key_base64() {
@@ -112,7 +196,11 @@ cmd_config() {
   while [[ $# -gt 0 ]]; do
     case "$1" in
       --set-api-key) set_key="$2"; shift 2 ;;
-      -h|--help) echo "Usage: speak.sh config [--set-api-key KEY]"; exit 0 ;;
+      --clear-cache)
+        clear_cache
+        echo "Cleared cached key and voice in $SPEAK_CACHE_DIR"
+        shift ;;
+      -h|--help) echo "Usage: speak.sh config [--set-api-key KEY] [--clear-cache]"; exit 0 ;;
       *) echo "Unknown option: $1"; exit 1 ;;
     esac
   done
@@ -169,9 +257,39 @@ detect_backend() {
 
 # ── Noiz helpers ──────────────────────────────────────────────────────
 
+# Auto-selected voice cache: "<epoch> <key tag> <voice_id>", valid for
+# VOICE_CACHE_TTL seconds and only for the key it was selected with.
+_key_tag() {
+  local key="$1"
+  echo "${#key}-${key: -6}"
+}
+
+cached_auto_voice() {
+  local api_key="$1" cache="$SPEAK_CACHE_DIR/auto_voice" ts tag vid now
+  [[ -f "$cache" ]] || return 1
+  read -r ts tag vid < "$cache" || true
+  [[ -n "$vid" && "$tag" == "$(_key_tag "$api_key")" && "$ts" =~ ^[0-9]+$ ]] || return 1
+  now="$(now_epoch)"
+  (( now - ts < VOICE_CACHE_TTL )) || return 1
+  echo "$vid"
+}
+
+store_auto_voice() {
+  write_cache_file "$SPEAK_CACHE_DIR/auto_voice" "$(now_epoch) $(_key_tag "$1") $2" 2>/dev/null || true
+}
+
 noiz_auto_select_voice() {
   local api_key="$1"
-  local resp
+  local resp voice_id
+  # Local voice index (tts skill); only syncs from /voices when older than a day.
+  if [[ -f "$VOICE_REGISTRY" ]]; then
+    voice_id="$(NOIZ_API_KEY="$api_key" python3 "$VOICE_REGISTRY" --base-url "$NOIZ_BASE_URL" \
+      auto-select whisper --type built-in 2>/dev/null)" || true
+    if [[ -n "$voice_id" ]]; then
+      echo "$voice_id"
+      return 0
+    fi
+  fi
   resp="$(curl -sS -H "Authorization: ${api_key}" \
     "${NOIZ_BASE_URL}/voices?voice_type=built-in&keyword=whisper&skip=0&limit=1" 2>/dev/null)" || true
   if [[ -z "$resp" ]]; then
@@ -217,14 +335,70 @@ noiz_tts() {
   fi
 }
 
+# ── Phrase cache ──────────────────────────────────────────────────────
+
+# Exact-text renders made by `speak.sh warmup`, keyed by text + render
+# signature. slots/ records, per preset and requested voice, the signature
+# and entries of the last warm-up so changed parameters evict old audio.
+PHRASE_CACHE_DIR="$SPEAK_CACHE_DIR/phrases"
+DEFAULT_PHRASES_FILE="$SCRIPT_DIR/preset_phrases.txt"
+PRESETS=(goodnight morning comfort celebrate chat)
+
+sha256_hex() {
+  local out
+  if command -v sha256sum &>/dev/null; then
+    out="$(sha256sum)"
+  else
+    out="$(shasum -a 256)"
+  fi
+  echo "${out%% *}"
+}
+
+_ref_sig=""
+
+# Everything besides the text that shapes the audio; call after the voice is resolved.
+render_signature() {
+  if [[ -n "$ref_audio" && -z "$_ref_sig" ]]; then
+    _ref_sig="$(sha256_hex < "$ref_audio")"
+  fi
+  printf '%s|%s|%s|%s|%s|%s|%s|%s' \
+    "$detected" "$voice" "$voice_id" "$_ref_sig" "$emo" "$speed" "$lang" "$format"
+}
+
+phrase_path() {
+  echo "$PHRASE_CACHE_DIR/$(printf '%s\n%s' "$1" "$2" | sha256_hex).$format"
+}
+
+# Phrases listed under [preset] in the phrase file, one per line.
+read_phrases() {
+  local want="$1" file="$2" line section=""
+  phrases=()
+  while IFS= read -r line || [[ -n "$line" ]]; do
+    line="${line%$'\r'}"
+    [[ -z "${line//[[:space:]]/}" || "$line" == \#* ]] && continue
+    if [[ "$line" =~ ^\[(.+)\]$ ]]; then
+      section="${BASH_REMATCH[1]}"
+    elif [[ "$section" == "$want" ]]; then
+      phrases+=("$line")
+    fi
+  done < "$file"
+}
+
 # ── Parse arguments ──────────────────────────────────────────────────
 
+mode="speak"
+if [[ "${1:-}" == "warmup" ]]; then
+  mode="warmup"
+  shift
+fi
+
 preset="" text="" text_file="" output="" emo="" speed="" voice="" voice_id=""
-backend="" lang="" format="wav" ref_audio=""
+backend="" lang="" format="wav" ref_audio="" phrases_file="" refresh=""
+presets=()
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
-    --preset)          preset="$2"; shift 2 ;;
+    --preset)          preset="$2"; presets+=("$2"); shift 2 ;;
     -t|--text)         text="$2"; shift 2 ;;
     -f|--text-file)    text_file="$2"; shift 2 ;;
     -o|--output)       output="$2"; shift 2 ;;
@@ -235,30 +409,51 @@ while [[ $# -gt 0 ]]; do
     --ref-audio)       ref_audio="$2"; shift 2 ;;
     --backend)         backend="$2"; shift 2 ;;
     --lang)            lang="$2"; shift 2 ;;
+    --phrases)         phrases_file="$2"; shift 2 ;;
+    --refresh)         refresh=1; shift ;;
     -h|--help)         usage 0 ;;
     *) echo "Unknown option: $1" >&2; usage 1 ;;
   esac
 done
 
-if [[ -z "$output" ]]; then
-  echo "Error: --output (-o) is required." >&2; exit 1
-fi
-if [[ -z "$text" && -z "$text_file" ]]; then
-  echo "Error: --text (-t) or --text-file (-f) is required." >&2; exit 1
+if [[ "$mode" == "speak" ]]; then
+  if [[ -z "$output" ]]; then
+    echo "Error: --output (-o) is required." >&2; exit 1
+  fi
+  if [[ -z "$text" && -z "$text_file" ]]; then
+    echo "Error: --text (-t) or --text-file (-f) is required." >&2; exit 1
+  fi
+else
+  phrases_file="${phrases_file:-$DEFAULT_PHRASES_FILE}"
+  if [[ ! -f "$phrases_file" ]]; then
+    echo "Error: phrase file not found: $phrases_file" >&2; exit 1
+  fi
+  (( ${#presets[@]} )) || presets=("${PRESETS[@]}")
+  for p in "${presets[@]}"; do
+    resolve_preset "$p"
+  done
 fi
 
 # ── Apply preset defaults (explicit flags take precedence) ───────────
 
-if [[ -n "$preset" ]]; then
-  _preset_emo="" _preset_speed=""
-  resolve_preset "$preset"
-  [[ -z "$emo" ]]   && emo="$_preset_emo"
-  [[ -z "$speed" ]] && speed="$_preset_speed"
-fi
-[[ -z "$speed" ]] && speed="1.0"
+explicit_emo="$emo" explicit_speed="$speed"
+apply_preset() {
+  emo="$explicit_emo" speed="$explicit_speed"
+  if [[ -n "$1" ]]; then
+    _preset_emo="" _preset_speed=""
+    resolve_preset "$1"
+    [[ -z "$emo" ]]   && emo="$_preset_emo"
+    [[ -z "$speed" ]] && speed="$_preset_speed"
+  fi
+  [[ -z "$speed" ]] && speed="1.0"
+  return 0
+}
+apply_preset "$preset"
 
 # ── Detect backend ───────────────────────────────────────────────────
 
+# Resolve the key here so detect_backend's subshell reuses the result.
+load_api_key || true
 detected="$(detect_backend "$backend")"
 
 if [[ -z "$detected" ]]; then
@@ -279,44 +474,138 @@ if [[ -n "$text_file" && -z "$text" ]]; then
   text="$(<"$text_file")"
 fi
 
-# ── Kokoro backend ───────────────────────────────────────────────────
+# ── Resolve Noiz voice ───────────────────────────────────────────────
 
-if [[ "$detected" == "kokoro" ]]; then
-  input_path="$(mktemp /tmp/tts_input_XXXXXX.txt)"
-  printf '%s' "$text" > "$input_path"
+requested_voice_id="$voice_id"
+voice_from_cache=""
+api_key=""
 
-  cmd=(kokoro-tts "$input_path" "$output" --format "$format")
-  [[ -n "$voice" ]] && cmd+=(--voice "$voice")
-  [[ -n "$lang" ]]  && cmd+=(--lang "$lang")
-  cmd+=(--speed "$speed")
-
-  "${cmd[@]}"
-  rm -f "$input_path"
-  exit 0
-fi
-
-# ── Noiz backend ─────────────────────────────────────────────────────
-
-load_api_key || true
-api_key="${NOIZ_API_KEY:-}"
-if [[ -z "$api_key" ]]; then
-  echo "Error: NOIZ_API_KEY not configured." >&2
-  echo "  Get your key at https://developers.noiz.ai/api-keys" >&2
-  echo "  Then run: bash skills/characteristic-voice/scripts/speak.sh config --set-api-key YOUR_KEY" >&2
-  exit 1
-fi
-
-if [[ -z "$voice_id" && -z "$ref_audio" ]]; then
+select_voice() {
   echo "[noiz] Auto-selecting voice..." >&2
   voice_id="$(noiz_auto_select_voice "$api_key" || true)"
   if [[ -z "$voice_id" ]]; then
     echo "Error: failed to auto-select a voice. Please pass --voice-id or --ref-audio." >&2
     exit 1
   fi
+  store_auto_voice "$api_key" "$voice_id"
   echo "[noiz] Using voice_id: $voice_id" >&2
+}
+
+if [[ "$detected" == "noiz" ]]; then
+  load_api_key || true
+  api_key="${NOIZ_API_KEY:-}"
+  if [[ -z "$api_key" ]]; then
+    echo "Error: NOIZ_API_KEY not configured." >&2
+    echo "  Get your key at https://developers.noiz.ai/api-keys" >&2
+    echo "  Then run: bash skills/characteristic-voice/scripts/speak.sh config --set-api-key YOUR_KEY" >&2
+    exit 1
+  fi
+
+  if [[ -z "$voice_id" && -z "$ref_audio" ]]; then
+    if voice_id="$(cached_auto_voice "$api_key")"; then
+      voice_from_cache=1
+    else
+      select_voice
+    fi
+  fi
 fi
 
-noiz_tts "$api_key" "$text" "$voice_id" "$output" \
-  "$speed" "$emo" "$lang" "$ref_audio"
+# ── Render ───────────────────────────────────────────────────────────
+
+render_text() {
+  local text="$1" output="$2"
+  if [[ "$detected" == "kokoro" ]]; then
+    local input_path status=0
+    input_path="$(mktemp /tmp/tts_input_XXXXXX.txt)"
+    printf '%s' "$text" > "$input_path"
+
+    local cmd=(kokoro-tts "$input_path" "$output" --format "$format")
+    [[ -n "$voice" ]] && cmd+=(--voice "$voice")
+    [[ -n "$lang" ]]  && cmd+=(--lang "$lang")
+    cmd+=(--speed "$speed")
+
+    "${cmd[@]}" || status=$?
+    rm -f "$input_path"
+    return "$status"
+  fi
+
+  if noiz_tts "$api_key" "$text" "$voice_id" "$output" \
+      "$speed" "$emo" "$lang" "$ref_audio"; then
+    return 0
+  fi
+  # A cached voice may have been withdrawn since it was selected.
+  [[ -n "$voice_from_cache" ]] || return 1
+  echo "[noiz] Cached voice_id $voice_id failed; selecting again." >&2
+  voice_from_cache=""
+  rm -f "$SPEAK_CACHE_DIR/auto_voice"
+  select_voice
+  noiz_tts "$api_key" "$text" "$voice_id" "$output" \
+    "$speed" "$emo" "$lang" "$ref_audio"
+}
+
+# ── Warm-up: pre-render preset phrases ──────────────────────────────
+
+if [[ "$mode" == "warmup" ]]; then
+  mkdir -p -m 700 "$PHRASE_CACHE_DIR/slots"
+  failed=0
+  for p in "${presets[@]}"; do
+    apply_preset "$p"
+    read_phrases "$p" "$phrases_file"
+    sig="$(render_signature)"
+    slot="$PHRASE_CACHE_DIR/slots/$(printf '%s|%s|%s|%s|%s|%s' \
+      "$p" "$detected" "$voice" "${requested_voice_id:-auto}" "$ref_audio" "$lang" | sha256_hex)"
+
+    # Newline-delimited entry list (no associative arrays in bash 3.2).
+    wanted=$'\n'
+    for phrase in ${phrases[@]+"${phrases[@]}"}; do
+      wanted+="$(phrase_path "$sig" "$phrase")"$'\n'
+    done
+
+    evicted=0
+    if [[ -f "$slot" ]]; then
+      old_sig=""
+      { IFS= read -r old_sig; while IFS= read -r entry; do
+          if [[ "$old_sig" != "$sig" || "$wanted" != *$'\n'"$entry"$'\n'* ]] && [[ -f "$entry" ]]; then
+            rm -f "$entry"
+            evicted=$((evicted + 1))
+          fi
+        done; } < "$slot"
+    fi
+
+    rendered=0 reused=0
+    for phrase in ${phrases[@]+"${phrases[@]}"}; do
+      path="$(phrase_path "$sig" "$phrase")"
+      if [[ -f "$path" && -z "$refresh" ]]; then
+        reused=$((reused + 1))
+        continue
+      fi
+      if render_text "$phrase" "$path.tmp"; then
+        mv -f "$path.tmp" "$path"
+        rendered=$((rendered + 1))
+      else
+        rm -f "$path.tmp"
+        echo "[warmup] $p: failed to render: $phrase" >&2
+        failed=$((failed + 1))
+      fi
+    done
+
+    { printf '%s\n' "$sig"; printf '%s' "${wanted#$'\n'}"; } > "$slot"
+    echo "[warmup] $p: ${#phrases[@]} phrases ($rendered rendered, $reused cached, $evicted evicted)" >&2
+  done
+  (( failed == 0 )) || exit 1
+  exit 0
+fi
+
+# ── Speak ────────────────────────────────────────────────────────────
+
+if [[ -d "$PHRASE_CACHE_DIR" ]]; then
+  cached_phrase="$(phrase_path "$(render_signature)" "$text")"
+  if [[ -f "$cached_phrase" ]]; then
+    cp "$cached_phrase" "$output"
+    echo "Done. Output: $output (phrase cache)" >&2
+    exit 0
+  fi
+fi
 
+render_text "$text" "$output"
 echo "Done. Output: $output" >&2
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark find_best_window against the original full-scan search.
+
+Generates a synthetic subtitle track (lecture-like cue lengths and gaps,
+plus some overlapping and zero-length cues), runs both searches and checks
+that they return exactly the same window and score.
+
+    python3 skills/chat-with-anyone/scripts/bench_extract_ref_segment.py --cues 4000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from extract_ref_segment import find_best_window, score_window  # noqa: E402
+
+
+def full_scan(
+    segments: List[Tuple[float, float, str]],
+    min_dur: float = 3.0,
+    max_dur: float = 12.0,
+    step: float = 0.5,
+) -> Tuple[float, float, float]:
+    """The original search: score_window over every segment for every window."""
+    timeline_end = max(e for _, e, _ in segments)
+    best = (0.0, min_dur, -1.0)
+    for dur in [8.0, 6.0, 10.0, 5.0, 4.0, 12.0, 3.0]:
+        if dur < min_dur or dur > max_dur:
+            continue
+        t = 0.0
+        while t + dur <= timeline_end + step:
+            sc = score_window(segments, t, t + dur)
+            if sc > best[2]:
+                best = (t, t + dur, sc)
+            t += step
+    return best
+
+
+def synthetic_srt(n: int, seed: int) -> List[Tuple[float, float, str]]:
+    rng = random.Random(seed)
+    segments = []
+    t = rng.uniform(0.0, 3.0)
+    for i in range(n):
+        dur = round(rng.uniform(0.4, 6.0), 3)
+        if rng.random() < 0.02:
+            dur = 0.0
+        segments.append((t, t + dur, f"cue {i}"))
+        overlap = rng.random() < 0.05
+        t += dur + (-rng.uniform(0.0, 0.5) if overlap else round(rng.expovariate(1.5), 3))
+    return segments
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cues", type=int, default=4000)
+    ap.add_argument("--step", type=float, default=0.5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--skip-full-scan", action="store_true",
+                    help="Only time the indexed search (full scan can take minutes)")
+    args = ap.parse_args()
+
+    segments = synthetic_srt(args.cues, args.seed)
+    print(f"{len(segments)} cues, timeline {segments[-1][1] / 3600:.2f} h, step {args.step}s")
+
+    t0 = time.perf_counter()
+    fast = find_best_window(segments, step=args.step)
+    fast_sec = time.perf_counter() - t0
+    print(f"indexed search : {fast_sec:8.3f}s  -> {fast}")
+    if args.skip_full_scan:
+        return 0
+
+    t0 = time.perf_counter()
+    slow = full_scan(segments, step=args.step)
+    slow_sec = time.perf_counter() - t0
+    print(f"full scan      : {slow_sec:8.3f}s  -> {slow}")
+    print(f"speedup        : {slow_sec / fast_sec:8.1f}x")
+    if fast != slow:
+        print("MISMATCH between indexed search and full scan", file=sys.stderr)
+        return 1
+    print("results identical")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
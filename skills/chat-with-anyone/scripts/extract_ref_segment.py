@@ -3,49 +3,40 @@
 
 Parses the SRT, scores sliding windows by speech density and continuity,
 extracts the best window as a mono 24 kHz WAV via ffmpeg.
+
+With --audio-aware the audio is also decoded once and analysed frame by
+frame (RMS energy, spectral flatness, a simple VAD; requires NumPy), so
+windows full of music, noise or clipping lose to clean speech.
 """
 import argparse
+import hashlib
+import json
+import os
 import re
 import subprocess
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-SRT_TS_RE = re.compile(
-    r"(\d{2}):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2})[,.](\d{3})"
-)
+TTS_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "tts" / "scripts"
+if str(TTS_SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TTS_SCRIPTS_DIR))
 
+from srt_cues import iter_srt, open_srt  # noqa: E402
 
-def ts_to_seconds(h: str, m: str, s: str, ms: str) -> float:
-    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
+TAG_RE = re.compile(r"<[^>]+>")
 
 
 def parse_srt(path: str) -> List[Tuple[float, float, str]]:
     """Return list of (start_sec, end_sec, text) from an SRT file."""
-    text = Path(path).read_text(encoding="utf-8", errors="replace")
     segments: List[Tuple[float, float, str]] = []
-    blocks = re.split(r"\n\s*\n", text.strip())
-    for block in blocks:
-        lines = block.strip().splitlines()
-        if len(lines) < 2:
-            continue
-        m = SRT_TS_RE.search(lines[0] if SRT_TS_RE.search(lines[0]) else lines[1] if len(lines) > 1 else "")
-        if not m:
-            for line in lines:
-                m = SRT_TS_RE.search(line)
-                if m:
-                    break
-        if not m:
-            continue
-        start = ts_to_seconds(m.group(1), m.group(2), m.group(3), m.group(4))
-        end = ts_to_seconds(m.group(5), m.group(6), m.group(7), m.group(8))
-        ts_line_idx = next(
-            i for i, l in enumerate(lines) if SRT_TS_RE.search(l)
-        )
-        content = " ".join(lines[ts_line_idx + 1 :]).strip()
-        content = re.sub(r"<[^>]+>", "", content)
-        if content:
-            segments.append((start, end, content))
+    with open_srt(path) as f:
+        for _, start_ms, end_ms, text in iter_srt(f):
+            content = TAG_RE.sub("", text.replace("\n", " ")).strip()
+            if content:
+                segments.append((start_ms / 1000.0, end_ms / 1000.0, content))
     return segments
 
 
@@ -72,6 +63,11 @@ def score_window(
         if overlap_end > overlap_start:
             included.append((overlap_start, overlap_end, txt))
 
+    return _score_included(included, win_dur)
+
+
+def _score_included(included: List[Tuple[float, float, str]], win_dur: float) -> float:
+    """Score the clipped segments of one window, in subtitle-file order."""
     if not included:
         return -1.0
 
@@ -91,32 +87,255 @@ def score_window(
     return density * 0.5 + continuity * 0.3 + seg_quality * 0.2
 
 
-def find_best_window(
+class SegmentIndex:
+    """Subtitle segments sorted by start, for fast window lookups.
+
+    ``max_end[i]`` is the largest end time among the first ``i + 1`` sorted
+    segments, so every segment that can overlap a window starting at
+    ``win_start`` lies at or after the first ``i`` with ``max_end[i] > win_start``.
+    Zero-length segments never overlap a window and are dropped.
+    """
+
+    def __init__(self, segments: List[Tuple[float, float, str]]) -> None:
+        kept = [i for i, (s, e, _) in enumerate(segments) if e > s]
+        self.segments = segments
+        self.order = sorted(kept, key=lambda i: segments[i][0])
+        self.in_file_order = self.order == kept
+        self.starts = [segments[i][0] for i in self.order]
+        self.max_end: List[float] = []
+        running = float("-inf")
+        for i in self.order:
+            running = max(running, segments[i][1])
+            self.max_end.append(running)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def included(self, lo: int, hi: int, win_start: float, win_end: float) -> List[Tuple[float, float, str]]:
+        """Clip candidates ``order[lo:hi]`` to the window, in subtitle-file order."""
+        idxs = self.order[lo:hi]
+        if not self.in_file_order:
+            idxs = sorted(idxs)
+        included = []
+        for i in idxs:
+            s, e, txt = self.segments[i]
+            overlap_start = max(s, win_start)
+            overlap_end = min(e, win_end)
+            if overlap_end > overlap_start:
+                included.append((overlap_start, overlap_end, txt))
+        return included
+
+
+SIGNAL_SAMPLE_RATE = 16000
+SIGNAL_FRAME_MS = 25
+
+
+class SignalMetrics:
+    """Frame-level signal statistics with prefix sums for O(1) window scores.
+
+    Frames are non-overlapping ``SIGNAL_FRAME_MS`` blocks of 16 kHz mono
+    audio. A frame counts as voiced when it is loud (10 dB above the
+    recording's noise floor, or above -30 dBFS) and its spectrum is not
+    noise-like (low spectral flatness). Window score, all parts in [0, 1]:
+
+    - vad: fraction of voiced frames; 70% or more counts as fully active,
+      since natural speech pauses between phrases
+    - clean: 1 - mean spectral flatness of the voiced frames
+    - modulation: energy spread in dB / 12 (speech pauses between words and
+      syllables, music and steady noise mostly do not)
+
+    ``score = (0.4 * activity + 0.3 * clean + 0.3 * modulation) * (1 - clipped)``
+    """
+
+    FLATNESS_MAX = 0.4
+    NOISE_FLOOR_MARGIN_DB = 10.0
+    MIN_SPEECH_DB = -50.0
+    LOUD_DB = -30.0
+    ACTIVE_VAD = 0.7
+
+    def __init__(self, rms_db: Any, flatness: Any, clipped: Any, frame_ms: int = SIGNAL_FRAME_MS) -> None:
+        import numpy as np
+
+        self.frame_ms = frame_ms
+        self.n_frames = len(rms_db)
+        floor = float(np.percentile(rms_db, 10)) if self.n_frames else 0.0
+        threshold = min(max(floor + self.NOISE_FLOOR_MARGIN_DB, self.MIN_SPEECH_DB), self.LOUD_DB)
+        voiced = (rms_db > threshold) & (flatness < self.FLATNESS_MAX)
+
+        def prefix(values: Any) -> Any:
+            return np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+
+        self._voiced = prefix(voiced)
+        self._flat_voiced = prefix(np.where(voiced, flatness, 0.0))
+        self._db = prefix(rms_db)
+        self._db_sq = prefix(np.square(rms_db, dtype=np.float64))
+        self._clipped = prefix(clipped)
+
+    @classmethod
+    def from_audio(cls, path: str, frame_ms: int = SIGNAL_FRAME_MS, block_frames: int = 4000) -> "SignalMetrics":
+        """Decode ``path`` once through an ffmpeg pipe, ``block_frames`` frames at a time."""
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError(
+                "--audio-aware needs NumPy. Install it with: uv pip install numpy"
+            ) from None
+
+        frame_len = SIGNAL_SAMPLE_RATE * frame_ms // 1000
+        window = np.hanning(frame_len).astype(np.float32)
+        cmd = [
+            "ffmpeg", "-v", "error", "-i", path, "-vn",
+            "-f", "s16le", "-ac", "1", "-ar", str(SIGNAL_SAMPLE_RATE), "pipe:1",
+        ]
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg not found on PATH") from None
+        rms_parts, flat_parts, clip_parts = [], [], []
+        block_bytes = block_frames * frame_len * 2
+        try:
+            assert proc.stdout is not None
+            while True:
+                data = proc.stdout.read(block_bytes)
+                k = len(data) // (frame_len * 2)
+                if k == 0:
+                    break
+                frames = np.frombuffer(data[: k * frame_len * 2], dtype="<i2").reshape(k, frame_len)
+                x = frames.astype(np.float32) / 32768.0
+                rms = np.sqrt(np.mean(np.square(x), axis=1))
+                rms_parts.append(20.0 * np.log10(np.maximum(rms, 1e-3)))  # floor at -60 dBFS
+                power = np.square(np.abs(np.fft.rfft(x * window, axis=1))) + 1e-12
+                flat_parts.append(np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1))
+                clip_parts.append(np.max(np.abs(frames.astype(np.int32)), axis=1) >= 32700)
+                if len(data) < block_bytes:
+                    break
+        finally:
+            if proc.stdout is not None:
+                proc.stdout.close()
+            stderr = proc.stderr.read().decode("utf-8", "replace") if proc.stderr else ""
+            proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path} (exit {proc.returncode}):\n{stderr}")
+        if not rms_parts:
+            raise RuntimeError(f"No audio decoded from {path}")
+        return cls(
+            np.concatenate(rms_parts), np.concatenate(flat_parts), np.concatenate(clip_parts),
+            frame_ms,
+        )
+
+    @property
+    def duration(self) -> float:
+        return self.n_frames * self.frame_ms / 1000.0
+
+    def window_metrics(self, start: float, end: float) -> Dict[str, float]:
+        a = min(max(int(start * 1000 / self.frame_ms), 0), self.n_frames)
+        b = min(max(int(end * 1000 / self.frame_ms), a), self.n_frames)
+        n = b - a
+        if n == 0:
+            return {"vad": 0.0, "clean": 0.0, "modulation": 0.0, "clipped": 0.0, "score": 0.0}
+        voiced = float(self._voiced[b] - self._voiced[a])
+        vad = voiced / n
+        clean = 1.0 - float(self._flat_voiced[b] - self._flat_voiced[a]) / voiced if voiced else 0.0
+        mean_db = float(self._db[b] - self._db[a]) / n
+        var_db = max(float(self._db_sq[b] - self._db_sq[a]) / n - mean_db * mean_db, 0.0)
+        modulation = min(var_db ** 0.5 / 12.0, 1.0)
+        clipped = float(self._clipped[b] - self._clipped[a]) / n
+        activity = min(vad / self.ACTIVE_VAD, 1.0)
+        score = (0.4 * activity + 0.3 * clean + 0.3 * modulation) * (1.0 - clipped)
+        return {"vad": vad, "clean": clean, "modulation": modulation, "clipped": clipped, "score": score}
+
+    def window_score(self, start: float, end: float) -> float:
+        return self.window_metrics(start, end)["score"]
+
+
+def iter_window_scores(
     segments: List[Tuple[float, float, str]],
     min_dur: float = 3.0,
     max_dur: float = 12.0,
     step: float = 0.5,
-) -> Tuple[float, float, float]:
-    """Find the best (start, end, score) window in the subtitle timeline."""
+    signal: Optional[SignalMetrics] = None,
+    signal_weight: float = 0.4,
+) -> Iterator[Tuple[float, float, float]]:
+    """Yield (start, end, score) for every window that overlaps a subtitle.
+
+    With ``signal``, each window's subtitle score is blended with its signal
+    score: ``(1 - signal_weight) * subtitle + signal_weight * signal``.
+    """
     if not segments:
-        return (0.0, 0.0, -1.0)
+        return
 
     timeline_end = max(e for _, e, _ in segments)
-    best = (0.0, min_dur, -1.0)
+    index = SegmentIndex(segments)
+    n = len(index)
 
     for dur in [8.0, 6.0, 10.0, 5.0, 4.0, 12.0, 3.0]:
         if dur < min_dur or dur > max_dur:
             continue
+        # Window bounds only move forward, so both pointers sweep once per
+        # duration: [lo, hi) holds every segment that can overlap the window.
+        lo = hi = 0
         t = 0.0
         while t + dur <= timeline_end + step:
-            sc = score_window(segments, t, t + dur)
-            if sc > best[2]:
-                best = (t, t + dur, sc)
+            win_end = t + dur
+            while hi < n and index.starts[hi] < win_end:
+                hi += 1
+            while lo < hi and index.max_end[lo] <= t:
+                lo += 1
+            if lo < hi:
+                sc = _score_included(index.included(lo, hi, t, win_end), win_end - t)
+                if signal is not None and sc >= 0:
+                    sc = (1.0 - signal_weight) * sc + signal_weight * signal.window_score(t, win_end)
+                yield (t, win_end, sc)
             t += step
 
+
+def find_best_window(
+    segments: List[Tuple[float, float, str]],
+    min_dur: float = 3.0,
+    max_dur: float = 12.0,
+    step: float = 0.5,
+    signal: Optional[SignalMetrics] = None,
+    signal_weight: float = 0.4,
+) -> Tuple[float, float, float]:
+    """Find the best (start, end, score) window in the subtitle timeline."""
+    if not segments:
+        return (0.0, 0.0, -1.0)
+
+    best = (0.0, min_dur, -1.0)
+    for window in iter_window_scores(segments, min_dur, max_dur, step, signal, signal_weight):
+        if window[2] > best[2]:
+            best = window
     return best
 
 
+def find_top_windows(
+    segments: List[Tuple[float, float, str]],
+    k: int,
+    min_dur: float = 3.0,
+    max_dur: float = 12.0,
+    step: float = 0.5,
+    signal: Optional[SignalMetrics] = None,
+    signal_weight: float = 0.4,
+) -> List[Tuple[float, float, float]]:
+    """Return up to ``k`` non-overlapping windows, best first.
+
+    Windows are taken greedily by score; ties keep search order, so the
+    first result is the same window ``find_best_window`` returns.
+    """
+    windows = [
+        w for w in iter_window_scores(segments, min_dur, max_dur, step, signal, signal_weight)
+        if w[2] >= 0
+    ]
+    windows.sort(key=lambda w: w[2], reverse=True)
+    picked: List[Tuple[float, float, float]] = []
+    for start, end, sc in windows:
+        if all(end <= ps or start >= pe for ps, pe, _ in picked):
+            picked.append((start, end, sc))
+            if len(picked) == k:
+                break
+    return picked
+
+
 def seconds_to_ffmpeg_ts(sec: float) -> str:
     h = int(sec // 3600)
     m = int((sec % 3600) // 60)
@@ -124,6 +343,38 @@ def seconds_to_ffmpeg_ts(sec: float) -> str:
     return f"{h:02d}:{m:02d}:{s:06.3f}"
 
 
+def extract_segments(
+    input_path: str,
+    clips: List[Tuple[float, float, str]],
+) -> None:
+    """Extract (start, end, output_path) clips as mono 24 kHz 16-bit PCM WAVs.
+
+    All clips come from one ffmpeg run: each clip is a separate input that
+    seeks before opening (``-ss``/``-t`` ahead of ``-i``), so ffmpeg jumps
+    straight to the clip instead of decoding the file from the start.
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    for start, end, _ in clips:
+        cmd += [
+            "-ss", seconds_to_ffmpeg_ts(start),
+            "-t", f"{end - start:.3f}",
+            "-i", input_path,
+        ]
+    for i, (_, _, output_path) in enumerate(clips):
+        cmd += [
+            "-map", f"{i}:a:0",
+            "-c:a", "pcm_s16le",
+            "-ar", "24000",
+            "-ac", "1",
+            output_path,
+        ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed (exit {result.returncode}):\n{result.stderr}"
+        )
+
+
 def extract_audio(
     input_path: str,
     output_path: str,
@@ -131,21 +382,218 @@ def extract_audio(
     end: float,
 ) -> None:
     """Extract a segment as mono 24 kHz 16-bit PCM WAV using ffmpeg."""
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", input_path,
-        "-ss", seconds_to_ffmpeg_ts(start),
-        "-to", seconds_to_ffmpeg_ts(end),
-        "-c:a", "pcm_s16le",
-        "-ar", "24000",
-        "-ac", "1",
-        output_path,
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"ffmpeg failed (exit {result.returncode}):\n{result.stderr}"
+    extract_segments(input_path, [(start, end, output_path)])
+
+
+def candidate_path(out_path: Path, rank: int, k: int) -> Path:
+    """Output path of the ``rank``-th clip: ``out_path`` itself when k == 1."""
+    if k == 1:
+        return out_path
+    return out_path.with_name(f"{out_path.stem}_{rank}{out_path.suffix}")
+
+
+MEDIA_EXTENSIONS = {
+    ".mp3", ".m4a", ".aac", ".wav", ".flac", ".ogg", ".opus", ".webm",
+    ".mp4", ".mkv", ".mov", ".avi",
+}
+
+
+def discover_pairs(directory: Path, out_dir: Path) -> List[Dict[str, str]]:
+    """Pair each media file with an SRT named after it.
+
+    ``talk.srt`` is preferred; otherwise the first ``talk.<lang>.srt``
+    (yt-dlp naming) in sorted order is used. Media without subtitles are
+    skipped, and so are clips written by an earlier run (listed in a
+    ``.src.json`` stamp), for when ``out_dir`` is ``directory``.
+    """
+    srts = sorted(p for p in directory.iterdir() if p.suffix.lower() == ".srt")
+    generated = set()
+    for stamp in directory.glob("*.src.json"):
+        generated.add(stamp.with_name(stamp.name[:-len(".src.json")]).resolve())
+        try:
+            previous = json.loads(stamp.read_text(encoding="utf-8"))
+            generated.update(
+                (directory / Path(c["file"]).name).resolve()
+                for c in previous["result"]["candidates"]
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    pairs = []
+    for media in sorted(directory.iterdir()):
+        if media.suffix.lower() not in MEDIA_EXTENSIONS or not media.is_file():
+            continue
+        if media.resolve() in generated:
+            continue
+        exact = media.with_suffix(".srt")
+        if exact.exists():
+            srt = exact
+        else:
+            matches = [p for p in srts if p.name.startswith(media.stem + ".")]
+            if not matches:
+                continue
+            srt = matches[0]
+        pairs.append({
+            "audio": str(media),
+            "srt": str(srt),
+            "output": str(out_dir / f"{media.stem}.wav"),
+        })
+    return pairs
+
+
+def load_manifest(path: Path, out_dir: Path) -> List[Dict[str, str]]:
+    """Read a JSON list of {"audio", "srt", "output"?} entries.
+
+    Relative paths resolve against the manifest's directory; a missing
+    ``output`` defaults to ``<out_dir>/<audio stem>.wav``.
+    """
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(entries, list):
+        raise ValueError("manifest must be a JSON list")
+    base = path.parent
+    pairs = []
+    for i, entry in enumerate(entries):
+        if "audio" not in entry or "srt" not in entry:
+            raise ValueError(f"manifest entry {i} needs 'audio' and 'srt'")
+        audio = base / entry["audio"]
+        output = (base / entry["output"]) if entry.get("output") else out_dir / f"{audio.stem}.wav"
+        pairs.append({"audio": str(audio), "srt": str(base / entry["srt"]), "output": str(output)})
+    return pairs
+
+
+def _stamp_path(output: Path) -> Path:
+    return output.with_name(output.name + ".src.json")
+
+
+def _source_stamp(pair: Dict[str, str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Inputs that determine an output: SRT content, media size/mtime, options."""
+    audio = os.stat(pair["audio"])
+    return {
+        "srt_sha256": hashlib.sha256(Path(pair["srt"]).read_bytes()).hexdigest(),
+        "audio_size": audio.st_size,
+        "audio_mtime_ns": audio.st_mtime_ns,
+        "options": options,
+    }
+
+
+def process_pair(pair: Dict[str, str], options: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+    """Parse, search and extract one media + SRT pair. Runs in a worker process."""
+    t0 = time.monotonic()
+    result: Dict[str, Any] = dict(pair)
+    try:
+        out_path = Path(pair["output"])
+        k = options["top_k"] or 1
+        stamp = _source_stamp(pair, options)
+        outputs = [candidate_path(out_path, rank, k) for rank in range(1, k + 1)]
+        stamp_path = _stamp_path(out_path)
+        if not force and stamp_path.exists():
+            previous = json.loads(stamp_path.read_text(encoding="utf-8"))
+            written = previous.get("result", {}).get("candidates") or []
+            # Every clip the stamp lists must still be there.
+            if (previous.get("source") == stamp and written
+                    and all(Path(c["file"]).exists() for c in written)):
+                result.update(previous["result"], status="up-to-date")
+                return result
+
+        segments = parse_srt(pair["srt"])
+        if not segments:
+            raise RuntimeError("no subtitle segments found")
+        signal = SignalMetrics.from_audio(pair["audio"]) if options["audio_aware"] else None
+        windows = find_top_windows(
+            segments, k,
+            min_dur=options["min_duration"],
+            max_dur=options["max_duration"],
+            step=options["step"],
+            signal=signal,
+            signal_weight=options["signal_weight"],
+        )
+        if not windows:
+            raise RuntimeError("could not find a suitable speech window")
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        clips = [(start, end, str(outputs[i])) for i, (start, end, _) in enumerate(windows)]
+        # No stamp until every clip is written, so an interrupted run redoes the pair.
+        stamp_path.unlink(missing_ok=True)
+        extract_segments(pair["audio"], clips)
+        found = {
+            "candidates": [
+                {"rank": i + 1, "start": round(start, 3), "end": round(end, 3),
+                 "score": round(score, 4), "file": clips[i][2]}
+                for i, (start, end, score) in enumerate(windows)
+            ],
+        }
+        stamp_path.write_text(
+            json.dumps({"source": stamp, "result": found}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
         )
+        result.update(found, status="done")
+    except Exception as exc:
+        result.update(status="failed", error=str(exc))
+    result["elapsed_sec"] = round(time.monotonic() - t0, 2)
+    return result
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    source = Path(args.batch)
+    out_dir = Path(args.output)
+    try:
+        if source.is_dir():
+            pairs = discover_pairs(source, out_dir)
+        elif source.exists():
+            pairs = load_manifest(source, out_dir)
+        else:
+            print(f"Error: batch source not found: {source}", file=sys.stderr)
+            return 1
+    except ValueError as exc:
+        print(f"Error: invalid manifest {source}: {exc}", file=sys.stderr)
+        return 1
+    if not pairs:
+        print(f"Error: no media + SRT pairs found in {source}", file=sys.stderr)
+        return 1
+
+    options = {
+        "min_duration": args.min_duration,
+        "max_duration": args.max_duration,
+        "step": args.step,
+        "audio_aware": args.audio_aware,
+        "signal_weight": args.signal_weight,
+        "top_k": args.top_k,
+    }
+    jobs = args.jobs or os.cpu_count() or 1
+    print(f"Processing {len(pairs)} pairs with {jobs} worker processes.")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+    finished = 0
+    t0 = time.monotonic()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(process_pair, pair, options, args.force): i
+            for i, pair in enumerate(pairs)
+        }
+        for fut in as_completed(futures):
+            res = fut.result()
+            results[futures[fut]] = res
+            finished += 1
+            detail = res.get("error") or ", ".join(
+                f"{c['start']:.1f}-{c['end']:.1f}s" for c in res.get("candidates", [])
+            )
+            print(f"[{finished}/{len(pairs)}] {res['status']}: {Path(res['audio']).name} ({detail})")
+
+    counts = {status: sum(1 for r in results if r and r["status"] == status)
+              for status in ("done", "up-to-date", "failed")}
+    results_path = out_dir / "results.json"
+    results_path.write_text(
+        json.dumps({
+            "source": str(source),
+            "options": options,
+            "elapsed_sec": round(time.monotonic() - t0, 2),
+            "counts": counts,
+            "results": results,
+        }, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    print(f"Done: {counts['done']} extracted, {counts['up-to-date']} up to date, "
+          f"{counts['failed']} failed. Results: {results_path}")
+    return 1 if counts["failed"] else 0
 
 
 def main() -> int:
@@ -153,16 +601,29 @@ def main() -> int:
         description="Extract the best voice-reference segment from audio + SRT subtitles."
     )
     parser.add_argument(
-        "--srt", required=True,
+        "--srt",
         help="Path to SRT subtitle file",
     )
     parser.add_argument(
-        "--audio", required=True,
+        "--audio",
         help="Path to audio/video file (mp3, m4a, mp4, etc.)",
     )
     parser.add_argument(
         "-o", "--output", required=True,
-        help="Output WAV file path",
+        help="Output WAV file path (with --batch: output directory)",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Directory of media + SRT files, or a JSON manifest of "
+             '[{"audio": ..., "srt": ..., "output": ...}] entries',
+    )
+    parser.add_argument(
+        "--jobs", type=int,
+        help="Parallel worker processes for --batch (default: CPU count)",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="With --batch, redo pairs whose outputs are already up to date",
     )
     parser.add_argument(
         "--min-duration", type=float, default=3.0,
@@ -176,8 +637,36 @@ def main() -> int:
         "--step", type=float, default=0.5,
         help="Sliding window step in seconds (default: 0.5)",
     )
+    parser.add_argument(
+        "--audio-aware", action="store_true",
+        help="Also score windows by signal quality (speech activity, noise, clipping); needs NumPy",
+    )
+    parser.add_argument(
+        "--signal-weight", type=float, default=0.4,
+        help="Weight of the signal score vs. subtitle score with --audio-aware (default: 0.4)",
+    )
+    parser.add_argument(
+        "--top-k", type=int,
+        help="Extract the K best non-overlapping windows as <output>_1.wav ... <output>_K.wav",
+    )
+    parser.add_argument(
+        "--summary",
+        help="JSON summary of the --top-k candidates (default: <output> with .json suffix)",
+    )
     args = parser.parse_args()
 
+    if args.audio_aware and not 0.0 <= args.signal_weight <= 1.0:
+        print("Error: --signal-weight must be between 0 and 1.", file=sys.stderr)
+        return 1
+    if args.top_k is not None and args.top_k < 1:
+        print("Error: --top-k must be at least 1.", file=sys.stderr)
+        return 1
+    if args.batch:
+        return run_batch(args)
+    if not args.srt or not args.audio:
+        print("Error: --srt and --audio are required (or use --batch).", file=sys.stderr)
+        return 1
+
     srt_path = Path(args.srt)
     audio_path = Path(args.audio)
 
@@ -188,18 +677,39 @@ def main() -> int:
         print(f"Error: Audio file not found: {audio_path}", file=sys.stderr)
         return 1
 
-    segments = parse_srt(str(srt_path))
+    try:
+        segments = parse_srt(str(srt_path))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
     if not segments:
         print("Error: No subtitle segments found in SRT file.", file=sys.stderr)
         return 1
 
     print(f"Parsed {len(segments)} subtitle segments.")
 
+    signal = None
+    if args.audio_aware:
+        try:
+            signal = SignalMetrics.from_audio(str(audio_path))
+        except RuntimeError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            return 1
+        print(f"Analysed {signal.duration:.1f}s of audio ({signal.n_frames} frames).")
+
+    out_path = Path(args.output)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if args.top_k is not None:
+        return _extract_top_k(args, segments, signal, audio_path, srt_path, out_path)
+
     start, end, score = find_best_window(
         segments,
         min_dur=args.min_duration,
         max_dur=args.max_duration,
         step=args.step,
+        signal=signal,
+        signal_weight=args.signal_weight,
     )
 
     if score < 0:
@@ -208,14 +718,74 @@ def main() -> int:
 
     print(f"Best segment: {seconds_to_ffmpeg_ts(start)} -> {seconds_to_ffmpeg_ts(end)} "
           f"(duration: {end - start:.1f}s, score: {score:.3f})")
-
-    out_path = Path(args.output)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if signal is not None:
+        m = signal.window_metrics(start, end)
+        print(f"Signal: voiced {m['vad']:.0%}, clean {m['clean']:.2f}, "
+              f"modulation {m['modulation']:.2f}, clipped {m['clipped']:.1%}")
 
     extract_audio(str(audio_path), str(out_path), start, end)
     print(f"Reference audio saved to: {out_path}")
     return 0
 
 
+def _extract_top_k(
+    args: argparse.Namespace,
+    segments: List[Tuple[float, float, str]],
+    signal: Optional[SignalMetrics],
+    audio_path: Path,
+    srt_path: Path,
+    out_path: Path,
+) -> int:
+    windows = find_top_windows(
+        segments,
+        args.top_k,
+        min_dur=args.min_duration,
+        max_dur=args.max_duration,
+        step=args.step,
+        signal=signal,
+        signal_weight=args.signal_weight,
+    )
+    if not windows:
+        print("Error: Could not find a suitable speech window.", file=sys.stderr)
+        return 1
+
+    clips = []
+    candidates: List[Dict[str, Any]] = []
+    for rank, (start, end, score) in enumerate(windows, start=1):
+        path = candidate_path(out_path, rank, args.top_k)
+        clips.append((start, end, str(path)))
+        entry: Dict[str, Any] = {
+            "rank": rank,
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "duration": round(end - start, 3),
+            "score": round(score, 4),
+            "file": str(path),
+        }
+        if signal is not None:
+            entry["signal"] = {k: round(v, 4) for k, v in signal.window_metrics(start, end).items()}
+        candidates.append(entry)
+        print(f"#{rank}: {seconds_to_ffmpeg_ts(start)} -> {seconds_to_ffmpeg_ts(end)} "
+              f"(duration: {end - start:.1f}s, score: {score:.3f}) -> {path}")
+
+    if len(windows) < args.top_k:
+        print(f"Only {len(windows)} non-overlapping windows found.")
+
+    extract_segments(str(audio_path), clips)
+
+    summary_path = Path(args.summary) if args.summary else out_path.with_suffix(".json")
+    summary_path.write_text(
+        json.dumps({
+            "audio": str(audio_path),
+            "srt": str(srt_path),
+            "audio_aware": signal is not None,
+            "candidates": candidates,
+        }, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    print(f"Saved {len(clips)} reference clips. Summary: {summary_path}")
+    return 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -2,19 +2,37 @@
 """Call Noiz voice-design API to generate a voice from an image and/or description.
 
 Returns the best-matching voice_id and saves preview audio samples.
+
+Results are cached under ~/.cache/noiz/voice_design/ keyed by (image
+content hash, description, guidance_scale, loudness), so repeating a design
+returns instantly. --batch designs many voices concurrently over one pooled
+HTTP session.
 """
 import argparse
 import base64
 import binascii
+import hashlib
 import json
+import os
+import shutil
 import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 NOIZ_KEY_FILE = Path.home() / ".noiz_api_key"
 DEFAULT_BASE_URL = "https://noiz.ai/v1"
+TTS_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "tts" / "scripts"
+DEFAULT_WORKERS = 4
+B64_CHUNK_CHARS = 1 << 16  # multiple of 4, decoded independently
+
+_inflight_lock = threading.Lock()
+_inflight: Dict[str, Tuple[threading.Lock, int]] = {}  # entry -> (lock, waiters)
 
 
 def normalize_api_key_base64(api_key: str) -> str:
@@ -53,6 +71,7 @@ def voice_design(
     guidance_scale: float = 5,
     loudness: float = 0.5,
     timeout: int = 120,
+    session: Optional[requests.Session] = None,
 ) -> dict:
     if not picture_path and not voice_description:
         raise ValueError("At least one of --picture or --voice-description is required.")
@@ -75,7 +94,7 @@ def voice_design(
         }
 
     try:
-        resp = requests.post(
+        resp = (session or requests).post(
             url,
             headers={"Authorization": api_key},
             data=data,
@@ -100,6 +119,273 @@ def voice_design(
     return result
 
 
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "noiz" / "voice_design"
+
+
+def design_cache_key(
+    picture_path: Optional[str],
+    voice_description: Optional[str],
+    guidance_scale: float,
+    loudness: float,
+) -> str:
+    picture_sha = ""
+    if picture_path:
+        h = hashlib.sha256()
+        with open(picture_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        picture_sha = h.hexdigest()
+    payload = json.dumps(
+        [picture_sha, voice_description or "", float(guidance_scale), float(loudness)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_b64_audio(audio_b64: str, path: Path) -> int:
+    """Decode base64 audio to ``path`` chunk by chunk; returns bytes written.
+
+    Line-wrapped base64 is unwrapped per chunk, so the string is never
+    copied whole; a partial 4-character group carries into the next chunk.
+    """
+    written = 0
+    carry = ""
+    with open(path, "wb") as f:
+        for i in range(0, len(audio_b64), B64_CHUNK_CHARS):
+            chunk = carry + "".join(audio_b64[i:i + B64_CHUNK_CHARS].split())
+            cut = len(chunk) - len(chunk) % 4
+            carry = chunk[cut:]
+            decoded = base64.b64decode(chunk[:cut])
+            f.write(decoded)
+            written += len(decoded)
+        if carry:
+            raise binascii.Error(f"truncated base64 audio ({len(carry)} trailing chars)")
+    return written
+
+
+def _store_result(result: dict, entry: Path) -> None:
+    """Write previews as WAV files into ``entry``, replacing their base64 in ``result``."""
+    for i, preview in enumerate(result.get("data", {}).get("previews", [])):
+        audio_b64 = preview.pop("audio", "")
+        if audio_b64:
+            name = f"voice_preview_{i}_{preview.get('voice_id', f'unknown_{i}')}.wav"
+            write_b64_audio(audio_b64, entry / name)
+            preview["audio_file"] = name
+    (entry / "result.json").write_text(
+        json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def cached_voice_design(
+    api_key: str,
+    base_url: str,
+    picture_path: Optional[str] = None,
+    voice_description: Optional[str] = None,
+    guidance_scale: float = 5,
+    loudness: float = 0.5,
+    timeout: int = 120,
+    session: Optional[requests.Session] = None,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """voice_design() through the on-disk cache (``refresh`` skips the lookup).
+
+    Returns ``{"result": ..., "entry": Path, "cached": bool}`` where preview
+    audio lives in ``entry`` as ``audio_file`` names instead of base64.
+    """
+    if picture_path and not Path(picture_path).exists():
+        raise FileNotFoundError(f"Image not found: {picture_path}")
+    cache_dir = cache_dir or default_cache_dir()
+    entry = cache_dir / design_cache_key(picture_path, voice_description, guidance_scale, loudness)
+    # Identical designs requested concurrently wait for the first one. The
+    # lock is dropped with its last waiter, so a long batch does not keep one
+    # per design.
+    name = str(entry)
+    with _inflight_lock:
+        key_lock, waiters = _inflight.get(name, (threading.Lock(), 0))
+        _inflight[name] = (key_lock, waiters + 1)
+    try:
+        with key_lock:
+            return _cached_voice_design(
+                entry, api_key, base_url, picture_path, voice_description,
+                guidance_scale, loudness, timeout, session, refresh,
+            )
+    finally:
+        with _inflight_lock:
+            key_lock, waiters = _inflight[name]
+            if waiters == 1:
+                del _inflight[name]
+            else:
+                _inflight[name] = (key_lock, waiters - 1)
+
+
+def _cached_voice_design(
+    entry: Path,
+    api_key: str,
+    base_url: str,
+    picture_path: Optional[str],
+    voice_description: Optional[str],
+    guidance_scale: float,
+    loudness: float,
+    timeout: int,
+    session: Optional[requests.Session],
+    refresh: bool,
+) -> Dict[str, Any]:
+    cache_dir = entry.parent
+    meta = entry / "result.json"
+    if meta.exists() and not refresh:
+        try:
+            cached = json.loads(meta.read_text(encoding="utf-8"))
+            previews = cached.get("data", {}).get("previews", [])
+            # A hit whose preview files were deleted is a miss.
+            if all((entry / p["audio_file"]).is_file() for p in previews if p.get("audio_file")):
+                return {"result": cached, "entry": entry, "cached": True}
+        except ValueError:
+            pass
+        shutil.rmtree(entry, ignore_errors=True)
+
+    result = voice_design(
+        api_key=api_key,
+        base_url=base_url,
+        picture_path=picture_path,
+        voice_description=voice_description,
+        guidance_scale=guidance_scale,
+        loudness=loudness,
+        timeout=timeout,
+        session=session,
+    )
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=str(cache_dir), prefix=".tmp-"))
+    try:
+        _store_result(result, tmp)
+        if not result.get("data", {}).get("previews"):
+            # Nothing worth caching; let the caller report the empty result.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return {"result": result, "entry": entry, "cached": False}
+        if refresh:
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(str(tmp), str(entry))
+        except OSError:
+            # An identical design finished first; keep its entry.
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return {"result": result, "entry": entry, "cached": False}
+
+
+def export_design(design: Dict[str, Any], out_dir: Path) -> Dict[str, Any]:
+    """Copy previews and voice_id.txt from a cache entry into ``out_dir``."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = design["result"].get("data", {})
+    previews = []
+    for preview in data.get("previews", []):
+        name = preview.get("audio_file")
+        if name:
+            shutil.copyfile(str(design["entry"] / name), str(out_dir / name))
+        previews.append({
+            "voice_id": preview.get("voice_id", ""),
+            "file": str(out_dir / name) if name else "",
+        })
+    best_voice_id = previews[0]["voice_id"] if previews else ""
+    if best_voice_id:
+        (out_dir / "voice_id.txt").write_text(best_voice_id, encoding="utf-8")
+    return {
+        "voice_id": best_voice_id,
+        "features": data.get("features", {}),
+        "previews": previews,
+        "cached": design["cached"],
+        "output_dir": str(out_dir),
+    }
+
+
+def register_voices(designs: List[Dict[str, Any]]) -> int:
+    """Record designed voices in the tts skill's local voice registry.
+
+    ``designs`` are export_design() summaries plus a ``description`` key.
+    Returns the number of voices added or updated; 0 if the tts skill is
+    not installed next to this one.
+    """
+    if not (TTS_SCRIPTS_DIR / "voice_registry.py").exists():
+        return 0
+    if str(TTS_SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(TTS_SCRIPTS_DIR))
+    from voice_registry import VoiceRegistry
+
+    changed = 0
+    with VoiceRegistry() as registry:
+        for design in designs:
+            for preview in design.get("previews", []):
+                if preview["voice_id"]:
+                    changed += registry.add_designed(
+                        preview["voice_id"],
+                        design.get("features"),
+                        design.get("description") or "",
+                        str(Path(preview["file"]).resolve()) if preview["file"] else "",
+                    )
+    return changed
+
+
+def make_session(workers: int = DEFAULT_WORKERS) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run_batch(
+    items: List[Dict[str, Any]],
+    api_key: str,
+    base_url: str,
+    out_root: Path,
+    workers: int = DEFAULT_WORKERS,
+    timeout: int = 120,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """Design every manifest item concurrently; returns one summary per item, in order."""
+    lock = threading.Lock()
+    done = [0]
+
+    def work(i: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        name = str(item.get("name") or i + 1)
+        out_dir = Path(item["output_dir"]) if item.get("output_dir") else out_root / name
+        summary: Dict[str, Any] = {"name": name}
+        try:
+            design = cached_voice_design(
+                api_key,
+                base_url,
+                picture_path=item.get("picture"),
+                voice_description=item.get("voice_description"),
+                guidance_scale=item.get("guidance_scale", 5),
+                loudness=item.get("loudness", 0.5),
+                timeout=timeout,
+                session=session,
+                cache_dir=cache_dir,
+                refresh=refresh,
+            )
+            summary.update(
+                export_design(design, out_dir),
+                status="done",
+                description=item.get("voice_description") or "",
+            )
+        except Exception as exc:
+            summary.update(status="failed", error=str(exc))
+        with lock:
+            done[0] += 1
+            detail = summary.get("voice_id") or summary.get("error")
+            tag = " (cached)" if summary.get("cached") else ""
+            print(f"[{done[0]}/{len(items)}] {name}: {summary['status']}{tag} {detail}")
+        return summary
+
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        return list(pool.map(lambda pair: work(*pair), enumerate(items)))
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Design a voice from an image and/or text description via Noiz API."
@@ -134,6 +420,19 @@ def main() -> int:
         help="Directory to save preview audio files",
     )
     parser.add_argument("--timeout", type=int, default=120)
+    parser.add_argument(
+        "--batch",
+        help="JSON manifest: list of {name, picture, voice_description, guidance_scale, "
+             "loudness, output_dir} items, designed concurrently (one subdirectory each)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS,
+        help=f"Concurrent requests in --batch mode (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Ignore cached designs and call the API again",
+    )
     args = parser.parse_args()
 
     api_key = args.api_key
@@ -148,11 +447,14 @@ def main() -> int:
         return 1
     api_key = normalize_api_key_base64(api_key)
 
+    if args.batch:
+        return _main_batch(args, api_key)
+
     if not args.picture and not args.voice_description:
         parser.error("At least one of --picture or --voice-description is required.")
 
     try:
-        result = voice_design(
+        design = cached_voice_design(
             api_key=api_key,
             base_url=args.base_url,
             picture_path=args.picture,
@@ -160,15 +462,19 @@ def main() -> int:
             guidance_scale=args.guidance_scale,
             loudness=args.loudness,
             timeout=args.timeout,
+            refresh=args.refresh,
         )
     except Exception as exc:
         print(f"Error: {exc}", file=sys.stderr)
         return 1
 
-    data = result.get("data", {})
+    data = design["result"].get("data", {})
     previews = data.get("previews", [])
     features = data.get("features", {})
 
+    if design["cached"]:
+        print("Using cached design (pass --refresh to request a new one).")
+
     if features:
         print("Voice features detected:")
         for k, v in features.items():
@@ -179,30 +485,62 @@ def main() -> int:
         return 1
 
     out_dir = Path(args.output_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
+    summary = export_design(design, out_dir)
+    summary["description"] = args.voice_description or ""
 
     print(f"\nReceived {len(previews)} voice preview(s):")
     for i, preview in enumerate(previews):
         voice_id = preview.get("voice_id", f"unknown_{i}")
-        audio_b64 = preview.get("audio", "")
         print(f"  [{i}] voice_id: {voice_id}")
+        if preview.get("audio_file"):
+            print(f"      saved: {out_dir / preview['audio_file']}")
 
-        if audio_b64:
-            audio_bytes = base64.b64decode(audio_b64)
-            out_file = out_dir / f"voice_preview_{i}_{voice_id}.wav"
-            out_file.write_bytes(audio_bytes)
-            print(f"      saved: {out_file}")
-
-    best_voice_id = previews[0].get("voice_id", "")
-    print(f"\nBest voice_id: {best_voice_id}")
+    print(f"\nBest voice_id: {summary['voice_id']}")
     print(f"Display name: {features.get('display_name', 'N/A')}")
-
-    voice_id_file = out_dir / "voice_id.txt"
-    voice_id_file.write_text(best_voice_id, encoding="utf-8")
-    print(f"Voice ID saved to: {voice_id_file}")
+    print(f"Voice ID saved to: {out_dir / 'voice_id.txt'}")
+    _register([summary])
 
     return 0
 
 
+def _register(designs: List[Dict[str, Any]]) -> None:
+    try:
+        if register_voices(designs):
+            print("Registered designed voices in the local voice registry.")
+    except Exception as exc:
+        print(f"Warning: could not update the voice registry: {exc}", file=sys.stderr)
+
+
+def _main_batch(args: argparse.Namespace, api_key: str) -> int:
+    try:
+        items = json.loads(Path(args.batch).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"Error: cannot read batch manifest {args.batch}: {exc}", file=sys.stderr)
+        return 1
+    if not isinstance(items, list) or not items:
+        print("Error: batch manifest must be a non-empty JSON list.", file=sys.stderr)
+        return 1
+    for i, item in enumerate(items):
+        if not item.get("picture") and not item.get("voice_description"):
+            print(f"Error: batch item {i} needs 'picture' or 'voice_description'.", file=sys.stderr)
+            return 1
+
+    out_root = Path(args.output_dir)
+    print(f"Designing {len(items)} voices with {args.workers} concurrent requests.")
+    results = run_batch(
+        items, api_key, args.base_url, out_root,
+        workers=args.workers, timeout=args.timeout, refresh=args.refresh,
+    )
+    _register([r for r in results if r["status"] == "done"])
+    out_root.mkdir(parents=True, exist_ok=True)
+    results_path = out_root / "voice_design_results.json"
+    results_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    failed = sum(1 for r in results if r["status"] == "failed")
+    cached = sum(1 for r in results if r.get("cached"))
+    print(f"Done: {len(results) - failed} designed ({cached} from cache), {failed} failed. "
+          f"Results: {results_path}")
+    return 1 if failed else 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Audiobook mode: resumable synthesis of book-length text files.
+
+Detects chapter headings, splits each chapter into sentence-aligned chunks,
+synthesizes the chunks with a bounded worker pool and records every chunk
+in ``manifest.json`` inside the work directory. Re-running the same command
+after a failure (or Ctrl-C) only synthesizes chunks that are missing or
+whose text/voice changed.
+
+Finished chunks are assembled, one at a time, into per-chapter WAV files
+and one combined output carrying chapter markers (ffmetadata chapters for
+m4a/mp3/ogg, plus a ``.chapters.json`` sidecar for every format).
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import wave
+from concurrent.futures import as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from render_timeline import SAMPLE_WIDTH, Cue, Renderer, _pcm_args
+from text_to_srt import split_sentences
+
+MANIFEST_VERSION = 1
+DEFAULT_MAX_CHARS = 800
+
+_NUMBER_WORD = (
+    r"(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|"
+    r"fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty)"
+    r"(?:[- ](?:one|two|three|four|five|six|seven|eight|nine))?"
+)
+# A heading is the marker alone or followed by a separator and a title, so
+# prose such as "Part of me wanted to leave." is not mistaken for one.
+CHAPTER_HEADING_RE = re.compile(
+    r"^(?:#{1,3}\s+\S.*"
+    r"|(?:(?:chapter|part|book)\s+(?:\d+|[ivxlcdm]+|" + _NUMBER_WORD + r")"
+    r"|prologue|epilogue|preface|introduction|afterword)(?:\s*[:.\-\u2013\u2014]\s*.*)?"
+    r"|第[0-9零〇一二三四五六七八九十百千两]+[章节回卷部].*)$",
+    re.IGNORECASE,
+)
+MAX_HEADING_CHARS = 80
+
+
+@dataclass
+class Chapter:
+    index: int
+    title: str
+    chunks: List[str] = field(default_factory=list)
+
+
+def detect_chapters(text: str) -> List[Tuple[str, str]]:
+    """Split text into (title, body) pairs at chapter-heading lines.
+
+    Text before the first heading becomes an untitled opening chapter; a
+    book without recognizable headings is returned as a single chapter.
+    """
+    chapters: List[Tuple[str, List[str]]] = [("", [])]
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and len(stripped) <= MAX_HEADING_CHARS and CHAPTER_HEADING_RE.match(stripped):
+            chapters.append((stripped.lstrip("#").strip(), []))
+        else:
+            chapters[-1][1].append(line)
+    result = [(title, "\n".join(body).strip()) for title, body in chapters]
+    return [(title, body) for title, body in result if body or title]
+
+
+def chunk_sentences(sentences: List[str], max_chars: int = DEFAULT_MAX_CHARS) -> List[str]:
+    """Pack consecutive sentences into chunks of at most ``max_chars`` characters.
+
+    A single sentence longer than the limit becomes its own chunk.
+    """
+    chunks: List[str] = []
+    current = ""
+    for sentence in sentences:
+        candidate = f"{current} {sentence}".strip() if current else sentence
+        if current and len(candidate) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def plan_chapters(text: str, max_chars: int = DEFAULT_MAX_CHARS) -> List[Chapter]:
+    chapters = []
+    for title, body in detect_chapters(text):
+        sentences = split_sentences(body) if body else []
+        if title:
+            sentences.insert(0, title if title[-1:] in "。！？.!?" else title + ".")
+        chunks = chunk_sentences(sentences, max_chars)
+        if chunks:
+            chapters.append(Chapter(len(chapters) + 1, title or "Opening", chunks))
+    return chapters
+
+
+def _chunk_key(text: str, cfg: Dict[str, Any], backend: str, sample_rate: int) -> str:
+    payload = json.dumps(
+        {"text": text, "cfg": cfg, "backend": backend, "sample_rate": sample_rate},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Manifest:
+    """Per-chunk progress record, saved atomically after every change."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {"version": MANIFEST_VERSION, "chunks": {}}
+        if path.exists():
+            try:
+                loaded = json.loads(path.read_text(encoding="utf-8"))
+                if loaded.get("version") == MANIFEST_VERSION:
+                    self.data = loaded
+            except ValueError:
+                pass
+
+    def is_done(self, chunk_id: str, key: str, audio_path: Path) -> bool:
+        entry = self.data["chunks"].get(chunk_id)
+        return bool(
+            entry and entry.get("status") == "done" and entry.get("key") == key
+            and audio_path.exists()
+        )
+
+    def update(self, chunk_id: str, **fields: Any) -> None:
+        with self._lock:
+            self.data["chunks"].setdefault(chunk_id, {}).update(fields)
+            self._save()
+
+    def set(self, **fields: Any) -> None:
+        with self._lock:
+            self.data.update(fields)
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(str(tmp), str(self.path))
+
+
+def _chunk_id(chapter: Chapter, n: int) -> str:
+    return f"{chapter.index:03d}_{n:04d}"
+
+
+def synthesize_chunks(
+    renderer: Renderer,
+    chapters: List[Chapter],
+    cfg: Dict[str, Any],
+    work_dir: Path,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Tuple[int, int, List[str]]:
+    """Synthesize every chunk not already finished.
+
+    Returns (reused, synthesized, failed chunk ids). Failures are recorded
+    in the manifest and do not stop the remaining chunks.
+    """
+    chunk_dir = work_dir / "chunks"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(work_dir / "manifest.json")
+    manifest.set(chapters=[
+        {"index": ch.index, "title": ch.title,
+         "chunks": [_chunk_id(ch, n) for n in range(1, len(ch.chunks) + 1)]}
+        for ch in chapters
+    ])
+
+    todo = []
+    reused = 0
+    for ch in chapters:
+        for n, text in enumerate(ch.chunks, start=1):
+            cid = _chunk_id(ch, n)
+            key = _chunk_key(text, cfg, renderer.backend, renderer.sample_rate)
+            path = chunk_dir / f"{cid}.wav"
+            if manifest.is_done(cid, key, path):
+                reused += 1
+            else:
+                todo.append((cid, key, path, text))
+
+    def work(cid: str, key: str, path: Path, text: str) -> int:
+        pcm = renderer.synthesize_pcm(Cue(0, 0, 0, text), cfg)
+        tmp = path.with_suffix(".wav.tmp")
+        with wave.open(str(tmp), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(SAMPLE_WIDTH)
+            w.setframerate(renderer.sample_rate)
+            w.writeframes(pcm)
+        os.replace(str(tmp), str(path))
+        return len(pcm) // SAMPLE_WIDTH * 1000 // renderer.sample_rate
+
+    futures = {renderer.pool.submit(work, *job): job for job in todo}
+    failed: List[str] = []
+    done = 0
+    try:
+        for fut in as_completed(futures):
+            cid, key, path, _ = futures[fut]
+            try:
+                duration_ms = fut.result()
+            except Exception as exc:
+                failed.append(cid)
+                manifest.update(cid, status="failed", key=key, error=str(exc))
+                if progress:
+                    progress(f"chunk {cid} failed: {exc}")
+                continue
+            done += 1
+            manifest.update(cid, status="done", key=key, file=path.name, duration_ms=duration_ms)
+            if progress:
+                progress(f"chunk {cid} done ({done}/{len(todo)})")
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    return reused, done, sorted(failed)
+
+
+def _escape_ffmeta(value: str) -> str:
+    return re.sub(r"([=;#\\\n])", r"\\\1", value)
+
+
+def ffmetadata(title: str, markers: List[Dict[str, Any]]) -> str:
+    lines = [";FFMETADATA1", f"title={_escape_ffmeta(title)}"]
+    for m in markers:
+        lines += [
+            "[CHAPTER]", "TIMEBASE=1/1000",
+            f"START={m['start_ms']}", f"END={m['end_ms']}",
+            f"title={_escape_ffmeta(m['title'])}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _safe_name(title: str) -> str:
+    return re.sub(r"[\\/:*?\"<>|\s]+", "_", title).strip("_")[:60] or "chapter"
+
+
+def _iter_chunk_pcm(path: Path, block_frames: int = 65536):
+    with wave.open(str(path), "rb") as w:
+        while True:
+            data = w.readframes(block_frames)
+            if not data:
+                break
+            yield data
+
+
+def assemble(
+    chapters: List[Chapter],
+    work_dir: Path,
+    output: Path,
+    chapters_dir: Path,
+    sample_rate: int,
+    pause_ms: int = 300,
+    chapter_pause_ms: int = 1500,
+    title: str = "",
+) -> List[Dict[str, Any]]:
+    """Write per-chapter WAVs and the combined output, one chunk in memory at a time.
+
+    Returns the chapter markers (title, start_ms, end_ms, file).
+    """
+    chunk_dir = work_dir / "chunks"
+    chapters_dir.mkdir(parents=True, exist_ok=True)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    pause = bytes(pause_ms * sample_rate // 1000 * SAMPLE_WIDTH)
+    chapter_pause = bytes(chapter_pause_ms * sample_rate // 1000 * SAMPLE_WIDTH)
+
+    fmt = output.suffix.lstrip(".").lower() or "wav"
+    proc: Optional[subprocess.Popen] = None
+    combined_wav: Optional[wave.Wave_write] = None
+    if fmt == "wav":
+        combined_wav = wave.open(str(output), "wb")
+        combined_wav.setnchannels(1)
+        combined_wav.setsampwidth(SAMPLE_WIDTH)
+        combined_wav.setframerate(sample_rate)
+    else:
+        # Chapter markers are only known after all audio is written, so the
+        # encoder writes to a temp file and metadata is muxed in afterwards.
+        tmp_audio = output.with_name(output.stem + ".partial" + output.suffix)
+        proc = subprocess.Popen(
+            ["ffmpeg", "-y", "-v", "error"] + _pcm_args(sample_rate)
+            + ["-i", "pipe:0", str(tmp_audio)],
+            stdin=subprocess.PIPE,
+        )
+
+    written = 0  # samples in the combined output
+
+    def emit(data: bytes) -> None:
+        nonlocal written
+        if combined_wav is not None:
+            combined_wav.writeframes(data)
+        else:
+            assert proc is not None and proc.stdin is not None
+            proc.stdin.write(data)
+        written += len(data) // SAMPLE_WIDTH
+
+    markers: List[Dict[str, Any]] = []
+    try:
+        for ci, ch in enumerate(chapters):
+            if ci > 0:
+                emit(chapter_pause)
+            start_ms = written * 1000 // sample_rate
+            ch_path = chapters_dir / f"{ch.index:03d}_{_safe_name(ch.title)}.wav"
+            with wave.open(str(ch_path), "wb") as cw:
+                cw.setnchannels(1)
+                cw.setsampwidth(SAMPLE_WIDTH)
+                cw.setframerate(sample_rate)
+                for n in range(1, len(ch.chunks) + 1):
+                    if n > 1:
+                        cw.writeframes(pause)
+                        emit(pause)
+                    for block in _iter_chunk_pcm(chunk_dir / f"{_chunk_id(ch, n)}.wav"):
+                        cw.writeframes(block)
+                        emit(block)
+            markers.append({
+                "index": ch.index,
+                "title": ch.title,
+                "start_ms": start_ms,
+                "end_ms": written * 1000 // sample_rate,
+                "file": str(ch_path),
+            })
+    finally:
+        if combined_wav is not None:
+            combined_wav.close()
+        if proc is not None and proc.stdin is not None:
+            proc.stdin.close()
+            proc.wait()
+
+    if proc is not None:
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {output}")
+        meta_path = work_dir / "chapters.ffmeta"
+        meta_path.write_text(ffmetadata(title or output.stem, markers), encoding="utf-8")
+        mux = subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-i", str(tmp_audio), "-i", str(meta_path),
+             "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1", "-c", "copy",
+             str(output)],
+            capture_output=True, text=True,
+        )
+        tmp_audio.unlink(missing_ok=True)
+        if mux.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to add chapter markers: {mux.stderr}")
+
+    sidecar = output.with_name(output.name + ".chapters.json")
+    sidecar.write_text(
+        json.dumps({"output": str(output), "chapters": markers}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    return markers
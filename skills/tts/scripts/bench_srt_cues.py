@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark the streaming SRT parser against the original block-split parser.
+
+Writes a synthetic subtitle file, then times and measures (tracemalloc
+peak) the previous ``render_timeline.parse_srt`` (whole file read, regex
+split into blocks), ``iter_srt`` alone, ``load_srt`` into a ``CueTable``
+and the current ``render_timeline.parse_srt``. Checks that all of them
+parse the same cues.
+
+    python3 skills/tts/scripts/bench_srt_cues.py --cues 100000
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from render_timeline import parse_srt  # noqa: E402
+from srt_cues import CueTable, iter_srt, load_srt, open_srt  # noqa: E402
+
+LEGACY_TIMESTAMP_RE = re.compile(r"^(\d{2}):(\d{2}):(\d{2})[,.](\d{3})$")
+
+
+def _legacy_ms(value: str) -> int:
+    match = LEGACY_TIMESTAMP_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid SRT timestamp: {value}")
+    hh, mm, ss, ms = map(int, match.groups())
+    return ((hh * 60 + mm) * 60 + ss) * 1000 + ms
+
+
+def legacy_parse_srt(path: Path) -> List[Tuple[int, int, int, str]]:
+    """The original parser: read everything, split on blank lines, parse blocks."""
+    content = path.read_text(encoding="utf-8", errors="replace")
+    cues = []
+    for block in re.split(r"\n\s*\n", content.strip()):
+        lines = [ln.rstrip() for ln in block.splitlines() if ln.strip()]
+        if len(lines) < 3:
+            continue
+        try:
+            idx = int(lines[0])
+        except ValueError:
+            continue
+        if "-->" not in lines[1]:
+            continue
+        start_raw, end_raw = [s.strip() for s in lines[1].split("-->", 1)]
+        text = "\n".join(lines[2:]).strip()
+        if text:
+            cues.append((idx, _legacy_ms(start_raw), _legacy_ms(end_raw), text))
+    return cues
+
+
+def _ts(ms: int) -> str:
+    hh, rem = divmod(ms, 3_600_000)
+    mm, rem = divmod(rem, 60_000)
+    ss, ms = divmod(rem, 1000)
+    return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
+
+
+def write_synthetic_srt(path: Path, n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over a lazy dog while we talk about it".split()
+    t = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, n + 1):
+            dur = rng.randint(800, 4000)
+            lines = [
+                " ".join(rng.choice(words) for _ in range(rng.randint(3, 9)))
+                for _ in range(rng.choice((1, 1, 2)))
+            ]
+            f.write(f"{i}\n{_ts(t)} --> {_ts(t + dur)}\n" + "\n".join(lines) + "\n\n")
+            t += dur + rng.randint(0, 400)
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, float, int]:
+    """Return ``fn()``, its run time, and its peak traced bytes from a second run.
+
+    Timing and tracing are separate runs because tracemalloc slows
+    allocation-heavy code several times over.
+    """
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cues", type=int, default=100000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.srt"
+        write_synthetic_srt(path, args.cues, args.seed)
+        size_mb = path.stat().st_size / 1e6
+        print(f"{args.cues} cues, {size_mb:.1f} MB")
+
+        def stream_only() -> int:
+            with open_srt(path) as f:
+                return sum(1 for _ in iter_srt(f))
+
+        runs = [
+            ("legacy parse_srt", lambda: legacy_parse_srt(path)),
+            ("iter_srt (count)", stream_only),
+            ("load_srt CueTable", lambda: load_srt(path)),
+            ("parse_srt -> Cue", lambda: parse_srt(path)),
+        ]
+        results = {}
+        for label, fn in runs:
+            result, elapsed, peak = measure(fn)
+            results[label] = result
+            print(f"{label:18s}: {elapsed:7.3f}s  {args.cues / elapsed:10,.0f} cues/s"
+                  f"  peak {peak / 1e6:7.1f} MB")
+
+        table: CueTable = results["load_srt CueTable"]
+        print(f"CueTable holds {table.nbytes() / 1e6:.1f} MB for {len(table)} cues")
+
+        legacy = results["legacy parse_srt"]
+        cues = [(c.index, c.start_ms, c.end_ms, c.text) for c in results["parse_srt -> Cue"]]
+        if list(table) != legacy or cues != legacy or results["iter_srt (count)"] != len(legacy):
+            print("MISMATCH between legacy and streaming parsers", file=sys.stderr)
+            return 1
+        print("results identical")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
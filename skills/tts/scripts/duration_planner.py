@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Per-voice speaking-rate model for picking ``speed`` before synthesis.
+
+Every synthesis whose natural length is known (Kokoro output before
+stretching, Noiz ``X-Audio-Duration`` for unforced or overrunning requests)
+is an observation of how many characters a voice speaks per second at
+speed 1.0. Rates are kept per backend, voice and language in
+``$XDG_DATA_HOME/noiz/speech_rates.json`` (``~/.local/share/noiz/`` by
+default), so later renders can choose a speed that makes a line fit its
+cue up front instead of stretching or truncating it afterwards.
+
+    duration_planner.py show
+    duration_planner.py reset
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_TOLERANCE = 0.05  # a cue within ±5% of its target needs no stretch
+DEFAULT_SPEED_RANGE = (0.75, 1.35)
+MIN_SAMPLES = 3  # observations before a voice's rate is trusted
+MAX_WEIGHT = 20  # later observations move the rate like a moving average
+MIN_OBSERVED_SEC = 0.3
+
+
+def default_rates_path() -> Path:
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(base) / "noiz" / "speech_rates.json"
+
+
+def spoken_chars(text: str) -> int:
+    """Characters that take time to say; whitespace and punctuation are free."""
+    return sum(1 for ch in text if ch.isalnum())
+
+
+def voice_key(backend: str, cfg: Dict[str, Any]) -> str:
+    """Identify the voice a cfg speaks with; cues cloning per-cue slices share one key."""
+    if backend == "kokoro":
+        return f"kokoro:{cfg.get('voice') or 'default'}:{cfg.get('lang') or ''}"
+    voice = cfg.get("voice_id") or cfg.get("reference_audio") or "clone"
+    return f"noiz:{voice}:{cfg.get('target_lang') or ''}"
+
+
+@dataclass
+class SpeedPlan:
+    speed: float
+    predicted_sec: float
+
+
+class DurationPlanner:
+    """Thread-safe rate store; ``save()`` merges this process's updates to disk."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        tolerance: float = DEFAULT_TOLERANCE,
+        speed_range: Tuple[float, float] = DEFAULT_SPEED_RANGE,
+    ) -> None:
+        self.path = Path(path) if path else default_rates_path()
+        self.tolerance = tolerance
+        self.speed_range = speed_range
+        self._lock = threading.Lock()
+        self._dirty: Dict[str, Dict[str, float]] = {}
+        self.rates = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def rate(self, key: str) -> Optional[float]:
+        """Characters per second at speed 1.0, once enough samples are in."""
+        with self._lock:
+            entry = self.rates.get(key)
+        if not entry or entry.get("n", 0) < MIN_SAMPLES:
+            return None
+        return float(entry["cps"])
+
+    def plan(self, key: str, text: str, target_sec: float) -> Optional[SpeedPlan]:
+        """Pick the speed that makes ``text`` last ``target_sec``, or None if unknown."""
+        chars = spoken_chars(text)
+        rate = self.rate(key)
+        if not rate or not chars or target_sec <= 0:
+            return None
+        lo, hi = self.speed_range
+        speed = round(min(max(chars / (rate * target_sec), lo), hi), 3)
+        return SpeedPlan(speed, chars / (rate * speed))
+
+    def observe(self, key: str, text: str, speed: float, duration_sec: float) -> None:
+        """Record that ``text`` took ``duration_sec`` to say at ``speed``."""
+        chars = spoken_chars(text)
+        if not chars or duration_sec < MIN_OBSERVED_SEC or speed <= 0:
+            return
+        cps = chars / (duration_sec * speed)
+        with self._lock:
+            entry = self.rates.setdefault(key, {"cps": cps, "n": 0})
+            n = min(entry["n"] + 1, MAX_WEIGHT)
+            entry["cps"] += (cps - entry["cps"]) / n
+            entry["n"] = entry.get("n", 0) + 1
+            self._dirty[key] = entry
+
+    def save(self) -> None:
+        """Write updated rates, keeping entries other processes wrote meanwhile."""
+        with self._lock:
+            if not self._dirty:
+                return
+            updates = dict(self._dirty)
+            self._dirty.clear()
+        merged = self._load()
+        merged.update(updates)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2, sort_keys=True)
+            os.replace(tmp, str(self.path))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Inspect the learned per-voice speaking rates.")
+    ap.add_argument("command", choices=["show", "reset"])
+    ap.add_argument("--path", help=f"Rates file (default: {default_rates_path()})")
+    args = ap.parse_args()
+
+    path = Path(args.path) if args.path else default_rates_path()
+    if args.command == "reset":
+        path.unlink(missing_ok=True)
+        print(f"Removed {path}")
+        return 0
+    planner = DurationPlanner(path)
+    if not planner.rates:
+        print(f"No rates learned yet ({path}).")
+        return 0
+    for key, entry in sorted(planner.rates.items()):
+        trusted = "" if entry.get("n", 0) >= MIN_SAMPLES else "  (learning)"
+        print(f"{key}\t{entry['cps']:.2f} chars/s\t{entry.get('n', 0)} samples{trusted}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,7 +11,7 @@ import binascii
 import json
 import sys
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 
 def normalize_output_format(output_format: str) -> str:
@@ -134,21 +134,25 @@ def synthesize(
     return duration_val
 
 
-def synthesize_guest(
+def request_guest(
     base_url: str,
     text: str,
     voice_id: str,
     output_format: str,
     speed: float,
     timeout: int,
-    out_path: Path,
-) -> float:
+    session: Optional[Any] = None,
+) -> Tuple[bytes, float]:
+    """Call the guest endpoint. Returns (audio, X-Audio-Duration or -1)."""
     root = base_url.rstrip("/")
     if root.endswith("/v1"):
         root = root[:-3]
     url = f"{root}/api/v1/guest/text-to-speech"
 
-    import requests
+    if session is None:
+        import requests
+
+        session = requests
 
     normalized_format = normalize_output_format(output_format)
     data: Dict[str, str] = {
@@ -157,17 +161,28 @@ def synthesize_guest(
         "output_format": normalized_format,
         "speed": str(speed),
     }
-    resp = requests.post(url, data=data, timeout=timeout)
+    resp = session.post(url, data=data, timeout=timeout)
 
     if resp.status_code != 200:
         raise RuntimeError(
             f"/guest/text-to-speech failed: status={resp.status_code}, body={resp.text}"
         )
+    dur = resp.headers.get("X-Audio-Duration")
+    return resp.content, float(dur) if dur else -1.0
+
 
+def synthesize_guest(
+    base_url: str,
+    text: str,
+    voice_id: str,
+    output_format: str,
+    speed: float,
+    timeout: int,
+    out_path: Path,
+) -> float:
+    audio, duration_val = request_guest(base_url, text, voice_id, output_format, speed, timeout)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_bytes(resp.content)
-    dur = resp.headers.get("X-Audio-Duration")
-    duration_val = float(dur) if dur else -1.0
+    out_path.write_bytes(audio)
     out_path.with_suffix(".duration").write_text(str(duration_val))
     return duration_val
 
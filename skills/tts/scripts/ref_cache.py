@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""On-disk cache for reference audio fetched from URLs.
+
+Entries live under ``$XDG_CACHE_HOME/noiz/ref_audio`` (``~/.cache/noiz/ref_audio``
+by default), keyed by the SHA-256 of the URL. Each entry is the audio file plus
+a JSON sidecar with the ETag / Last-Modified validators sent by the server.
+
+A fresh entry is served without touching the network. A stale one is
+revalidated with a conditional GET, so an unchanged file costs a 304 and no
+body; if the server is unreachable, failing (5xx) or rate limiting (429),
+the stale copy is served. Downloads go to a private temp file and are moved into place with
+``os.replace``, so concurrent processes never observe a partial entry.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_AGE_SEC = 24 * 3600
+MAX_ENTRY_BYTES = 50 * 1024 * 1024
+MAX_TOTAL_BYTES = 500 * 1024 * 1024
+_CHUNK = 64 * 1024
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "noiz" / "ref_audio"
+
+
+def is_url(value: str) -> bool:
+    return value.startswith("http://") or value.startswith("https://")
+
+
+def _entry_paths(cache_dir: Path, url: str):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    suffix = Path(url.split("?", 1)[0]).suffix.lower()
+    if not suffix or len(suffix) > 6:
+        suffix = ".wav"
+    return cache_dir / f"{key}{suffix}", cache_dir / f"{key}.json"
+
+
+def _read_meta(meta_path: Path, data_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        size = data_path.stat().st_size
+    except (OSError, ValueError):
+        return None
+    # A data file from a different writer than the sidecar is treated as a miss.
+    if meta.get("size") != size:
+        return None
+    return meta
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, str(path))
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _write_meta(meta_path: Path, meta: Dict[str, Any]) -> None:
+    _write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(str(path), None)
+    except OSError:
+        pass
+
+
+def _download(resp: Any, data_path: Path, max_bytes: int) -> int:
+    fd, tmp = tempfile.mkstemp(dir=str(data_path.parent), prefix=".tmp-", suffix=data_path.suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = resp.read(_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(
+                        f"Reference audio exceeds {max_bytes // (1024 * 1024)} MB limit"
+                    )
+                f.write(chunk)
+        os.replace(tmp, str(data_path))
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return size
+
+
+def prune(cache_dir: Optional[Path] = None, max_total_bytes: int = MAX_TOTAL_BYTES,
+          keep: Optional[Path] = None) -> int:
+    """Evict least-recently-used entries until the cache fits the budget.
+
+    Returns the number of bytes freed.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if not cache_dir.is_dir():
+        return 0
+    entries = []
+    total = 0
+    for p in cache_dir.iterdir():
+        if p.suffix == ".json" or p.name.startswith(".tmp-"):
+            continue
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+        total += st.st_size
+    freed = 0
+    for _, size, p in sorted(entries):
+        if total <= max_total_bytes:
+            break
+        if keep is not None and p == keep:
+            continue
+        p.unlink(missing_ok=True)
+        p.with_suffix(".json").unlink(missing_ok=True)
+        total -= size
+        freed += size
+    return freed
+
+
+def fetch(
+    url: str,
+    timeout: int = 60,
+    max_age: float = DEFAULT_MAX_AGE_SEC,
+    cache_dir: Optional[Path] = None,
+    max_entry_bytes: int = MAX_ENTRY_BYTES,
+    max_total_bytes: int = MAX_TOTAL_BYTES,
+) -> Path:
+    """Return a local path for ``url``, downloading or revalidating as needed.
+
+    The returned file belongs to the cache; callers must not delete it.
+    """
+    import urllib.error
+    import urllib.request
+
+    cache_dir = cache_dir or default_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _entry_paths(cache_dir, url)
+    meta = _read_meta(meta_path, data_path)
+
+    now = time.time()
+    if meta is not None and now - meta.get("checked_at", 0) < max_age:
+        _touch(data_path)
+        return data_path
+
+    headers = {"User-Agent": "noiz-tts-skill"}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        resp = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and meta is not None:
+            meta["checked_at"] = now
+            _write_meta(meta_path, meta)
+            _touch(data_path)
+            return data_path
+        if meta is not None and (exc.code >= 500 or exc.code == 429):
+            print(
+                f"[ref-cache] Revalidation failed (HTTP {exc.code}); using cached copy of {url}",
+                file=sys.stderr,
+            )
+            return data_path
+        raise
+    except (urllib.error.URLError, OSError) as exc:
+        if meta is not None:
+            print(
+                f"[ref-cache] Revalidation failed ({exc}); using cached copy of {url}",
+                file=sys.stderr,
+            )
+            return data_path
+        raise
+
+    print(f"[ref-cache] Downloading reference audio: {url}", file=sys.stderr)
+    with resp:
+        size = _download(resp, data_path, max_entry_bytes)
+        new_meta = {
+            "url": url,
+            "size": size,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "checked_at": now,
+        }
+    _write_meta(meta_path, new_meta)
+    prune(cache_dir, max_total_bytes, keep=data_path)
+    return data_path
+
+
+def clear(cache_dir: Optional[Path] = None) -> int:
+    """Remove every cached entry. Returns the number of files removed."""
+    cache_dir = cache_dir or default_cache_dir()
+    if not cache_dir.is_dir():
+        return 0
+    removed = 0
+    for p in cache_dir.iterdir():
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage the reference-audio cache.")
+    parser.add_argument("url", nargs="?", help="URL to fetch into the cache")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_SEC,
+                        help="Seconds an entry is served without revalidation")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached entries")
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f"Removed {clear()} file(s) from {default_cache_dir()}")
+        return 0
+    if not args.url:
+        parser.error("url is required unless --clear is given")
+    try:
+        print(fetch(args.url, max_age=args.max_age))
+        return 0
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
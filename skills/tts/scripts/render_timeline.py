@@ -6,23 +6,55 @@ Supports two backends:
   - noiz: cloud API with server-side duration forcing, emotion, voice cloning
 
 Parses SRT, resolves per-segment voice config from a voice-map JSON,
-calls TTS for each segment, normalizes to exact duration, delays to
-correct start time, and mixes into one timeline track.
+calls TTS for each segment, normalizes to exact duration, places it at
+the correct start time, and mixes into one timeline track.
+
+Segments are decoded to 16-bit mono PCM, fitted, and appended to a
+``segment_store.SegmentStore`` as each one finishes; the mixer then reads
+them back as zero-copy views, block by block into the output writer, so
+neither the segments nor a full-length track are held in memory. The
+module can also be used as a library:
+
+    from render_timeline import parse_srt, render
+    result = render(parse_srt(Path("in.srt")), voice_map,
+                    backend="noiz", api_key=key)
+    result.pcm          # s16le mono samples at result.sample_rate
+    result.report()     # same structure as render_report.json
+
+``render`` keeps one ``Renderer`` per backend configuration, so repeated
+calls in a long-running process reuse the HTTP session and worker pool.
 """
 import argparse
 import base64
 import binascii
+import contextlib
+import io
 import json
-import re
 import shutil
+import struct
 import subprocess
 import sys
 import tempfile
-from dataclasses import dataclass
+import threading
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import (
+    Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union,
+)
 
-TIMESTAMP_RE = re.compile(r"^(\d{2}):(\d{2}):(\d{2})[,.](\d{3})$")
+from segment_store import SegmentStore
+from srt_cues import iter_srt, open_srt
+
+DEFAULT_BASE_URL = "https://noiz.ai/v1"
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_WORKERS = 4
+SAMPLE_WIDTH = 2  # bytes per sample, s16le mono
+REF_SLICE_SAMPLE_RATE = 16000
+MIX_BLOCK_SAMPLES = 1 << 16  # samples mixed and written per block when streaming
+DEDUP_TOLERANCE = 0.1  # repeated lines within ±10% of each other's duration share audio
 
 
 def normalize_api_key_base64(api_key: str) -> str:
@@ -40,8 +72,18 @@ def normalize_api_key_base64(api_key: str) -> str:
     return base64.b64encode(key.encode("utf-8")).decode("ascii")
 
 
+class RenderError(RuntimeError):
+    """A render failed. ``cue_index`` is set when a specific cue caused it."""
+
+    def __init__(self, message: str, cue_index: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.cue_index = cue_index
+
+
 @dataclass
 class Cue:
+    __slots__ = ("index", "start_ms", "end_ms", "text")
+
     index: int
     start_ms: int
     end_ms: int
@@ -52,37 +94,117 @@ class Cue:
         return max(1, self.end_ms - self.start_ms)
 
 
+@dataclass
+class SegmentResult:
+    index: int
+    start_ms: int
+    end_ms: int
+    duration_ms: int
+    raw_duration_sec: float
+    backend: str
+    cfg: Dict[str, Any] = field(default_factory=dict)
+    reused_from: Optional[int] = None  # cue whose synthesis this segment reuses
+    planned_speed: Optional[float] = None
+    predicted_sec: Optional[float] = None
+    cached: bool = False  # served from the segment cache, no synthesis
+
+    @property
+    def prediction_error_pct(self) -> Optional[float]:
+        if not self.predicted_sec or self.raw_duration_sec <= 0:
+            return None
+        return (self.raw_duration_sec - self.predicted_sec) / self.predicted_sec * 100
+
+    def to_report(self) -> Dict[str, Any]:
+        seg_report: Dict[str, Any] = {
+            "index": self.index,
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+            "duration_ms": self.duration_ms,
+            "raw_duration_sec": self.raw_duration_sec,
+            "backend": self.backend,
+        }
+        if self.backend == "noiz":
+            seg_report["voice_id"] = self.cfg.get("voice_id")
+            seg_report["reference_audio"] = self.cfg.get("reference_audio")
+            seg_report["emo"] = self.cfg.get("emo")
+        else:
+            seg_report["voice"] = self.cfg.get("voice")
+            seg_report["lang"] = self.cfg.get("lang")
+        if self.reused_from is not None:
+            seg_report["reused_from"] = self.reused_from
+        if self.cached:
+            seg_report["cached"] = True
+        if self.planned_speed is not None:
+            seg_report["planned_speed"] = self.planned_speed
+            seg_report["predicted_sec"] = round(self.predicted_sec or 0.0, 3)
+            error = self.prediction_error_pct
+            seg_report["prediction_error_pct"] = None if error is None else round(error, 1)
+        return seg_report
+
+
+@dataclass
+class RenderResult:
+    backend: str
+    sample_rate: int
+    total_ms: int
+    segments: List[SegmentResult]
+    pcm: Optional[bytes] = None
+    output: Optional[str] = None
+    synth_calls: Optional[int] = None
+    window_ms: Optional[Tuple[int, int]] = None
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for s in self.segments if s.cached)
+
+    @property
+    def calls_saved(self) -> int:
+        if self.synth_calls is None:
+            return 0
+        return len(self.segments) - self.synth_calls
+
+    def speed_plan(self) -> Optional[Dict[str, Any]]:
+        """How well planned speeds predicted the synthesized durations."""
+        planned = [s for s in self.segments if s.planned_speed is not None]
+        if not planned:
+            return None
+        errors = [abs(e) for e in (s.prediction_error_pct for s in planned) if e is not None]
+        return {
+            "planned": len(planned),
+            "mean_abs_error_pct": round(sum(errors) / len(errors), 1) if errors else None,
+            "max_abs_error_pct": round(max(errors), 1) if errors else None,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "output": self.output,
+            "backend": self.backend,
+            "sample_rate": self.sample_rate,
+            "total_ms": self.total_ms,
+            "synthesis_calls": self.synth_calls,
+            "calls_saved": self.calls_saved,
+            "cache_hits": self.cache_hits,
+            "speed_plan": self.speed_plan(),
+            "window_ms": list(self.window_ms) if self.window_ms else None,
+            "segments": [s.to_report() for s in self.segments],
+        }
+
+
 # ── SRT parsing ──────────────────────────────────────────────────────
 
 
-def parse_timestamp_ms(value: str) -> int:
-    match = TIMESTAMP_RE.match(value.strip())
-    if not match:
-        raise ValueError(f"Invalid SRT timestamp: {value}")
-    hh, mm, ss, ms = map(int, match.groups())
-    return ((hh * 60 + mm) * 60 + ss) * 1000 + ms
+def parse_srt_text(content: str) -> List[Cue]:
+    """Parse SRT text (see ``srt_cues.iter_srt``); cues without text are dropped."""
+    return _cues_from_rows(iter_srt(content.splitlines()))
 
 
 def parse_srt(path: Path) -> List[Cue]:
-    content = path.read_text(encoding="utf-8", errors="replace")
-    blocks = re.split(r"\n\s*\n", content.strip())
-    cues: List[Cue] = []
-    for block in blocks:
-        lines = [ln.rstrip() for ln in block.splitlines() if ln.strip()]
-        if len(lines) < 3:
-            continue
-        try:
-            idx = int(lines[0])
-        except ValueError:
-            continue
-        if "-->" not in lines[1]:
-            continue
-        start_raw, end_raw = [s.strip() for s in lines[1].split("-->", 1)]
-        start_ms = parse_timestamp_ms(start_raw)
-        end_ms = parse_timestamp_ms(end_raw)
-        text = "\n".join(lines[2:]).strip()
-        if text:
-            cues.append(Cue(index=idx, start_ms=start_ms, end_ms=end_ms, text=text))
+    with open_srt(path) as f:
+        return _cues_from_rows(iter_srt(f))
+
+
+def _cues_from_rows(rows: Iterator[Tuple[int, int, int, str]]) -> List[Cue]:
+    cues = [Cue(index, start_ms, end_ms, text) for index, start_ms, end_ms, text in rows if text]
     if not cues:
         raise ValueError("No valid cues parsed from SRT.")
     return cues
@@ -109,18 +231,60 @@ def resolve_segment_cfg(index: int, config: Dict[str, Any]) -> Dict[str, Any]:
     return merged
 
 
+def plan_dedup(
+    cues: Sequence[Cue],
+    keys: Sequence[Optional[str]],
+    tolerance: float = DEDUP_TOLERANCE,
+) -> List[List[int]]:
+    """Group cue positions that can share one synthesis.
+
+    ``keys[i]`` identifies what cue ``i`` would be synthesized from (text and
+    resolved cfg); ``None`` keeps the cue on its own. Cues with equal keys
+    are clustered by duration, each cluster spanning at most ``tolerance``
+    of its shortest cue. A group lists its (earliest) median-duration cue
+    first, the one to synthesize, then the rest in cue order. Groups are ordered by
+    their earliest cue.
+    """
+    by_key: Dict[str, List[int]] = {}
+    groups: List[List[int]] = []
+    for pos, key in enumerate(keys):
+        if key is None:
+            groups.append([pos])
+        else:
+            by_key.setdefault(key, []).append(pos)
+
+    for positions in by_key.values():
+        positions.sort(key=lambda p: cues[p].duration_ms)
+        cluster: List[int] = []
+        for pos in positions + [-1]:
+            if pos >= 0 and (
+                not cluster
+                or cues[pos].duration_ms <= cues[cluster[0]].duration_ms * (1 + tolerance)
+            ):
+                cluster.append(pos)
+                continue
+            median = cues[cluster[(len(cluster) - 1) // 2]].duration_ms
+            rep = min(p for p in cluster if cues[p].duration_ms == median)
+            groups.append([rep] + sorted(p for p in cluster if p != rep))
+            cluster = [pos]
+    groups.sort(key=min)
+    return groups
+
+
 # ── ffmpeg helpers ────────────────────────────────────────────────────
 
 
-def _run_ff(cmd: List[str]) -> None:
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+def _run_ff(cmd: List[str], input_bytes: Optional[bytes] = None) -> bytes:
+    proc = subprocess.run(cmd, input=input_bytes, capture_output=True)
     if proc.returncode != 0:
-        raise RuntimeError(f"ffmpeg failed: {' '.join(cmd)}\n{proc.stderr}")
+        stderr = proc.stderr.decode("utf-8", errors="replace")
+        raise RenderError(f"ffmpeg failed: {' '.join(cmd)}\n{stderr}")
+    return proc.stdout
 
 
 def ensure_ffmpeg() -> None:
     if not shutil.which("ffmpeg"):
-        raise RuntimeError("ffmpeg not found in PATH.")
+        raise RenderError("ffmpeg not found in PATH.")
 
 
 def probe_duration_ms(path: Path) -> float:
@@ -136,24 +300,113 @@ def probe_duration_ms(path: Path) -> float:
     return float(proc.stdout.strip()) * 1000
 
 
-def normalize_duration_pad_trim(inp: Path, outp: Path, target_ms: int) -> None:
-    """Pad short audio then trim to exact target duration (Noiz backend)."""
-    sec = target_ms / 1000.0
-    _run_ff([
-        "ffmpeg", "-y", "-i", str(inp),
-        "-af", f"apad=pad_dur={sec:.3f}",
-        "-t", f"{sec:.3f}", str(outp),
-    ])
+def _pcm_args(sample_rate: int) -> List[str]:
+    return ["-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate)]
 
 
-def normalize_duration_atempo(inp: Path, outp: Path, target_ms: int) -> None:
-    """Use atempo to stretch/compress audio to target duration (Kokoro backend)."""
-    actual_ms = probe_duration_ms(inp)
-    if actual_ms <= 0:
-        normalize_duration_pad_trim(inp, outp, target_ms)
+def decode_to_pcm(audio: bytes, sample_rate: int) -> bytes:
+    """Decode an encoded audio blob (wav/mp3/...) to s16le mono PCM."""
+    return _run_ff(
+        ["ffmpeg", "-v", "error", "-i", "pipe:0"] + _pcm_args(sample_rate) + ["pipe:1"],
+        audio,
+    )
+
+
+def decode_file_to_pcm(
+    path: Union[str, Path], sample_rate: int,
+    start_ms: Optional[int] = None, duration_ms: Optional[int] = None,
+) -> bytes:
+    """Decode (a span of) a media file to s16le mono PCM using input seeking."""
+    cmd = ["ffmpeg", "-v", "error"]
+    if start_ms is not None:
+        cmd += ["-ss", f"{start_ms / 1000.0:.3f}"]
+    if duration_ms is not None:
+        cmd += ["-t", f"{duration_ms / 1000.0:.3f}"]
+    cmd += ["-i", str(path), "-vn"] + _pcm_args(sample_rate) + ["pipe:1"]
+    return _run_ff(cmd)
+
+
+def iter_reference_slices(
+    path: Union[str, Path],
+    cues: Sequence[Cue],
+    sample_rate: int = REF_SLICE_SAMPLE_RATE,
+    block_ms: int = 1000,
+) -> Iterator[Tuple[Cue, bytes]]:
+    """Decode ``path`` once and yield ``(cue, WAV slice)`` in cue start order.
+
+    The track is streamed through a single ffmpeg process, starting at
+    the first cue, instead of one seek-and-decode per cue. Only audio from
+    the earliest pending cue onward is buffered, so memory is bounded by
+    the longest cue, and each slice is yielded as soon as the decode has
+    passed its end.
+    """
+    ordered = sorted(cues, key=lambda c: (c.start_ms, c.end_ms))
+    if not ordered:
         return
+    first_ms = ordered[0].start_ms
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-ss", f"{first_ms / 1000.0:.3f}", "-i", str(path), "-vn"]
+        + _pcm_args(sample_rate) + ["pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    block = sample_rate * block_ms // 1000 * SAMPLE_WIDTH
+    buf = bytearray()
+    buf_start = first_ms * sample_rate // 1000  # sample offset of buf[0] in the track
+    eof = False
+    i = 0
+    try:
+        while i < len(ordered):
+            cue = ordered[i]
+            start = cue.start_ms * sample_rate // 1000
+            end = cue.end_ms * sample_rate // 1000
+            if not eof and buf_start + len(buf) // SAMPLE_WIDTH < end:
+                chunk = proc.stdout.read(block)
+                if chunk:
+                    buf += chunk
+                    continue
+                eof = True
+                if proc.wait() != 0:
+                    stderr = proc.stderr.read().decode("utf-8", errors="replace")
+                    raise RenderError(f"ffmpeg failed to decode {path}:\n{stderr}")
+            lo = (start - buf_start) * SAMPLE_WIDTH
+            hi = min((end - buf_start) * SAMPLE_WIDTH, len(buf) // SAMPLE_WIDTH * SAMPLE_WIDTH)
+            yield cue, pcm_to_wav_bytes(bytes(buf[lo:max(lo, hi)]), sample_rate)
+            i += 1
+            if i < len(ordered):
+                drop = min(
+                    ordered[i].start_ms * sample_rate // 1000 - buf_start,
+                    len(buf) // SAMPLE_WIDTH,
+                )
+                if drop > 0:
+                    del buf[:drop * SAMPLE_WIDTH]
+                    buf_start += drop
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def pcm_to_wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(SAMPLE_WIDTH)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
 
-    ratio = actual_ms / target_ms
+
+def fit_duration_pad_trim(pcm: bytes, target_samples: int) -> bytes:
+    """Pad short audio with silence, or trim long audio, to an exact length (Noiz backend)."""
+    target_bytes = target_samples * SAMPLE_WIDTH
+    if len(pcm) >= target_bytes:
+        return pcm[:target_bytes]
+    return b"".join((pcm, bytes(target_bytes - len(pcm))))
+
+
+def atempo_chain(ratio: float) -> str:
     # atempo accepts 0.5–100.0; chain filters for extreme ratios
     filters = []
     r = ratio
@@ -164,44 +417,329 @@ def normalize_duration_atempo(inp: Path, outp: Path, target_ms: int) -> None:
         filters.append("atempo=0.5")
         r /= 0.5
     filters.append(f"atempo={r:.6f}")
+    return ",".join(filters)
+
+
+def fit_duration_atempo(pcm: bytes, sample_rate: int, target_samples: int) -> bytes:
+    """Use atempo to stretch/compress audio to an exact length (Kokoro backend)."""
+    actual_samples = len(pcm) // SAMPLE_WIDTH
+    if actual_samples <= 0:
+        return fit_duration_pad_trim(pcm, target_samples)
+    if actual_samples != target_samples:
+        pcm = _run_ff(
+            ["ffmpeg", "-v", "error"] + _pcm_args(sample_rate)
+            + ["-i", "pipe:0", "-af", atempo_chain(actual_samples / target_samples)]
+            + _pcm_args(sample_rate) + ["pipe:1"],
+            pcm,
+        )
+    return fit_duration_pad_trim(pcm, target_samples)
+
+
+# ── In-process mixing ─────────────────────────────────────────────────
+
+
+def _add_clip(dst: bytearray, pos: int, src: bytes) -> None:
+    """Add ``src`` samples into ``dst`` at byte offset ``pos``, clipping to int16."""
+    a = array("h")
+    a.frombytes(bytes(dst[pos:pos + len(src)]))
+    b = array("h")
+    b.frombytes(src)
+    if sys.byteorder != "little":
+        a.byteswap()
+        b.byteswap()
+    out = array("h", (max(-32768, min(32767, x + y)) for x, y in zip(a, b)))
+    if sys.byteorder != "little":
+        out.byteswap()
+    dst[pos:pos + len(src)] = out.tobytes()
+
+
+def mix_segments(placed: Sequence[Tuple[int, bytes]], total_samples: int) -> bytearray:
+    """Place PCM segments at their start sample and sum them into one track.
+
+    Non-overlapping spans are copied directly; only the samples where two
+    segments overlap are summed (with int16 clipping), so the common case
+    of disjoint cues costs one slice assignment per segment.
+    """
+    buf = bytearray(total_samples * SAMPLE_WIDTH)
+    covered_end = 0
+    for start, pcm in sorted(placed, key=lambda p: p[0]):
+        pos = start * SAMPLE_WIDTH
+        end = min(pos + len(pcm), len(buf))
+        if end <= pos:
+            continue
+        pcm = pcm[:end - pos]
+        overlap_end = min(end, covered_end)
+        if overlap_end > pos:
+            _add_clip(buf, pos, pcm[:overlap_end - pos])
+            buf[overlap_end:end] = pcm[overlap_end - pos:]
+        else:
+            buf[pos:end] = pcm
+        covered_end = max(covered_end, end)
+    return buf
 
-    _run_ff([
-        "ffmpeg", "-y", "-i", str(inp),
-        "-af", ",".join(filters),
-        "-t", f"{target_ms / 1000.0:.3f}", str(outp),
-    ])
 
+# s16le mono samples: in memory, a view into a segment store, or a raw file
+PcmSource = Union[bytes, memoryview, Path]
 
-def delay_segment(inp: Path, outp: Path, start_ms: int) -> None:
-    _run_ff([
-        "ffmpeg", "-y", "-i", str(inp),
-        "-af", f"adelay={start_ms}:all=1", str(outp),
-    ])
 
+def _slot_key(pos: int) -> str:
+    """Segment store key of the fitted PCM for the cue at ``pos``."""
+    return f"cue/{pos}"
 
-def mix_all(inputs: List[Path], outp: Path, total_ms: int) -> None:
-    if not inputs:
-        raise ValueError("No segments to mix.")
-    cmd = ["ffmpeg", "-y"]
-    for p in inputs:
-        cmd += ["-i", str(p)]
-    cmd += [
-        "-filter_complex",
-        f"amix=inputs={len(inputs)}:duration=longest:dropout_transition=0",
-        "-t", f"{total_ms / 1000.0:.3f}", str(outp),
-    ]
-    _run_ff(cmd)
+
+@contextlib.contextmanager
+def _scratch_store(store: Optional[SegmentStore]) -> Iterator[SegmentStore]:
+    """``store``, or a temporary one removed on exit."""
+    if store is not None:
+        yield store
+        return
+    with tempfile.TemporaryDirectory(prefix="render-") as tmp:
+        yield SegmentStore(tmp)
+
+
+def _source_size(src: PcmSource) -> int:
+    return src.stat().st_size if isinstance(src, Path) else len(src)
+
+
+def _read_source(src: PcmSource, offset: int, size: int) -> bytes:
+    if isinstance(src, Path):
+        with src.open("rb") as f:
+            f.seek(offset)
+            return f.read(size)
+    return src[offset:offset + size]
+
+
+def iter_mix_blocks(
+    placed: Sequence[Tuple[int, PcmSource]],
+    total_samples: int,
+    block_samples: int = MIX_BLOCK_SAMPLES,
+) -> Iterator[bytes]:
+    """Yield the mixed track ``block_samples`` at a time; same samples as ``mix_segments``.
+
+    Segments sorted by start sample serve as the interval index: a cursor
+    admits each segment once a block reaches its start and it is dropped
+    once a block passes its end, so a block only reads and sums the
+    segments overlapping it. Segments given as a ``Path`` are read from
+    disk one block-sized slice at a time, so memory stays constant however
+    long the timeline is.
+    """
+    spans = sorted(
+        (
+            (start * SAMPLE_WIDTH, start * SAMPLE_WIDTH + _source_size(src), src)
+            for start, src in placed
+        ),
+        key=lambda span: span[0],
+    )
+    total = total_samples * SAMPLE_WIDTH
+    step = block_samples * SAMPLE_WIDTH
+    active: List[Tuple[int, int, PcmSource]] = []
+    cursor = 0
+    for lo in range(0, total, step):
+        hi = min(lo + step, total)
+        while cursor < len(spans) and spans[cursor][0] < hi:
+            active.append(spans[cursor])
+            cursor += 1
+        active = [span for span in active if span[1] > lo]
+        pieces = []
+        for start, end, src in active:
+            a, b = max(start, lo), min(end, hi)
+            if b > a:
+                pieces.append(((a - lo) // SAMPLE_WIDTH, _read_source(src, a - start, b - a)))
+        yield mix_segments(pieces, (hi - lo) // SAMPLE_WIDTH)
+
+
+def _write_wav_blocks(
+    f: BinaryIO, blocks: Iterable[bytes], total_samples: int, sample_rate: int
+) -> None:
+    # nframes is set up front so the header never needs patching: the
+    # writer can be a pipe.
+    with wave.open(f, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(SAMPLE_WIDTH)
+        w.setframerate(sample_rate)
+        w.setnframes(total_samples)
+        for block in blocks:
+            w.writeframesraw(block)
+
+
+def _encode_blocks(
+    blocks: Iterable[bytes],
+    sample_rate: int,
+    out_args: List[str],
+    sink: Optional[BinaryIO] = None,
+) -> None:
+    """Pipe PCM blocks through one ffmpeg encoder; its stdout goes to ``sink``."""
+    cmd = ["ffmpeg", "-y", "-v", "error"] + _pcm_args(sample_rate) + ["-i", "pipe:0"] + out_args
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if sink is not None else subprocess.DEVNULL,
+            stderr=err,
+        )
+        pump: Optional[threading.Thread] = None
+        if sink is not None:
+            # Drain the encoder concurrently so neither pipe can fill up.
+            pump = threading.Thread(target=shutil.copyfileobj, args=(proc.stdout, sink))
+            pump.start()
+        try:
+            try:
+                for block in blocks:
+                    proc.stdin.write(block)
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its status and stderr say why
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            if pump is not None:
+                pump.join()
+                proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace")
+            raise RenderError(f"ffmpeg failed: {' '.join(cmd)}\n{stderr}")
+
+
+def write_audio_blocks(
+    blocks: Iterable[bytes],
+    total_samples: int,
+    sample_rate: int,
+    output: Union[str, Path, BinaryIO],
+    fmt: Optional[str] = None,
+) -> None:
+    """Write a track arriving as PCM blocks, holding only one block at a time.
+
+    ``blocks`` must add up to ``total_samples`` (the WAV header is written
+    first). Formats and ``fmt`` defaults are as for ``write_audio``.
+    """
+    if isinstance(output, (str, Path)):
+        out = Path(output)
+        fmt = fmt or out.suffix.lstrip(".").lower() or "wav"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "wav":
+            with out.open("wb") as f:
+                _write_wav_blocks(f, blocks, total_samples, sample_rate)
+        else:
+            _encode_blocks(blocks, sample_rate, [str(out)])
+        return
+    fmt = fmt or "wav"
+    if fmt == "wav":
+        _write_wav_blocks(output, blocks, total_samples, sample_rate)
+    else:
+        _encode_blocks(blocks, sample_rate, ["-f", fmt, "pipe:1"], output)
+
+
+def write_audio(
+    pcm: bytes,
+    sample_rate: int,
+    output: Union[str, Path, BinaryIO],
+    fmt: Optional[str] = None,
+) -> None:
+    """Write PCM to a path or a binary file-like object.
+
+    WAV is written directly; other formats are encoded by piping the PCM
+    through ffmpeg. ``fmt`` defaults to the path suffix, or ``wav`` for
+    file-like objects.
+    """
+    view = memoryview(pcm)
+    step = MIX_BLOCK_SAMPLES * SAMPLE_WIDTH
+    write_audio_blocks(
+        (view[pos:pos + step] for pos in range(0, len(view), step)),
+        len(pcm) // SAMPLE_WIDTH, sample_rate, output, fmt,
+    )
+
+
+# ── Windowed re-render ───────────────────────────────────────────────
+
+
+def cues_in_window(cues: Sequence[Cue], from_ms: int, to_ms: int) -> Tuple[List[Cue], int, int]:
+    """Cues to re-render for [from_ms, to_ms) and the span (lo_ms, hi_ms) they cover.
+
+    Cues overlapping the window are re-rendered whole, so the span grows to
+    their edges, and cues overlapping the grown span join in turn: every
+    sample in the span is then the sum of exactly the cues returned.
+    """
+    lo, hi = from_ms, to_ms
+    while True:
+        picked = [c for c in cues if c.start_ms < hi and c.end_ms > lo]
+        grown = (min([lo] + [c.start_ms for c in picked]), max([hi] + [c.end_ms for c in picked]))
+        if grown == (lo, hi):
+            return picked, lo, hi
+        lo, hi = grown
+
+
+def _wav_data_chunk(f: BinaryIO) -> Tuple[int, int, bool]:
+    """(offset, size, is_last_chunk) of the data chunk of a RIFF/WAVE file."""
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise RenderError("Not a RIFF/WAVE file.")
+    file_size = f.seek(0, io.SEEK_END)
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        chunk_id, size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"data":
+            # Streamed WAVs may carry a placeholder size.
+            size = min(size, file_size - pos - 8)
+            return pos + 8, size, pos + 8 + size >= file_size
+        pos += 8 + size + (size & 1)
+    raise RenderError("WAV file has no data chunk.")
+
+
+def splice_wav(
+    path: Path, pcm: bytes, start_sample: int, sample_rate: int,
+    total_samples: Optional[int] = None,
+) -> None:
+    """Overwrite samples of a 16-bit mono WAV in place, growing it if needed.
+
+    With ``total_samples``, audio past that point (left by cues since
+    removed or shortened) is cut off, so the file ends where the timeline
+    now does.
+    """
+    with wave.open(str(path), "rb") as w:
+        if (w.getnchannels(), w.getsampwidth(), w.getframerate()) != (1, SAMPLE_WIDTH, sample_rate):
+            raise RenderError(
+                f"{path} is not {sample_rate} Hz 16-bit mono; render it in full instead."
+            )
+    with path.open("r+b") as f:
+        offset, size, last = _wav_data_chunk(f)
+        pos = start_sample * SAMPLE_WIDTH
+        end = pos + len(pcm)
+        if end > size and not last:
+            raise RenderError(f"The window runs past the end of {path}; render it in full instead.")
+        new_size = max(size, end)
+        if total_samples is not None:
+            new_size = min(new_size, total_samples * SAMPLE_WIDTH)
+        if new_size < size and not last:
+            raise RenderError(f"{path} has chunks after its audio; render it in full instead.")
+        if pos > size:
+            f.seek(offset + size)
+            f.write(bytes(pos - size))
+        f.seek(offset + pos)
+        f.write(pcm)
+        if new_size < size:
+            f.truncate(offset + new_size)
+        if new_size != size:
+            f.seek(4)
+            f.write(struct.pack("<I", offset + new_size - 8))
+            f.seek(offset - 4)
+            f.write(struct.pack("<I", new_size))
 
 
 # ── Noiz backend ─────────────────────────────────────────────────────
 
 
 def _noiz_emotion_enhance(
-    base_url: str, api_key: str, text: str, timeout: int
+    session: Any, base_url: str, api_key: str, text: str, timeout: int
 ) -> str:
-    import requests  # noqa: delayed import so kokoro path doesn't need requests
-
-    resp = requests.post(
+    resp = session.post(
         f"{base_url.rstrip('/')}/emotion-enhance",
         headers={"Authorization": api_key, "Content-Type": "application/json"},
         json={"text": text},
@@ -221,43 +759,46 @@ def _bool_form(v: Any) -> str:
     return "true" if bool(v) else "false"
 
 
-def _resolve_reference_audio(ref: str, timeout: int) -> Tuple[Path, Optional[Path]]:
-    """Resolve reference_audio to a path. If ref is a URL, download to temp file.
-    Returns (path_to_use, temp_path_to_cleanup_or_None)."""
-    if ref.startswith("http://") or ref.startswith("https://"):
-        import requests
-        tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        tmp.close()
-        r = requests.get(ref, timeout=timeout)
-        r.raise_for_status()
-        Path(tmp.name).write_bytes(r.content)
-        return Path(tmp.name), Path(tmp.name)
+def _resolve_reference_audio(ref: str, timeout: int) -> Path:
+    """Resolve reference_audio to a path. URLs go through the shared on-disk
+    cache, so repeated cues with the same URL download it at most once."""
+    from ref_cache import fetch as fetch_reference_audio, is_url
+
+    if is_url(ref):
+        return fetch_reference_audio(ref, timeout=timeout)
     p = Path(ref)
     if not p.exists():
         raise FileNotFoundError(f"reference_audio not found: {ref}")
-    return p, None
+    return p
+
+
+def needs_reference_slice(cfg: Dict[str, Any]) -> bool:
+    """True when a cue has no voice of its own and should clone from the source track."""
+    return not cfg.get("voice_id") and not cfg.get("reference_audio")
 
 
 def _noiz_tts(
+    session: Any,
     base_url: str,
     api_key: str,
     cue: Cue,
     cfg: Dict[str, Any],
     output_format: str,
     timeout: int,
-    out_path: Path,
-) -> float:
-    import requests
-
+    ref_audio: Optional[bytes] = None,
+    force_duration: bool = True,
+) -> Tuple[bytes, float]:
+    """Synthesize one cue. Returns (encoded audio, X-Audio-Duration or -1)."""
     url = f"{base_url.rstrip('/')}/text-to-speech"
     payload: Dict[str, str] = {
         "text": cue.text,
-        "duration": f"{cue.duration_ms / 1000.0:.3f}",
         "output_format": output_format,
     }
-    for field in ("voice_id", "quality_preset", "speed", "target_lang"):
-        if field in cfg and cfg[field] is not None:
-            payload[field] = str(cfg[field])
+    if force_duration:
+        payload["duration"] = f"{cue.duration_ms / 1000.0:.3f}"
+    for field_name in ("voice_id", "quality_preset", "speed", "target_lang"):
+        if field_name in cfg and cfg[field_name] is not None:
+            payload[field_name] = str(cfg[field_name])
     if "similarity_enh" in cfg:
         payload["similarity_enh"] = _bool_form(cfg["similarity_enh"])
     if "save_voice" in cfg:
@@ -267,14 +808,15 @@ def _noiz_tts(
         payload["emo"] = emo if isinstance(emo, str) else json.dumps(emo)
 
     files = None
-    ref_cleanup: Optional[Path] = None
     ref = cfg.get("reference_audio")
-    if ref:
-        ref_path, ref_cleanup = _resolve_reference_audio(ref, timeout)
+    if ref_audio is not None:
+        files = {"file": ("reference.wav", ref_audio, "application/octet-stream")}
+    elif ref:
+        ref_path = _resolve_reference_audio(ref, timeout)
         files = {
             "file": (
                 ref_path.name,
-                ref_path.open("rb"),
+                ref_path.read_bytes(),
                 "application/octet-stream",
             )
         }
@@ -283,25 +825,17 @@ def _noiz_tts(
             f"Cue {cue.index}: either voice_id or reference_audio required."
         )
 
-    try:
-        resp = requests.post(
-            url, headers={"Authorization": api_key},
-            data=payload, files=files, timeout=timeout,
-        )
-    finally:
-        if files and files["file"][1]:
-            files["file"][1].close()
-        if ref_cleanup is not None:
-            ref_cleanup.unlink(missing_ok=True)
-
+    resp = session.post(
+        url, headers={"Authorization": api_key},
+        data=payload, files=files, timeout=timeout,
+    )
     if resp.status_code != 200:
         raise RuntimeError(
             f"/text-to-speech cue {cue.index}: "
             f"status={resp.status_code}, body={resp.text}"
         )
-    out_path.write_bytes(resp.content)
     dur_h = resp.headers.get("X-Audio-Duration")
-    return float(dur_h) if dur_h else -1.0
+    return resp.content, float(dur_h) if dur_h else -1.0
 
 
 # ── Kokoro backend ───────────────────────────────────────────────────
@@ -309,23 +843,21 @@ def _noiz_tts(
 
 def _ensure_kokoro() -> None:
     if not shutil.which("kokoro-tts"):
-        raise RuntimeError("kokoro-tts CLI not found.")
+        raise RenderError("kokoro-tts CLI not found.")
 
 
 def _kokoro_tts(
     cue: Cue,
     cfg: Dict[str, Any],
     output_format: str,
-    out_path: Path,
-) -> float:
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".txt", delete=False, encoding="utf-8"
-    ) as tmp:
-        tmp.write(cue.text)
-        tmp_path = tmp.name
-
-    try:
-        cmd = ["kokoro-tts", tmp_path, str(out_path)]
+) -> bytes:
+    """Synthesize one cue with the kokoro-tts CLI, which only speaks files."""
+    with tempfile.TemporaryDirectory(prefix="kokoro_") as tmp_dir:
+        in_path = Path(tmp_dir) / "input.txt"
+        out_path = Path(tmp_dir) / f"output.{output_format}"
+        in_path.write_text(cue.text, encoding="utf-8")
+
+        cmd = ["kokoro-tts", str(in_path), str(out_path)]
         voice = cfg.get("voice")
         if voice:
             cmd += ["--voice", str(voice)]
@@ -342,18 +874,565 @@ def _kokoro_tts(
             raise RuntimeError(
                 f"kokoro-tts failed for cue {cue.index}: {proc.stderr}"
             )
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
+        if not out_path.exists():
+            raise RuntimeError(f"kokoro-tts produced no output for cue {cue.index}")
+        return out_path.read_bytes()
+
+
+# ── Renderer ─────────────────────────────────────────────────────────
+
+
+class Renderer:
+    """Reusable render context for one backend configuration.
+
+    Holds the HTTP session and the synthesis worker pool, so repeated
+    renders in one process share connections and threads. Safe to use
+    from several threads; call ``close()`` (or use it as a context
+    manager) to release the pool.
+    """
+
+    def __init__(
+        self,
+        backend: str = "kokoro",
+        api_key: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: int = 120,
+        workers: int = DEFAULT_WORKERS,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        planner: Optional[Any] = None,
+        segment_cache: Optional[Any] = None,
+    ) -> None:
+        if backend not in ("kokoro", "noiz", "noiz-guest"):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == "noiz" and not api_key:
+            raise ValueError("api_key is required for noiz backend.")
+        self.backend = backend
+        self.api_key = normalize_api_key_base64(api_key) if api_key else None
+        self.base_url = base_url
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.sample_rate = sample_rate
+        # duration_planner.DurationPlanner: learns speaking rates, picks speeds.
+        self.planner = planner
+        # segment_cache.SegmentCache: cues measured by to-srt skip synthesis.
+        self.segment_cache = segment_cache
+        self._lock = threading.Lock()
+        self._session: Any = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def session(self) -> Any:
+        with self._lock:
+            if self._session is None:
+                import requests  # noqa: delayed import so kokoro path doesn't need requests
+
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.workers
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="render"
+                )
+            return self._pool
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        if self.planner is not None:
+            self.planner.save()
+        if self.segment_cache is not None:
+            self.segment_cache.flush()
+
+    def check_ready(self) -> None:
+        ensure_ffmpeg()
+        if self.backend == "kokoro":
+            _ensure_kokoro()
+
+    def synthesize(
+        self,
+        cue: Cue,
+        cfg: Dict[str, Any],
+        output_format: str = "wav",
+        ref_audio: Optional[bytes] = None,
+        force_duration: bool = True,
+    ) -> Tuple[bytes, float]:
+        """Synthesize one cue. Returns (encoded audio, raw duration in seconds).
+
+        With ``force_duration`` the Noiz backend is asked to fit the cue's
+        duration; otherwise the text is spoken at its natural length.
+        """
+        if self.backend == "noiz":
+            return _noiz_tts(
+                self.session, self.base_url, self.api_key or "", cue, cfg,
+                output_format, self.timeout, ref_audio, force_duration,
+            )
+        if self.backend == "noiz-guest":
+            from noiz_tts import request_guest
+
+            if not cfg.get("voice_id"):
+                raise ValueError(f"Cue {cue.index}: voice_id is required in guest mode.")
+            return request_guest(
+                self.base_url, cue.text, str(cfg["voice_id"]), output_format,
+                cfg.get("speed") or 1.0, self.timeout, self.session,
+            )
+        return _kokoro_tts(cue, cfg, output_format), -1.0
+
+    def synthesize_pcm(
+        self,
+        cue: Cue,
+        cfg: Dict[str, Any],
+        output_format: str = "wav",
+    ) -> bytes:
+        """Synthesize ``cue.text`` at its natural length and decode it to PCM."""
+        audio, _ = self.synthesize(cue, cfg, output_format, force_duration=False)
+        pcm = decode_to_pcm(audio, self.sample_rate)
+        self._observe_rate(cue.text, cfg, len(pcm) / SAMPLE_WIDTH / self.sample_rate)
+        return pcm
+
+    def _observe_rate(self, text: str, cfg: Dict[str, Any], natural_sec: float) -> None:
+        if self.planner is not None:
+            from duration_planner import voice_key
+
+            self.planner.observe(
+                voice_key(self.backend, cfg), text, float(cfg.get("speed") or 1.0), natural_sec
+            )
+
+    def _render_group(
+        self,
+        cues: Sequence[Cue],
+        cfg: Dict[str, Any],
+        auto_emotion: bool,
+        ref_audio_track: Optional[str],
+        output_format: str,
+    ) -> List[Tuple[int, bytes, SegmentResult]]:
+        cue = cues[0]
+        ref_audio = None
+        if ref_audio_track and needs_reference_slice(cfg):
+            ref_audio = pcm_to_wav_bytes(
+                decode_file_to_pcm(
+                    ref_audio_track, REF_SLICE_SAMPLE_RATE, cue.start_ms, cue.duration_ms
+                ),
+                REF_SLICE_SAMPLE_RATE,
+            )
+        return self.render_group(
+            cues, cfg, ref_audio, auto_emotion, output_format,
+            ref_label=f"{ref_audio_track}@{cue.start_ms}ms" if ref_audio is not None else None,
+        )
+
+    def render_cue(
+        self,
+        cue: Cue,
+        cfg: Dict[str, Any],
+        ref_audio: Optional[bytes] = None,
+        auto_emotion: bool = False,
+        output_format: str = "wav",
+        ref_label: Optional[str] = None,
+    ) -> Tuple[int, bytes, SegmentResult]:
+        """Synthesize one cue fitted to its duration.
+
+        ``ref_audio`` is a WAV clip used as the voice reference (see
+        ``iter_reference_slices``); ``ref_label`` names it in the report.
+        Returns (start sample, PCM, segment report).
+        """
+        return self.render_group(
+            [cue], cfg, ref_audio, auto_emotion, output_format, ref_label
+        )[0]
+
+    def _synthesize_first(
+        self,
+        cue: Cue,
+        cfg: Dict[str, Any],
+        ref_audio: Optional[bytes],
+        auto_emotion: bool,
+        output_format: str,
+        tolerance: float,
+    ) -> Tuple[bytes, float, Optional[Any]]:
+        """Synthesize a group's first cue. Returns (PCM, raw duration, speed plan)."""
+        text = cue.text
+        if self.backend == "noiz" and auto_emotion:
+            text = _noiz_emotion_enhance(
+                self.session, self.base_url, self.api_key or "", cue.text, self.timeout
+            )
+        synth_cue = Cue(cue.index, cue.start_ms, cue.end_ms, text)
+
+        # An explicit speed in the voice map wins over the planner.
+        plan = None
+        synth_cfg = cfg
+        if self.planner is not None:
+            from duration_planner import voice_key
+
+            if cfg.get("speed") is None:
+                plan = self.planner.plan(
+                    voice_key(self.backend, cfg), cue.text, cue.duration_ms / 1000.0
+                )
+            if plan is not None:
+                synth_cfg = dict(cfg, speed=plan.speed)
+
+        audio, api_dur = self.synthesize(synth_cue, synth_cfg, output_format, ref_audio)
+        pcm = decode_to_pcm(audio, self.sample_rate)
+        if self.backend == "noiz":
+            # Already forced to the cue's duration by the API. A response that
+            # still overran it is as long as the line needs at this speed.
+            pcm = fit_duration_pad_trim(pcm, cue.duration_ms * self.sample_rate // 1000)
+            if api_dur > cue.duration_ms / 1000.0 * (1 + tolerance):
+                self._observe_rate(cue.text, synth_cfg, api_dur)
+        else:
+            api_dur = len(pcm) / SAMPLE_WIDTH / self.sample_rate
+            self._observe_rate(cue.text, synth_cfg, api_dur)
+        return pcm, api_dur, plan
+
+    def render_group(
+        self,
+        cues: Sequence[Cue],
+        cfg: Dict[str, Any],
+        ref_audio: Optional[bytes] = None,
+        auto_emotion: bool = False,
+        output_format: str = "wav",
+        ref_label: Optional[str] = None,
+    ) -> List[Tuple[int, bytes, SegmentResult]]:
+        """Synthesize ``cues[0]`` once and fit the audio to every cue in ``cues``.
+
+        The cues must share text and cfg (see ``plan_dedup``); the others are
+        time-stretched from the first one's audio. With a segment cache, a
+        first cue measured by ``to-srt --measure`` is served from it instead
+        of being synthesized. Returns one ``render_cue`` result per cue.
+        """
+        first = cues[0]
+        tolerance = self.planner.tolerance if self.planner is not None else 0.0
+        plan: Optional[Any] = None
+        pcm: Optional[bytes] = None
+        if self.segment_cache is not None and ref_audio is None:
+            from segment_cache import segment_key
+
+            pcm = self.segment_cache.get(segment_key(
+                self.backend, cfg, first.text, first.duration_ms, self.sample_rate, auto_emotion
+            ))
+        cached = pcm is not None
+        if pcm is not None:
+            api_dur = len(pcm) / SAMPLE_WIDTH / self.sample_rate
+        else:
+            pcm, api_dur, plan = self._synthesize_first(
+                first, cfg, ref_audio, auto_emotion, output_format, tolerance
+            )
+
+        report_cfg = dict(cfg)
+        if ref_audio is not None:
+            report_cfg["reference_audio"] = ref_label or "<reference clip>"
+        results = []
+        for cue in cues:
+            target = cue.duration_ms * self.sample_rate // 1000
+            # Only fresh Noiz audio is already cue-length; a cache hit has the
+            # natural length measured by ``to-srt --measure``.
+            if self.backend == "noiz" and not cached and cue.duration_ms == first.duration_ms:
+                fitted = pcm
+            elif (
+                (cached or self.backend != "noiz")
+                and target * (1 - tolerance) <= len(pcm) // SAMPLE_WIDTH <= target
+            ):
+                # Close enough and not too long: pad with silence instead of stretching.
+                fitted = fit_duration_pad_trim(pcm, target)
+            else:
+                fitted = fit_duration_atempo(pcm, self.sample_rate, target)
+            seg = SegmentResult(
+                index=cue.index,
+                start_ms=cue.start_ms,
+                end_ms=cue.end_ms,
+                duration_ms=cue.duration_ms,
+                raw_duration_sec=api_dur,
+                backend=self.backend,
+                cfg=report_cfg,
+                reused_from=None if cue is first else first.index,
+                cached=cached,
+            )
+            if plan is not None and cue is first:
+                seg.planned_speed = plan.speed
+                seg.predicted_sec = plan.predicted_sec
+            results.append((cue.start_ms * self.sample_rate // 1000, fitted, seg))
+        return results
+
+    def render(
+        self,
+        cues: Sequence[Cue],
+        voice_map: Dict[str, Any],
+        output: Union[str, Path, BinaryIO, None] = None,
+        output_format: Optional[str] = None,
+        synth_format: str = "wav",
+        auto_emotion: bool = False,
+        ref_audio_track: Optional[str] = None,
+        dedup: bool = True,
+        segment_store: Optional[SegmentStore] = None,
+    ) -> RenderResult:
+        """Render cues to one timeline track.
+
+        With ``output=None`` the mixed PCM is returned in ``result.pcm``;
+        otherwise it is written to ``output`` (a path or binary file-like
+        object) as ``output_format``, and each fitted segment goes to
+        ``segment_store`` (a temporary one if not given) as soon as it is
+        rendered, so memory does not grow with the timeline. With ``dedup``,
+        repeated lines with the same cfg and a similar duration are
+        synthesized once (see ``plan_dedup``). Raises ``RenderError`` on
+        failure.
+        """
+        if not cues:
+            raise RenderError("No cues to render.")
+        total_ms = max(c.end_ms for c in cues)
+        total_samples = total_ms * self.sample_rate // 1000
+        if output is None:
+            placed, segments, synth_calls = self._render_placed(
+                cues, voice_map, synth_format, auto_emotion, ref_audio_track, dedup
+            )
+            pcm: Optional[bytes] = bytes(mix_segments(placed, total_samples))
+        else:
+            with _scratch_store(segment_store) as store:
+                placed, segments, synth_calls = self._render_placed(
+                    cues, voice_map, synth_format, auto_emotion, ref_audio_track, dedup,
+                    store=store,
+                )
+                # Mixed block by block from the store straight into the
+                # writer: no full-length buffer, whatever the timeline length.
+                write_audio_blocks(
+                    iter_mix_blocks(placed, total_samples), total_samples,
+                    self.sample_rate, output, output_format,
+                )
+                del placed
+            pcm = None
+        return RenderResult(
+            backend=self.backend,
+            sample_rate=self.sample_rate,
+            total_ms=total_ms,
+            segments=segments,
+            pcm=pcm,
+            output=str(output) if isinstance(output, (str, Path)) else None,
+            synth_calls=synth_calls,
+        )
 
-    if out_path.exists():
-        return probe_duration_ms(out_path) / 1000.0
-    raise RuntimeError(f"kokoro-tts produced no output for cue {cue.index}")
+    def render_window(
+        self,
+        cues: Sequence[Cue],
+        voice_map: Dict[str, Any],
+        output: Union[str, Path],
+        from_ms: int,
+        to_ms: int,
+        synth_format: str = "wav",
+        auto_emotion: bool = False,
+        ref_audio_track: Optional[str] = None,
+        dedup: bool = True,
+        segment_store: Optional[SegmentStore] = None,
+    ) -> RenderResult:
+        """Re-render only the cues around [from_ms, to_ms) into an existing output.
+
+        The span actually replaced is chosen by ``cues_in_window``; only its
+        cues are rendered, and it is mixed on its own and spliced into the
+        WAV ``output`` with ``splice_wav``. Repeated lines are grouped over all ``cues``, as in
+        ``render``, so a window cue reuses the same synthesis it would in a
+        full render even when that cue lies outside the window. Cues removed
+        from the SRT leave silence, and audio past the new last cue is cut.
+        Segments go through ``segment_store`` as in ``render``.
+        ``result.window_ms`` is the span replaced.
+        """
+        out = Path(output)
+        if out.suffix.lower() != ".wav":
+            # Splicing into compressed audio is never sample-exact, and
+            # re-encoding the whole file is a full render's cost anyway.
+            raise RenderError(f"Only WAV outputs can be patched; render {out.name} in full.")
+        if not out.is_file():
+            raise RenderError(f"{out} does not exist; render it in full before patching a window.")
+        if to_ms <= from_ms:
+            raise RenderError("The window end must be after its start.")
+        picked, lo, hi = cues_in_window(cues, from_ms, to_ms)
+        # A window running past the last cue stops there, as a full render would.
+        hi = min(hi, max([lo] + [c.end_ms for c in cues]))
+        placed: List[Tuple[int, PcmSource]] = []
+        segments: List[SegmentResult] = []
+        synth_calls = 0
+        base = lo * self.sample_rate // 1000
+        with _scratch_store(segment_store) as store:
+            if picked:
+                in_window = {id(c) for c in picked}
+                placed, segments, synth_calls = self._render_placed(
+                    cues, voice_map, synth_format, auto_emotion, ref_audio_track, dedup,
+                    only=[pos for pos, c in enumerate(cues) if id(c) in in_window],
+                    store=store,
+                )
+            span = mix_segments(
+                [(start - base, pcm) for start, pcm in placed],
+                hi * self.sample_rate // 1000 - base,
+            )
+            del placed
+        total_ms = max([hi] + [c.end_ms for c in cues])
+        splice_wav(out, span, base, self.sample_rate, total_ms * self.sample_rate // 1000)
+        return RenderResult(
+            backend=self.backend,
+            sample_rate=self.sample_rate,
+            total_ms=total_ms,
+            segments=segments,
+            output=str(out),
+            synth_calls=synth_calls,
+            window_ms=(lo, hi),
+        )
+
+    def _render_placed(
+        self,
+        cues: Sequence[Cue],
+        voice_map: Dict[str, Any],
+        synth_format: str,
+        auto_emotion: bool,
+        ref_audio_track: Optional[str],
+        dedup: bool,
+        only: Optional[Sequence[int]] = None,
+        store: Optional[SegmentStore] = None,
+    ) -> Tuple[List[Tuple[int, PcmSource]], List[SegmentResult], int]:
+        """Synthesize and fit every cue, or only the cue positions in ``only``.
+
+        Dedup groups are planned over all ``cues`` either way; a group with a
+        cue in ``only`` is still synthesized from its own first cue. Returns
+        (start sample, PCM) pairs and results for the rendered cues, in cue
+        order, and the number of synthesis calls made. With ``store``, each
+        worker puts its fitted segments there as its group finishes and the
+        PCM returned is zero-copy views into the store.
+        """
+        self.check_ready()
+
+        cfgs = [resolve_segment_cfg(cue.index, voice_map) for cue in cues]
+        keys: List[Optional[str]] = [None] * len(cues)
+        if dedup:
+            for pos, (cue, cfg) in enumerate(zip(cues, cfgs)):
+                # Cues cloning their own slice of the source track never match.
+                if not (ref_audio_track and needs_reference_slice(cfg)):
+                    keys[pos] = json.dumps([cue.text, cfg], sort_keys=True)
+        groups = plan_dedup(cues, keys)
+        wanted = set(range(len(cues)) if only is None else only)
+        if only is not None:
+            groups = [
+                group[:1] + [p for p in group[1:] if p in wanted]
+                for group in groups if wanted.intersection(group)
+            ]
+
+        def render_group(group: List[int]) -> List[Tuple[int, Any, SegmentResult]]:
+            results = self._render_group(
+                [cues[p] for p in group], cfgs[group[0]],
+                auto_emotion, ref_audio_track, synth_format,
+            )
+            if store is None:
+                return results
+            spilled = []
+            for pos, (start, pcm, seg) in zip(group, results):
+                if pos in wanted:
+                    store.put(_slot_key(pos), pcm)
+                spilled.append((start, None, seg))
+            return spilled
+
+        jobs = [self.pool.submit(render_group, group) for group in groups]
+        rendered: List[Optional[Tuple[int, Any, SegmentResult]]] = [None] * len(cues)
+        synth_calls = 0
+        try:
+            for group, job in zip(groups, jobs):
+                first = cues[group[0]]
+                try:
+                    results = job.result()
+                except RenderError as exc:
+                    if exc.cue_index is None:
+                        exc.cue_index = first.index
+                    raise
+                except Exception as exc:
+                    raise RenderError(f"cue {first.index}: {exc}", first.index) from exc
+                synth_calls += not results[0][2].cached
+                for pos, item in zip(group, results):
+                    if pos in wanted:
+                        rendered[pos] = item
+        except BaseException:
+            for job in jobs:
+                job.cancel()
+            raise
+
+        if store is not None:
+            live = [_slot_key(pos) for pos in sorted(wanted)]
+            # Slots rewritten by earlier renders into the same store.
+            if store.garbage_bytes(live) > store.data_bytes // 2:
+                store.compact(live)
+        placed: List[Tuple[int, PcmSource]] = []
+        segments: List[SegmentResult] = []
+        for pos, item in enumerate(rendered):
+            if item is None:
+                continue  # outside ``only``
+            start, pcm, seg = item
+            if store is not None:
+                pcm = store.get(_slot_key(pos))
+                if pcm is None:
+                    raise RenderError(
+                        f"cue {seg.index}: segment missing from {store.root}", seg.index
+                    )
+            placed.append((start, pcm))
+            segments.append(seg)
+        if self.planner is not None:
+            self.planner.save()
+        return placed, segments, synth_calls
+
+
+_renderers: Dict[Tuple[Any, ...], Renderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(
+    backend: str = "kokoro",
+    api_key: Optional[str] = None,
+    base_url: str = DEFAULT_BASE_URL,
+    timeout: int = 120,
+    workers: int = DEFAULT_WORKERS,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> Renderer:
+    """Return the process-wide Renderer for this configuration."""
+    key = (backend, api_key, base_url, timeout, workers, sample_rate)
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = Renderer(backend, api_key, base_url, timeout, workers, sample_rate)
+            _renderers[key] = renderer
+        return renderer
+
+
+def render(
+    cues: Sequence[Cue],
+    voice_map: Dict[str, Any],
+    backend: str = "kokoro",
+    api_key: Optional[str] = None,
+    output: Union[str, Path, BinaryIO, None] = None,
+    output_format: Optional[str] = None,
+    base_url: str = DEFAULT_BASE_URL,
+    timeout: int = 120,
+    workers: int = DEFAULT_WORKERS,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    **options: Any,
+) -> RenderResult:
+    """Render in-memory cues with a shared Renderer. See ``Renderer.render``."""
+    renderer = get_renderer(backend, api_key, base_url, timeout, workers, sample_rate)
+    return renderer.render(cues, voice_map, output=output, output_format=output_format, **options)
 
 
 # ── main ─────────────────────────────────────────────────────────────
 
 
-def main() -> int:
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(
         description="Render timeline-accurate speech from SRT."
     )
@@ -364,118 +1443,135 @@ def main() -> int:
         help="TTS backend (default: kokoro)",
     )
     ap.add_argument("--api-key", help="API key (required for noiz backend)")
-    ap.add_argument("--output", required=True, help="Output audio file")
-    ap.add_argument("--base-url", default="https://noiz.ai/v1")
-    ap.add_argument("--work-dir", default=".tmp/tts")
+    ap.add_argument("--output", required=True,
+                    help="Output audio file, or - for a WAV stream on stdout")
+    ap.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    ap.add_argument("--work-dir", default=".tmp/tts",
+                    help="Directory for render_report.json and the fitted segments being mixed")
     ap.add_argument("--auto-emotion", action="store_true",
                      help="Noiz backend only: call /emotion-enhance before TTS")
     ap.add_argument("--ref-audio-track", help="Original audio track to dynamically slice as reference audio per segment")
-    ap.add_argument("--output-format", choices=["wav", "mp3"], default="wav")
+    ap.add_argument("--output-format", choices=["wav", "mp3"], default="wav",
+                    help="Format requested from the TTS backend per segment")
     ap.add_argument("--timeout-sec", type=int, default=120)
-    args = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help=f"Segments synthesized concurrently (default: {DEFAULT_WORKERS})")
+    ap.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE,
+                    help=f"Timeline sample rate in Hz (default: {DEFAULT_SAMPLE_RATE})")
+    ap.add_argument("--no-dedup", action="store_true",
+                    help="Synthesize every cue, even repeated lines with the same voice")
+    ap.add_argument("--no-segment-cache", action="store_true",
+                    help="Don't reuse segments synthesized by to-srt --measure")
+    ap.add_argument("--no-speed-plan", action="store_true",
+                    help="Don't pick per-cue speeds from learned speaking rates")
+    ap.add_argument("--from-ms", type=int,
+                    help="Re-render only cues overlapping this window and splice them "
+                         "into the existing WAV --output (default start: 0)")
+    ap.add_argument("--to-ms", type=int,
+                    help="End of the re-render window (default: end of the last cue)")
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
 
     if args.backend == "noiz" and not args.api_key:
         print("Error: --api-key is required for noiz backend.", file=sys.stderr)
         return 1
-    if args.api_key:
-        args.api_key = normalize_api_key_base64(args.api_key)
 
+    to_stdout = args.output == "-"
+    windowed = args.from_ms is not None or args.to_ms is not None
+    if windowed and to_stdout:
+        print("Error: --from-ms/--to-ms patch an existing output file, not stdout.", file=sys.stderr)
+        return 1
+    if windowed and Path(args.output).suffix.lower() != ".wav":
+        print("Error: --from-ms/--to-ms only patch WAV outputs; render other formats in full.",
+              file=sys.stderr)
+        return 1
+    # Keep stdout clean for the audio when streaming it to another process.
+    log = sys.stderr if to_stdout else sys.stdout
     try:
-        ensure_ffmpeg()
-        if args.backend == "kokoro":
-            _ensure_kokoro()
-
         work = Path(args.work_dir)
         work.mkdir(parents=True, exist_ok=True)
 
         cues = parse_srt(Path(args.srt))
         voice_map = json.loads(Path(args.voice_map).read_text(encoding="utf-8"))
 
-        delayed: List[Path] = []
-        report: List[Dict[str, Any]] = []
-
-        for cue in cues:
-            cfg = resolve_segment_cfg(cue.index, voice_map)
-            
-            if args.ref_audio_track and not cfg.get("voice_id") and not cfg.get("reference_audio"):
-                ref_slice_path = work / f"seg_{cue.index:04d}_ref.wav"
-                if not ref_slice_path.exists():
-                    _run_ff([
-                        "ffmpeg", "-y",
-                        "-ss", f"{cue.start_ms / 1000.0:.3f}",
-                        "-i", str(args.ref_audio_track),
-                        "-t", f"{cue.duration_ms / 1000.0:.3f}",
-                        "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1",
-                        str(ref_slice_path)
-                    ])
-                cfg["reference_audio"] = str(ref_slice_path)
-            
-            text = cue.text
-
-            if args.backend == "noiz" and args.auto_emotion:
-                text = _noiz_emotion_enhance(
-                    args.base_url, args.api_key, cue.text, args.timeout_sec
-                )
-
-            synth_cue = Cue(cue.index, cue.start_ms, cue.end_ms, text)
-            raw = work / f"seg_{cue.index:04d}_raw.{args.output_format}"
-            norm = work / f"seg_{cue.index:04d}_norm.wav"
-            dly = work / f"seg_{cue.index:04d}_delay.wav"
-
-            if args.backend == "noiz":
-                api_dur = _noiz_tts(
-                    args.base_url, args.api_key, synth_cue,
-                    cfg, args.output_format, args.timeout_sec, raw,
+        planner = None
+        if not args.no_speed_plan:
+            from duration_planner import DurationPlanner
+
+            planner = DurationPlanner()
+        segment_cache = None
+        if not args.no_segment_cache:
+            from segment_cache import SegmentCache
+
+            segment_cache = SegmentCache()
+
+        with Renderer(
+            backend=args.backend,
+            api_key=args.api_key,
+            base_url=args.base_url,
+            timeout=args.timeout_sec,
+            workers=args.workers,
+            sample_rate=args.sample_rate,
+            planner=planner,
+            segment_cache=segment_cache,
+        ) as renderer:
+            options: Dict[str, Any] = dict(
+                synth_format=args.output_format,
+                auto_emotion=args.auto_emotion,
+                ref_audio_track=args.ref_audio_track,
+                dedup=not args.no_dedup,
+                # Fitted segments are mixed from here, not held in memory.
+                segment_store=SegmentStore(work / "render_segments"),
+            )
+            if windowed:
+                result = renderer.render_window(
+                    cues,
+                    voice_map,
+                    args.output,
+                    args.from_ms if args.from_ms is not None else 0,
+                    args.to_ms if args.to_ms is not None else max(c.end_ms for c in cues),
+                    **options,
                 )
-                normalize_duration_pad_trim(raw, norm, cue.duration_ms)
-            else:
-                api_dur = _kokoro_tts(synth_cue, cfg, args.output_format, raw)
-                normalize_duration_atempo(raw, norm, cue.duration_ms)
-
-            delay_segment(norm, dly, cue.start_ms)
-            delayed.append(dly)
-
-            seg_report: Dict[str, Any] = {
-                "index": cue.index,
-                "start_ms": cue.start_ms,
-                "end_ms": cue.end_ms,
-                "duration_ms": cue.duration_ms,
-                "raw_duration_sec": api_dur,
-                "backend": args.backend,
-            }
-            if args.backend == "noiz":
-                seg_report["voice_id"] = cfg.get("voice_id")
-                seg_report["reference_audio"] = cfg.get("reference_audio")
-                seg_report["emo"] = cfg.get("emo")
             else:
-                seg_report["voice"] = cfg.get("voice")
-                seg_report["lang"] = cfg.get("lang")
-            report.append(seg_report)
-
-        timeline_wav = work / "timeline.wav"
-        total_ms = max(c.end_ms for c in cues)
-        mix_all(delayed, timeline_wav, total_ms)
-
-        out = Path(args.output)
-        if out.suffix.lower() != ".wav":
-            _run_ff(["ffmpeg", "-y", "-i", str(timeline_wav), str(out)])
-        else:
-            out.parent.mkdir(parents=True, exist_ok=True)
-            out.write_bytes(timeline_wav.read_bytes())
+                result = renderer.render(
+                    cues,
+                    voice_map,
+                    output=sys.stdout.buffer if to_stdout else args.output,
+                    output_format="wav" if to_stdout else None,
+                    **options,
+                )
 
         report_path = work / "render_report.json"
+        report = result.report()
+        report["srt"] = args.srt
         report_path.write_text(
-            json.dumps({
-                "srt": args.srt,
-                "output": args.output,
-                "backend": args.backend,
-                "total_ms": total_ms,
-                "segments": report,
-            }, ensure_ascii=False, indent=2),
+            json.dumps(report, ensure_ascii=False, indent=2),
             encoding="utf-8",
         )
-        print(f"Done. Output: {out}")
-        print(f"Report: {report_path}")
+        if to_stdout:
+            sys.stdout.buffer.flush()
+        if result.calls_saved:
+            print(
+                f"Synthesis calls: {result.synth_calls} for {len(result.segments)} cues "
+                f"({result.calls_saved} saved, {result.cache_hits} from the segment cache)",
+                file=log,
+            )
+        plan = result.speed_plan()
+        if plan and plan["mean_abs_error_pct"] is not None:
+            print(
+                f"Planned speeds for {plan['planned']} cues "
+                f"(duration prediction error {plan['mean_abs_error_pct']}% mean, "
+                f"{plan['max_abs_error_pct']}% max)",
+                file=log,
+            )
+        if result.window_ms:
+            lo, hi = result.window_ms
+            print(f"Re-rendered {len(result.segments)} cues in {lo}-{hi} ms", file=log)
+        print(f"Done. Output: {args.output}", file=log)
+        print(f"Report: {report_path}", file=log)
         return 0
     except Exception as exc:
         print(f"Error: {exc}", file=sys.stderr)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Script mode: render a speaker-labelled Markdown script to one audio file.
+
+Parses dialogue lines such as ``**Host A:** Welcome back!`` (plain
+``Host A: ...`` also works), resolves each speaker's voice from a voice
+map, synthesizes all lines concurrently and concatenates them in-process
+with configurable pauses. Writes one output file plus a per-line timing
+report. Run it through ``tts.py script``.
+
+Voice map format (same ``default`` block as timeline voice maps):
+
+    {
+      "default": { "target_lang": "en" },
+      "speakers": {
+        "Host A": { "voice_id": "883b6b7c" },
+        "Host B": { "reference_audio": "./refs/host_b.wav" }
+      }
+    }
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from render_timeline import (
+    SAMPLE_WIDTH,
+    Cue,
+    RenderError,
+    Renderer,
+)
+
+SPEAKER_LINE_RE = re.compile(
+    r"^\s*(?:[-*]\s+)?(?:\*\*|__)?(?P<speaker>[^*_:：\n]{1,40}?)(?:\*\*|__)?\s*[:：]\s*(?:\*\*|__)?\s*(?P<text>.*)$"
+)
+_MD_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_MD_MARKUP_RE = re.compile(r"[*_`]+")
+
+
+@dataclass
+class ScriptLine:
+    index: int
+    speaker: str
+    text: str
+
+
+def clean_markdown(text: str) -> str:
+    text = _MD_LINK_RE.sub(r"\1", text)
+    text = _MD_MARKUP_RE.sub("", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def parse_script(
+    content: str, known_speakers: Optional[Iterable[str]] = None
+) -> List[ScriptLine]:
+    """Parse speaker-labelled lines. Unlabelled lines continue the previous speaker.
+
+    When ``known_speakers`` is given, only those labels start a new line, so
+    prose such as "Note: ..." inside a paragraph is not mistaken for a speaker.
+    """
+    known = {s.casefold() for s in known_speakers} if known_speakers else None
+    lines: List[ScriptLine] = []
+    for raw in content.splitlines():
+        stripped = raw.strip()
+        if not stripped or stripped.startswith("#") or set(stripped) <= set("-*_= "):
+            continue
+        m = SPEAKER_LINE_RE.match(stripped)
+        speaker = m.group("speaker").strip() if m else ""
+        if speaker and (known is None or speaker.casefold() in known):
+            text = clean_markdown(m.group("text"))
+            lines.append(ScriptLine(len(lines) + 1, speaker, text))
+        elif lines:
+            lines[-1].text = (lines[-1].text + " " + clean_markdown(stripped)).strip()
+    return [ln for ln in lines if ln.text]
+
+
+def resolve_speaker_cfg(speaker: str, voice_map: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(voice_map.get("default", {}))
+    speakers = voice_map.get("speakers", {})
+    if speaker in speakers:
+        merged.update(speakers[speaker])
+    else:
+        folded = {k.casefold(): v for k, v in speakers.items()}
+        if speaker.casefold() not in folded:
+            raise ValueError(f"No voice configured for speaker '{speaker}'.")
+        merged.update(folded[speaker.casefold()])
+    return merged
+
+
+def render_script(
+    renderer: Renderer,
+    lines: List[ScriptLine],
+    voice_map: Dict[str, Any],
+    pause_ms: int = 400,
+    speaker_change_pause_ms: Optional[int] = None,
+) -> Tuple[bytes, List[Dict[str, Any]]]:
+    """Synthesize every line concurrently and concatenate them in order.
+
+    Returns (pcm, timing report). Raises ``RenderError`` naming the failing line.
+    """
+    if not lines:
+        raise RenderError("No speaker lines found in script.")
+    if speaker_change_pause_ms is None:
+        speaker_change_pause_ms = pause_ms
+    renderer.check_ready()
+    cfgs = [resolve_speaker_cfg(ln.speaker, voice_map) for ln in lines]
+    jobs = [
+        renderer.pool.submit(renderer.synthesize_pcm, Cue(ln.index, 0, 0, ln.text), cfg)
+        for ln, cfg in zip(lines, cfgs)
+    ]
+
+    sr = renderer.sample_rate
+    out = bytearray()
+    timings: List[Dict[str, Any]] = []
+    try:
+        for i, (ln, job) in enumerate(zip(lines, jobs)):
+            try:
+                pcm = job.result()
+            except Exception as exc:
+                raise RenderError(f"line {ln.index} ({ln.speaker}): {exc}", ln.index) from exc
+            if i > 0:
+                gap = speaker_change_pause_ms if ln.speaker != lines[i - 1].speaker else pause_ms
+                out += bytes(gap * sr // 1000 * SAMPLE_WIDTH)
+            start_ms = len(out) // SAMPLE_WIDTH * 1000 // sr
+            out += pcm
+            end_ms = len(out) // SAMPLE_WIDTH * 1000 // sr
+            timings.append({
+                "index": ln.index,
+                "speaker": ln.speaker,
+                "text": ln.text,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "duration_ms": end_ms - start_ms,
+            })
+    except BaseException:
+        for job in jobs:
+            job.cancel()
+        raise
+    return bytes(out), timings
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""On-disk cache of synthesized timeline segments.
+
+``tts.py to-srt --measure`` synthesizes every sentence to time its SRT and
+stores the audio here, keyed by what ``render`` would synthesize for that
+cue: backend, resolved cfg, text, cue duration and sample rate. The render
+that follows finds every cue and makes no TTS call.
+
+Entries are raw s16le mono PCM kept in one ``segment_store.SegmentStore``
+under ``$XDG_CACHE_HOME/noiz/segments`` (``~/.cache/noiz/segments`` by
+default), and are read back as zero-copy views of its data file. Once the
+store grows past ``MAX_TOTAL_BYTES``, ``prune`` compacts it down to three
+quarters of that, dropping the least recently used entries first. Hits are
+recorded as recently used on ``flush`` (or ``prune``), not on every read.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from segment_store import SegmentStore
+
+MAX_TOTAL_BYTES = 500 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "noiz" / "segments"
+
+
+def segment_key(
+    backend: str,
+    cfg: Dict[str, Any],
+    text: str,
+    duration_ms: int,
+    sample_rate: int,
+    auto_emotion: bool = False,
+) -> str:
+    blob = json.dumps(
+        [backend, cfg, text, duration_ms, sample_rate, auto_emotion],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """PCM store shared by ``to-srt --measure`` (writer) and ``render`` (reader)."""
+
+    def __init__(
+        self, cache_dir: Optional[Path] = None, max_total_bytes: int = MAX_TOTAL_BYTES
+    ) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_total_bytes = max_total_bytes
+        self.store = SegmentStore(self.cache_dir)
+
+    def get(self, key: str) -> Optional[memoryview]:
+        pcm = self.store.get(key)
+        if pcm is not None:
+            self.store.touch(key)
+        return pcm
+
+    def put(self, key: str, pcm: bytes) -> None:
+        self.store.put(key, pcm)
+
+    def flush(self) -> None:
+        """Record which entries were read, for ``prune`` in later runs."""
+        self.store.flush()
+
+    def prune(self) -> int:
+        """Evict least-recently-used entries once over budget. Returns bytes freed."""
+        # Per-entry files written by older versions of this cache.
+        for p in self.cache_dir.glob("*.pcm"):
+            if len(p.stem) == 64:
+                p.unlink(missing_ok=True)
+        if self.store.data_bytes <= self.max_total_bytes:
+            self.store.flush()
+            return 0
+        return self.store.compact(max_bytes=self.max_total_bytes * 3 // 4)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Append-only, memory-mapped store for segment PCM.
+
+Keeps every segment of a dubbing job (or of the segment cache) in one data
+file instead of one file per cue, so thousands of cues cost a handful of
+directory entries and cleanup is a single directory removal. A store is a
+directory holding:
+
+  index.jsonl      a header naming the current data file, then one
+                   {"key", "offset", "length"} record per write
+  data.<gen>.pcm   the PCM of every write, appended back to back
+  .lock            locked (flock) while appending or compacting
+
+``get`` returns a ``memoryview`` into an mmap of the data file, so the mixer
+and the cache slice segments without copying them. A record is appended to
+the index only after its PCM is written, so a crash leaves at worst some
+unindexed bytes at the end of the data file. Writing a key again appends a
+new copy; ``compact`` copies the live entries into a new data file and
+switches the index over with ``os.replace``, so readers never see a mix of
+the two. Readers notice the new index on their next ``get`` and remap;
+views they already hold stay valid, as the old mapping outlives the unlink.
+
+``touch`` only reorders the in-memory index. ``flush`` appends the pending
+touches in one write (``compact`` keeps their order too), so reads do not
+grow the index.
+"""
+import contextlib
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one writer at a time
+    fcntl = None  # type: ignore[assignment]
+
+INDEX_NAME = "index.jsonl"
+LOCK_NAME = ".lock"
+COPY_CHUNK = 1 << 20
+
+
+def _data_name(gen: int) -> str:
+    return f"data.{gen}.pcm"
+
+
+class SegmentStore:
+    """Key -> PCM store in one append-only file; safe across threads and processes."""
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+        self._lock = threading.RLock()
+        # Insertion order is write/touch order, oldest first.
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._data: Optional[str] = None
+        self._index_id: Optional[Tuple[int, int]] = None
+        self._index_pos = 0
+        self._map: Optional[mmap.mmap] = None
+        self._map_data: Optional[str] = None
+        self._touched: Dict[str, None] = {}  # keys touched since the last flush, in order
+        self._refresh()
+
+    # ── Index ────────────────────────────────────────────────────────
+
+    def _refresh(self) -> None:
+        """Apply index records appended since the last read (by any process)."""
+        try:
+            f = (self.root / INDEX_NAME).open("rb")
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            index_id = (st.st_dev, st.st_ino)
+            if index_id != self._index_id or st.st_size < self._index_pos:
+                self._reset(index_id)  # compacted by someone else: start over
+            f.seek(self._index_pos)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # a torn last line is read next time
+        self._index_pos += end
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "data" in record:
+                self._data = record["data"]
+                continue
+            key = record["key"]
+            self._entries.pop(key, None)
+            self._entries[key] = (record["offset"], record["length"])
+
+    def _reset(self, index_id: Optional[Tuple[int, int]]) -> None:
+        self._entries = {}
+        self._data = None
+        self._index_id = index_id
+        self._index_pos = 0
+        self._map = None
+        self._map_data = None
+
+    def _append_records(self, records: Iterable[Dict[str, object]]) -> None:
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with (self.root / INDEX_NAME).open("a", encoding="utf-8") as f:
+            f.write(lines)
+        self._refresh()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the thread lock and, where available, the store's file lock."""
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with (self.root / LOCK_NAME).open("a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                yield
+
+    # ── Reads ────────────────────────────────────────────────────────
+
+    def _view(self, end: int) -> Optional[memoryview]:
+        """The data file mapped for reading, remapped if it grew past ``end``."""
+        if self._data is None:
+            return None
+        if self._map is None or self._map_data != self._data or len(self._map) < end:
+            try:
+                with (self.root / self._data).open("rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size < end:
+                        return None
+                    self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+            self._map_data = self._data
+        return memoryview(self._map)
+
+    def _check_generation(self) -> None:
+        """Reread the index if another process compacted the store."""
+        try:
+            st = (self.root / INDEX_NAME).stat()
+        except FileNotFoundError:
+            return
+        if (st.st_dev, st.st_ino) != self._index_id:
+            self._refresh()
+
+    def _lookup(self, key: str) -> Optional[Tuple[int, int]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._refresh()
+            entry = self._entries.get(key)
+        return entry
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """Zero-copy view of a segment's PCM, or None if it is not stored."""
+        with self._lock:
+            self._check_generation()
+            for _ in range(2):
+                entry = self._lookup(key)
+                if entry is None:
+                    return None
+                offset, length = entry
+                if not length:
+                    return memoryview(b"")
+                view = self._view(offset + length)
+                if view is not None:
+                    return view[offset:offset + length]
+                # Compacted between the index check and the open: start over.
+                self._reset(None)
+                self._refresh()
+            return None
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return isinstance(key, str) and self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    @property
+    def data_bytes(self) -> int:
+        """Size of the data file, including copies no longer indexed."""
+        with self._lock:
+            self._refresh()
+            if self._data is None:
+                return 0
+            try:
+                return (self.root / self._data).stat().st_size
+            except OSError:
+                return 0
+
+    def garbage_bytes(self, keep: Optional[Iterable[str]] = None) -> int:
+        """Bytes ``compact(keep)`` would free."""
+        total = self.data_bytes
+        with self._lock:
+            keys = self._entries if keep is None else set(keep) & self._entries.keys()
+            return total - sum(self._entries[k][1] for k in keys)
+
+    # ── Writes ───────────────────────────────────────────────────────
+
+    def put(self, key: str, pcm: bytes) -> None:
+        with self._locked():
+            self._refresh()
+            if self._data is None:
+                self._append_records([{"data": _data_name(0)}])
+            assert self._data is not None
+            with (self.root / self._data).open("ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(pcm)
+            self._append_records([{"key": key, "offset": offset, "length": len(pcm)}])
+
+    def touch(self, key: str) -> None:
+        """Mark a key as recently used, for ``compact(max_bytes=...)``.
+
+        Held in memory until ``flush`` or ``compact``.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                self._touched.pop(key, None)
+                self._touched[key] = None
+
+    def flush(self) -> None:
+        """Append the pending touches to the index, in one write."""
+        with self._lock:
+            if not self._touched:
+                return
+            with self._locked():
+                self._refresh()
+                records = [
+                    {"key": key, "offset": self._entries[key][0], "length": self._entries[key][1]}
+                    for key in self._touched if key in self._entries
+                ]
+                self._touched = {}
+                if records:
+                    self._append_records(records)
+
+    def _apply_touches(self) -> None:
+        for key in self._touched:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+
+    def compact(
+        self, keep: Optional[Iterable[str]] = None, max_bytes: Optional[int] = None
+    ) -> int:
+        """Rewrite the store with only the live entries. Returns bytes freed.
+
+        ``keep`` limits the entries to those keys; ``max_bytes`` then drops
+        the least recently written or touched entries until the rest fit.
+        """
+        with self._locked():
+            self._refresh()
+            if self._data is None:
+                return 0
+            self._apply_touches()
+            entries = list(self._entries.items())
+            if keep is not None:
+                wanted = set(keep)
+                entries = [e for e in entries if e[0] in wanted]
+            if max_bytes is not None:
+                total = sum(length for _, (_, length) in entries)
+                while entries and total > max_bytes:
+                    total -= entries.pop(0)[1][1]
+            old_size = (self.root / self._data).stat().st_size
+            new_name = _data_name(int(self._data.split(".")[1]) + 1)
+            records = []
+            src = self._view(old_size) if old_size else None
+            with (self.root / new_name).open("wb") as out:
+                for key, (offset, length) in entries:
+                    records.append({"key": key, "offset": out.tell(), "length": length})
+                    for pos in range(offset, offset + length, COPY_CHUNK):
+                        assert src is not None
+                        out.write(src[pos:min(pos + COPY_CHUNK, offset + length)])
+                new_size = out.tell()
+            tmp = self.root / (INDEX_NAME + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for record in [{"data": new_name}] + records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(str(tmp), str(self.root / INDEX_NAME))
+            # Views into the old map stay valid after the unlink. Data files
+            # left by an interrupted compaction go too.
+            for path in self.root.glob("data.*.pcm"):
+                if path.name != new_name:
+                    with contextlib.suppress(OSError):
+                        path.unlink()
+            # The new index is written in recency order: touches are recorded.
+            self._touched = {}
+            self._reset(None)
+            self._refresh()
+            return old_size - new_size
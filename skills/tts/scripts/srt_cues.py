@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Single-pass SRT parsing shared by the skills.
+
+``iter_srt`` walks the lines of a subtitle file once, keeping only the
+block being read, and yields ``(index, start_ms, end_ms, text)`` per cue.
+It is the one parser behind ``render_timeline.parse_srt``,
+``srt_to_duck.py`` and ``extract_ref_segment.py``.
+
+``CueTable`` stores parsed cues in columns: indexes, starts and ends in
+``array`` objects and all texts in one string with end offsets. That
+costs a few dozen bytes per cue instead of a tuple and several objects,
+so 100k-cue files stay small. ``load_srt`` streams a file into one.
+
+Blocks are separated by blank lines. The index line is optional (a
+missing index continues from the previous cue), text lines are stripped
+and joined with newlines, and a cue may have no text.
+"""
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+TIMING_RE = re.compile(
+    r"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})"
+)
+
+CueRow = Tuple[int, int, int, str]
+
+_TEXT_BATCH = 1024
+
+
+def parse_timing(line: str) -> Tuple[int, int]:
+    """Return (start_ms, end_ms) from a "HH:MM:SS,mmm --> HH:MM:SS,mmm" line."""
+    m = TIMING_RE.search(line)
+    if not m:
+        raise ValueError(f"Invalid SRT timestamp: {line.strip()}")
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, m.groups())
+    return (
+        ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1,
+        ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2,
+    )
+
+
+def iter_srt(lines: Iterable[str]) -> Iterator[CueRow]:
+    """Yield (index, start_ms, end_ms, text) for each cue, in file order.
+
+    Raises ``ValueError`` for a timing line ("-->") that cannot be parsed.
+    """
+    last_index = 0
+    number: Optional[int] = None  # index line waiting for its timing line
+    cue: Optional[Tuple[int, int, int]] = None
+    text: List[str] = []
+    for raw in lines:
+        line = raw.strip().lstrip("\ufeff")
+        if not line:
+            if cue is not None:
+                yield cue[0], cue[1], cue[2], "\n".join(text)
+                cue = None
+                text = []
+            number = None
+            continue
+        if cue is not None:
+            text.append(line)
+        elif "-->" in line:
+            start_ms, end_ms = parse_timing(line)
+            last_index = number if number is not None else last_index + 1
+            cue = (last_index, start_ms, end_ms)
+        elif number is None and line.isascii() and line.isdigit():
+            number = int(line)
+        # Anything else outside a cue (headers, stray text) is skipped.
+    if cue is not None:
+        yield cue[0], cue[1], cue[2], "\n".join(text)
+
+
+class CueTable:
+    """Columnar cue store; ``table[i]`` and iteration give ``CueRow`` tuples."""
+
+    __slots__ = ("index", "start_ms", "end_ms", "_text", "_text_end")
+
+    def __init__(self, rows: Iterable[CueRow] = ()) -> None:
+        self.index = array("q")
+        self.start_ms = array("q")
+        self.end_ms = array("q")
+        self._text_end = array("q")
+        # Texts are joined a batch at a time so only a batch of small str
+        # objects is alive at once; the batches are joined at the end.
+        chunks: List[str] = []
+        batch: List[str] = []
+        offset = 0
+        for index, start_ms, end_ms, text in rows:
+            self.index.append(index)
+            self.start_ms.append(start_ms)
+            self.end_ms.append(end_ms)
+            offset += len(text)
+            self._text_end.append(offset)
+            batch.append(text)
+            if len(batch) == _TEXT_BATCH:
+                chunks.append("".join(batch))
+                batch = []
+        chunks.append("".join(batch))
+        self._text = "".join(chunks)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def text(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        start = self._text_end[i - 1] if i else 0
+        return self._text[start:self._text_end[i]]
+
+    def __getitem__(self, i: int) -> CueRow:
+        return self.index[i], self.start_ms[i], self.end_ms[i], self.text(i)
+
+    def __iter__(self) -> Iterator[CueRow]:
+        start = 0
+        texts = self._text
+        for index, start_ms, end_ms, end in zip(
+            self.index, self.start_ms, self.end_ms, self._text_end
+        ):
+            yield index, start_ms, end_ms, texts[start:end]
+            start = end
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the text buffer."""
+        columns = (self.index, self.start_ms, self.end_ms, self._text_end)
+        return sum(len(c) * c.itemsize for c in columns) + sys.getsizeof(self._text)
+
+
+def open_srt(path: Union[str, Path]):
+    """Open an SRT file for line-by-line reading (UTF-8, BOM tolerated)."""
+    return open(path, "r", encoding="utf-8-sig", errors="replace")
+
+
+def load_srt(path: Union[str, Path]) -> CueTable:
+    """Stream an SRT file into a ``CueTable``."""
+    with open_srt(path) as f:
+        return CueTable(iter_srt(f))
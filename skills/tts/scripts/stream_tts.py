@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Streaming mode: speak text as it arrives on stdin, one sentence at a time.
+
+Text (e.g. LLM tokens piped from an agent) is read incrementally, cut at
+sentence boundaries as soon as they close, and each sentence is submitted
+for synthesis right away. A bounded queue limits how many sentences are in
+flight; audio is handed back strictly in order, so playback of the first
+sentence can start while later ones are still being written or synthesized.
+"""
+import codecs
+import queue
+import sys
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from render_timeline import Cue, RenderError, Renderer
+
+
+def read_text_chunks(stream: Optional[BinaryIO] = None, size: int = 4096) -> Iterator[str]:
+    """Yield decoded text from a binary stream as soon as bytes are available."""
+    if stream is None:
+        stream = sys.stdin.buffer
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        data = read(size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def is_speakable(sentence: str) -> bool:
+    """Skip fragments such as '.' or '!?' left over from sentence splitting."""
+    return any(ch.isalnum() for ch in sentence)
+
+
+def synthesize_stream(
+    renderer: Renderer,
+    sentences: Iterable[str],
+    cfg: Union[Dict[str, Any], Callable[[int], Dict[str, Any]]],
+    max_pending: Optional[int] = None,
+) -> Iterator[Tuple[int, str, bytes]]:
+    """Synthesize sentences as they arrive and yield (index, text, pcm) in order.
+
+    Sentences are pulled on a background thread and submitted to the
+    renderer's pool immediately; at most ``max_pending`` (default: twice the
+    worker count) may be queued or running before reading pauses. ``cfg``
+    may be a function of the 1-based sentence index.
+    """
+    if max_pending is None:
+        max_pending = renderer.workers * 2
+    pending: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_pending))
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        # A bounded put that gives up once the consumer has gone away.
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            index = 0
+            for sentence in sentences:
+                if stop.is_set():
+                    break
+                if not is_speakable(sentence):
+                    continue
+                index += 1
+                job = renderer.pool.submit(
+                    renderer.synthesize_pcm, Cue(index, 0, 0, sentence),
+                    cfg(index) if callable(cfg) else cfg,
+                )
+                # Cancelled here if the consumer stopped after the drain below.
+                if not put((index, sentence, job)) or stop.is_set():
+                    job.cancel()
+                    break
+        except BaseException as exc:  # surfaced to the consumer
+            put(exc)
+        finally:
+            put(None)
+
+    threading.Thread(target=produce, name="stream-reader", daemon=True).start()
+    try:
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            index, sentence, job = item
+            try:
+                pcm = job.result()
+            except Exception as exc:
+                raise RenderError(f"sentence {index}: {exc}", index) from exc
+            yield index, sentence, pcm
+    finally:
+        # The consumer may stop early (player error, broken pipe, Ctrl-C):
+        # release the producer and cancel synthesis nobody will play.
+        stop.set()
+        while True:
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                item[2].cancel()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Unit tests for audiobook.py — no ffmpeg or network access.
+
+Run: python3 -m pytest skills/tts/scripts/test_audiobook.py -v
+"""
+import importlib.util
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+_spec = importlib.util.spec_from_file_location("audiobook", Path(__file__).parent / "audiobook.py")
+ab = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ab)  # type: ignore[union-attr]
+
+from render_timeline import Renderer  # noqa: E402
+
+BOOK = """A Short Book
+
+Chapter 1: Arrival
+Part of me wanted to leave. The train was late.
+
+Chapter 2
+It rained all week.
+
+第三章 归来
+他回来了。
+"""
+
+
+class FakeRenderer(Renderer):
+    def __init__(self, fail_on=""):
+        super().__init__("kokoro", workers=2, sample_rate=1000)
+        self.fail_on = fail_on
+        self.calls = []
+
+    def synthesize_pcm(self, cue, cfg, output_format="wav"):
+        self.calls.append(cue.text)
+        if self.fail_on and self.fail_on in cue.text:
+            raise RuntimeError("boom")
+        return array("h", [1] * 100).tobytes()
+
+
+class TestPlanChapters(unittest.TestCase):
+
+    def test_detects_headings(self):
+        titles = [t for t, _ in ab.detect_chapters(BOOK)]
+        self.assertEqual(titles, ["", "Chapter 1: Arrival", "Chapter 2", "第三章 归来"])
+
+    def test_prose_is_not_a_heading(self):
+        body = dict(ab.detect_chapters(BOOK))["Chapter 1: Arrival"]
+        self.assertIn("Part of me wanted to leave.", body)
+
+    def test_chunks_respect_max_chars(self):
+        chunks = ab.chunk_sentences(["aaaa.", "bbbb.", "cccc."], max_chars=11)
+        self.assertEqual(chunks, ["aaaa. bbbb.", "cccc."])
+
+    def test_untitled_opening(self):
+        chapters = ab.plan_chapters(BOOK)
+        self.assertEqual(chapters[0].title, "Opening")
+        self.assertEqual(chapters[1].chunks[0].split(".")[0], "Chapter 1: Arrival")
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.chapters = ab.plan_chapters(BOOK, max_chars=30)
+
+    def test_restart_only_redoes_missing_chunks(self):
+        first = FakeRenderer(fail_on="rained")
+        reused, done, failed = ab.synthesize_chunks(first, self.chapters, {}, self.tmp)
+        first.close()
+        self.assertEqual(len(failed), 1)
+        manifest = json.loads((self.tmp / "manifest.json").read_text(encoding="utf-8"))
+        self.assertEqual(manifest["chunks"][failed[0]]["status"], "failed")
+
+        second = FakeRenderer()
+        reused, done, failed = ab.synthesize_chunks(second, self.chapters, {}, self.tmp)
+        second.close()
+        self.assertEqual((done, failed), (1, []))
+        self.assertEqual(len(second.calls), 1)
+        self.assertIn("rained", second.calls[0])
+
+    def test_voice_change_invalidates_chunks(self):
+        r = FakeRenderer()
+        ab.synthesize_chunks(r, self.chapters, {"voice": "a"}, self.tmp)
+        reused, done, _ = ab.synthesize_chunks(r, self.chapters, {"voice": "b"}, self.tmp)
+        r.close()
+        self.assertEqual(reused, 0)
+        self.assertEqual(done, sum(len(c.chunks) for c in self.chapters))
+
+    def test_assemble_wav_with_markers(self):
+        r = FakeRenderer()
+        ab.synthesize_chunks(r, self.chapters, {}, self.tmp)
+        r.close()
+        out = self.tmp / "book.wav"
+        markers = ab.assemble(
+            self.chapters, self.tmp, out, self.tmp / "chapters", 1000,
+            pause_ms=10, chapter_pause_ms=50,
+        )
+        self.assertEqual(len(markers), len(self.chapters))
+        self.assertEqual(markers[1]["start_ms"], markers[0]["end_ms"] + 50)
+        with wave.open(str(out)) as w:
+            self.assertEqual(w.getnframes(), markers[-1]["end_ms"])
+        sidecar = json.loads(Path(str(out) + ".chapters.json").read_text(encoding="utf-8"))
+        self.assertEqual(sidecar["chapters"][0]["title"], "Opening")
+        self.assertTrue(Path(markers[0]["file"]).exists())
+
+    def test_ffmetadata_escapes(self):
+        meta = ab.ffmetadata("A=B", [{"title": "x;y", "start_ms": 0, "end_ms": 5}])
+        self.assertIn("title=A\\=B", meta)
+        self.assertIn("title=x\\;y", meta)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
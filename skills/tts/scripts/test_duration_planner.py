@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Unit tests for duration_planner.py.
+
+Run: python3 -m pytest skills/tts/scripts/test_duration_planner.py -v
+"""
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "duration_planner", Path(__file__).parent / "duration_planner.py"
+)
+dp = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(dp)  # type: ignore[union-attr]
+
+KEY = "kokoro:af_sky:en"
+
+
+class TestDurationPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "noiz" / "speech_rates.json"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _trained(self):
+        planner = dp.DurationPlanner(self.path)
+        # 16 spoken chars at speed 1.0 take 1 s, i.e. 16 chars/s.
+        for speed in (1.0, 1.0, 1.5):
+            planner.observe(KEY, "Hello there, friend.", speed, 1.0 / speed)
+        return planner
+
+    def test_no_plan_until_enough_samples(self):
+        planner = dp.DurationPlanner(self.path)
+        planner.observe(KEY, "Hello there, friend.", 1.0, 1.0)
+        self.assertIsNone(planner.plan(KEY, "Hello there, friend.", 2.0))
+
+    def test_speed_fits_target(self):
+        plan = self._trained().plan(KEY, "Hello there, friend.", 0.8)
+        self.assertAlmostEqual(plan.speed, 1.25, places=3)
+        self.assertAlmostEqual(plan.predicted_sec, 0.8, places=3)
+
+    def test_speed_is_clamped(self):
+        plan = self._trained().plan(KEY, "Hello there, friend.", 10.0)
+        self.assertEqual(plan.speed, dp.DEFAULT_SPEED_RANGE[0])
+        self.assertAlmostEqual(plan.predicted_sec, 1.0 / dp.DEFAULT_SPEED_RANGE[0], places=3)
+
+    def test_save_merges_with_other_writers(self):
+        planner = self._trained()
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text(json.dumps({"noiz:v:fr": {"cps": 12.0, "n": 4}}))
+        planner.save()
+        reloaded = dp.DurationPlanner(self.path)
+        self.assertEqual(reloaded.rates["noiz:v:fr"]["n"], 4)
+        self.assertAlmostEqual(reloaded.rate(KEY), 16.0)
+
+    def test_voice_key(self):
+        self.assertEqual(dp.voice_key("noiz", {"voice_id": "v", "target_lang": "fr"}), "noiz:v:fr")
+        self.assertEqual(dp.voice_key("noiz", {}), "noiz:clone:")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
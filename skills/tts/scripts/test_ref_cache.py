@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Unit tests for ref_cache.py — no network access.
+
+Run: python3 -m pytest skills/tts/scripts/test_ref_cache.py -v
+"""
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+import urllib.error
+from email.message import Message
+from pathlib import Path
+from unittest.mock import patch
+
+_spec = importlib.util.spec_from_file_location(
+    "ref_cache", Path(__file__).parent / "ref_cache.py"
+)
+ref_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ref_cache)  # type: ignore[union-attr]
+
+URL = "https://example.com/voices/ref.wav"
+
+
+class _FakeResponse(io.BytesIO):
+    def __init__(self, body, headers=None):
+        super().__init__(body)
+        self.headers = Message()
+        for k, v in (headers or {}).items():
+            self.headers[k] = v
+
+
+def _not_modified(req, timeout=None):
+    raise urllib.error.HTTPError(req.full_url, 304, "Not Modified", Message(), None)
+
+
+class TestRefCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _fetch(self, **kwargs):
+        return ref_cache.fetch(URL, cache_dir=self.cache_dir, **kwargs)
+
+    def test_first_fetch_downloads_and_stores(self):
+        resp = _FakeResponse(b"RIFFdata", {"ETag": '"v1"'})
+        with patch("urllib.request.urlopen", return_value=resp) as m:
+            path = self._fetch()
+        m.assert_called_once()
+        self.assertEqual(path.read_bytes(), b"RIFFdata")
+        self.assertEqual(path.parent, self.cache_dir)
+
+    def test_fresh_entry_skips_network(self):
+        with patch("urllib.request.urlopen", return_value=_FakeResponse(b"abc")):
+            first = self._fetch()
+        with patch("urllib.request.urlopen") as m:
+            second = self._fetch()
+        m.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_stale_entry_revalidates_with_etag(self):
+        resp = _FakeResponse(b"abc", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        with patch("urllib.request.urlopen", return_value=resp):
+            self._fetch()
+        with patch("urllib.request.urlopen", side_effect=_not_modified) as m:
+            path = self._fetch(max_age=0)
+        req = m.call_args[0][0]
+        self.assertEqual(req.get_header("If-none-match"), '"v1"')
+        self.assertEqual(req.get_header("If-modified-since"), "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(path.read_bytes(), b"abc")
+
+    def test_stale_entry_served_when_offline(self):
+        with patch("urllib.request.urlopen", return_value=_FakeResponse(b"abc")):
+            self._fetch()
+        err = urllib.error.URLError("offline")
+        with patch("urllib.request.urlopen", side_effect=err):
+            path = self._fetch(max_age=0)
+        self.assertEqual(path.read_bytes(), b"abc")
+
+    def test_stale_entry_served_on_server_error(self):
+        with patch("urllib.request.urlopen", return_value=_FakeResponse(b"abc")):
+            self._fetch()
+        for code in (503, 429):
+            err = urllib.error.HTTPError(URL, code, "Unavailable", Message(), None)
+            with patch("urllib.request.urlopen", side_effect=err):
+                self.assertEqual(self._fetch(max_age=0).read_bytes(), b"abc")
+        err = urllib.error.HTTPError(URL, 404, "Not Found", Message(), None)
+        with patch("urllib.request.urlopen", side_effect=err):
+            with self.assertRaises(urllib.error.HTTPError):
+                self._fetch(max_age=0)
+
+    def test_oversized_download_is_rejected(self):
+        resp = _FakeResponse(b"x" * 100)
+        with patch("urllib.request.urlopen", return_value=resp):
+            with self.assertRaises(ValueError):
+                self._fetch(max_entry_bytes=10)
+        self.assertEqual([p for p in self.cache_dir.iterdir() if p.suffix != ".json"], [])
+
+    def test_prune_evicts_least_recently_used(self):
+        old = self.cache_dir / "old.wav"
+        new = self.cache_dir / "new.wav"
+        old.write_bytes(b"a" * 10)
+        new.write_bytes(b"b" * 10)
+        os.utime(str(old), (1, 1))
+        freed = ref_cache.prune(self.cache_dir, max_total_bytes=15)
+        self.assertEqual(freed, 10)
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
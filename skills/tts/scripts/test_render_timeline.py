@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""Unit tests for render_timeline.py — no ffmpeg or network access.
+
+Run: python3 -m pytest skills/tts/scripts/test_render_timeline.py -v
+"""
+import importlib.util
+import io
+import json
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import unittest
+import wave
+from array import array
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+_spec = importlib.util.spec_from_file_location(
+    "render_timeline", Path(__file__).parent / "render_timeline.py"
+)
+rt = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rt)  # type: ignore[union-attr]
+
+SRT = """1
+00:00:00,000 --> 00:00:01,000
+Hello
+
+2
+00:00:01,500 --> 00:00:02,000
+World
+"""
+
+
+def pcm(*samples):
+    return array("h", samples).tobytes()
+
+
+class TestMixSegments(unittest.TestCase):
+
+    def test_disjoint_segments_are_copied(self):
+        out = rt.mix_segments([(2, pcm(5, 6)), (0, pcm(1, 2))], 5)
+        self.assertEqual(array("h", bytes(out)).tolist(), [1, 2, 5, 6, 0])
+
+    def test_overlap_is_summed_and_clipped(self):
+        out = rt.mix_segments([(0, pcm(30000, 1, 1000)), (1, pcm(10, 32000, 7))], 4)
+        self.assertEqual(array("h", bytes(out)).tolist(), [30000, 11, 32767, 7])
+
+    def test_segment_past_end_is_truncated(self):
+        out = rt.mix_segments([(3, pcm(1, 2, 3))], 4)
+        self.assertEqual(array("h", bytes(out)).tolist(), [0, 0, 0, 1])
+
+    def test_blocks_match_whole_buffer(self):
+        placed = [
+            (0, pcm(30000, 1, 1000, 4)), (1, pcm(10, 32000, 7)), (2, pcm(-5) * 6),
+            (9, pcm(3, 3)), (12, pcm(8)),
+        ]
+        expected = bytes(rt.mix_segments(placed, 11))
+        for block_samples in (1, 2, 3, 5, 64):
+            blocks = list(rt.iter_mix_blocks(placed, 11, block_samples))
+            self.assertEqual(b"".join(blocks), expected)
+            self.assertTrue(all(len(b) <= block_samples * rt.SAMPLE_WIDTH for b in blocks))
+
+    def test_blocks_read_segment_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "seg.pcm"
+            path.write_bytes(pcm(1, 2, 3, 4, 5))
+            out = b"".join(rt.iter_mix_blocks([(1, path), (0, pcm(9, 9))], 7, 2))
+        self.assertEqual(array("h", out).tolist(), [9, 10, 2, 3, 4, 5, 0])
+
+    def test_streamed_wav_matches_buffered(self):
+        samples = pcm(*range(100))
+        buf = io.BytesIO()
+        rt.write_audio_blocks(rt.iter_mix_blocks([(0, samples)], 100, 16), 100, 8000, buf)
+        self.assertEqual(buf.getvalue(), rt.pcm_to_wav_bytes(samples, 8000))
+
+
+class TestFitDuration(unittest.TestCase):
+
+    def test_pad_trim(self):
+        self.assertEqual(rt.fit_duration_pad_trim(pcm(1, 2, 3), 2), pcm(1, 2))
+        self.assertEqual(rt.fit_duration_pad_trim(pcm(1), 3), pcm(1, 0, 0))
+
+
+class TestPlanDedup(unittest.TestCase):
+
+    def _cues(self, *durations):
+        return [rt.Cue(i + 1, i * 10000, i * 10000 + d, "Yes.") for i, d in enumerate(durations)]
+
+    def test_groups_by_key_and_duration(self):
+        cues = self._cues(1000, 1050, 2000, 1000, 1000)
+        groups = rt.plan_dedup(cues, ["a", "a", "a", "b", None])
+        self.assertEqual(groups, [[0, 1], [2], [3], [4]])
+
+    def test_median_cue_is_synthesized(self):
+        cues = self._cues(1080, 1000, 1040)
+        self.assertEqual(rt.plan_dedup(cues, ["a"] * 3), [[2, 0, 1]])
+
+
+class TestRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.cues = rt.parse_srt_text(SRT)
+        self.renderer = rt.Renderer("noiz", api_key="key", workers=2, sample_rate=1000)
+        self.addCleanup(self.renderer.close)
+
+    def _render(self, synth, **kwargs):
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", side_effect=synth), \
+             patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio):
+            return self.renderer.render(self.cues, {"default": {"voice_id": "v"}}, **kwargs)
+
+    def test_returns_pcm_and_segments(self):
+        result = self._render(lambda cue, cfg, fmt, ref: (pcm(1) * 2000, 2.0))
+        self.assertEqual(result.total_ms, 2000)
+        self.assertEqual(len(result.pcm), 2000 * rt.SAMPLE_WIDTH)
+        self.assertEqual([s.index for s in result.segments], [1, 2])
+        self.assertEqual(result.report()["segments"][0]["voice_id"], "v")
+
+    def test_writes_wav_to_file_like(self):
+        buf = io.BytesIO()
+        result = self._render(lambda cue, cfg, fmt, ref: (pcm(1) * 10, 1.0), output=buf)
+        self.assertIsNone(result.pcm)
+        with wave.open(io.BytesIO(buf.getvalue())) as w:
+            self.assertEqual(w.getframerate(), 1000)
+            self.assertEqual(w.getnframes(), 2000)
+
+    def test_file_render_mixes_from_the_store(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.renderer = rt.Renderer("noiz", api_key="key", workers=2, sample_rate=8000)
+        self.addCleanup(self.renderer.close)
+        self.cues = rt.parse_srt_text("".join(
+            f"{i + 1}\n00:00:{i:02d},000 --> 00:00:{i + 1:02d},000\nLine {i}\n\n"
+            for i in range(60)
+        ))
+        sources = []
+        real_mix = rt.iter_mix_blocks
+
+        def mix(placed, total_samples):
+            sources.extend(type(src) for _, src in placed)
+            return real_mix(placed, total_samples)
+
+        # Plain functions, not mocks: a mock's call list would keep every segment.
+        tracemalloc.start()
+        try:
+            with patch.object(rt.Renderer, "check_ready"), \
+                 patch.object(rt.Renderer, "synthesize", new=lambda *a: (pcm(1) * 8000, 1.0)), \
+                 patch.object(rt, "decode_to_pcm", new=lambda audio, sr: audio), \
+                 patch.object(rt, "iter_mix_blocks", new=mix):
+                self.renderer.render(
+                    self.cues, {"default": {"voice_id": "v"}}, output=tmp / "out.wav",
+                    segment_store=rt.SegmentStore(tmp / "segments"),
+                )
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        total = 60 * 8000 * rt.SAMPLE_WIDTH
+        self.assertEqual(sources, [memoryview] * 60)
+        self.assertLess(peak, total // 2)
+        with wave.open(str(tmp / "out.wav")) as w:
+            self.assertEqual(w.readframes(w.getnframes()), pcm(1) * (total // rt.SAMPLE_WIDTH))
+
+    def test_failure_names_the_cue(self):
+        def synth(cue, cfg, fmt, ref):
+            if cue.index == 2:
+                raise RuntimeError("boom")
+            return pcm(0), 1.0
+
+        with self.assertRaises(rt.RenderError) as ctx:
+            self._render(synth)
+        self.assertEqual(ctx.exception.cue_index, 2)
+
+    def test_repeated_lines_are_synthesized_once(self):
+        self.cues = rt.parse_srt_text(
+            "1\n00:00:00,000 --> 00:00:01,000\nYes.\n\n"
+            "2\n00:00:02,000 --> 00:00:03,000\nNo.\n\n"
+            "3\n00:00:04,000 --> 00:00:05,050\nYes.\n\n"
+            "4\n00:00:06,000 --> 00:00:07,000\nYes.\n"
+        )
+        calls = []
+
+        def synth(cue, cfg, fmt, ref):
+            calls.append(cue.text)
+            return pcm(1) * 1000, 1.0
+
+        stretch = patch.object(
+            rt, "fit_duration_atempo",
+            side_effect=lambda audio, sr, target: rt.fit_duration_pad_trim(audio, target),
+        )
+        with stretch as atempo:
+            result = self._render(synth)
+        self.assertEqual(sorted(calls), ["No.", "Yes."])
+        self.assertEqual(atempo.call_count, 1)  # only cue 3 differs in length
+        report = result.report()
+        self.assertEqual((report["synthesis_calls"], report["calls_saved"]), (2, 2))
+        self.assertEqual([s.get("reused_from") for s in report["segments"]], [None, None, 1, 1])
+        self.assertEqual(len(result.pcm), 7000 * rt.SAMPLE_WIDTH)
+
+    def test_no_dedup_synthesizes_every_cue(self):
+        self.cues = rt.parse_srt_text(
+            SRT.replace("World", "Hello").replace("00:00:01,500", "00:00:01,000")
+        )
+        synth = lambda cue, cfg, fmt, ref: (pcm(1) * 1000, 1.0)
+        self.assertEqual(self._render(synth).calls_saved, 1)
+        self.assertEqual(self._render(synth, dedup=False).calls_saved, 0)
+
+    def test_planned_speed_is_sent_and_reported(self):
+        from duration_planner import DurationPlanner
+
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+
+        planner = DurationPlanner(tmp / "rates.json")
+        for _ in range(3):
+            planner.observe("noiz:v:", "Hello", 1.0, 0.5)  # 10 chars/s
+        self.renderer.planner = planner
+        speeds = []
+
+        def synth(cue, cfg, fmt, ref):
+            speeds.append(cfg.get("speed"))
+            return pcm(1) * 1000, 0.55
+
+        result = self._render(synth)
+        self.assertEqual(speeds, [0.75, 1.0])  # "Hello" in 1 s (clamped), in 0.5 s
+        plan = result.report()["speed_plan"]
+        self.assertEqual(plan["planned"], 2)
+        self.assertAlmostEqual(plan["max_abs_error_pct"], 17.5)
+        # Only cue 2 overran its forced duration, so only it was learned from.
+        saved = json.loads((tmp / "rates.json").read_text())
+        self.assertEqual(saved["noiz:v:"]["n"], 4)
+
+    def test_window_grows_to_whole_overlapping_cues(self):
+        cues = rt.parse_srt_text(
+            "1\n00:00:00,000 --> 00:00:01,000\nA\n\n"
+            "2\n00:00:00,900 --> 00:00:02,000\nB\n\n"
+            "3\n00:00:03,000 --> 00:00:04,000\nC\n"
+        )
+        picked, lo, hi = rt.cues_in_window(cues, 1500, 1600)
+        self.assertEqual(([c.index for c in picked], lo, hi), ([1, 2], 0, 2000))
+        self.assertEqual(rt.cues_in_window(cues, 2200, 2500), ([], 2200, 2500))
+
+    def test_window_patches_wav_like_a_full_render(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        synth = lambda cue, cfg, fmt, ref: (pcm(len(cue.text)) * 1000, 1.0)
+        store = rt.SegmentStore(tmp / "segments")
+        self._render(synth, output=tmp / "out.wav", segment_store=store)
+        self.cues = rt.parse_srt_text(
+            SRT.replace("World", "Everyone")
+            + "\n3\n00:00:02,500 --> 00:00:03,000\nMore\n"
+        )
+        calls = []
+
+        def counted(cue, cfg, fmt, ref):
+            calls.append(cue.text)
+            return synth(cue, cfg, fmt, ref)
+
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", side_effect=counted), \
+             patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio):
+            result = self.renderer.render_window(
+                self.cues, {"default": {"voice_id": "v"}}, tmp / "out.wav", 1600, 5000,
+                segment_store=store,
+            )
+        self.assertEqual(sorted(calls), ["Everyone", "More"])
+        self.assertEqual(bytes(store.get("cue/2")), pcm(4) * 500)
+        self.assertEqual(result.report()["window_ms"], [1500, 3000])
+        self._render(synth, output=tmp / "full.wav")
+        self.assertEqual((tmp / "out.wav").read_bytes(), (tmp / "full.wav").read_bytes())
+
+    def test_window_truncates_a_shortened_tail(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        synth = lambda cue, cfg, fmt, ref: (pcm(len(cue.text)) * cue.duration_ms, 1.0)
+        self._render(synth, output=tmp / "out.wav")
+        self.cues = rt.parse_srt_text(SRT.replace("00:00:02,000", "00:00:01,800"))
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", side_effect=synth), \
+             patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio):
+            result = self.renderer.render_window(
+                self.cues, {"default": {"voice_id": "v"}}, tmp / "out.wav", 1600, 5000
+            )
+        self.assertEqual((result.total_ms, result.report()["window_ms"]), (1800, [1500, 1800]))
+        self._render(synth, output=tmp / "full.wav")
+        self.assertEqual((tmp / "out.wav").read_bytes(), (tmp / "full.wav").read_bytes())
+
+    def test_window_rejects_compressed_outputs(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        (tmp / "out.mp3").write_bytes(b"ID3")
+        with patch.object(rt.Renderer, "synthesize") as synth:
+            with self.assertRaises(rt.RenderError):
+                self.renderer.render_window(
+                    self.cues, {"default": {"voice_id": "v"}}, tmp / "out.mp3", 0, 1000
+                )
+        synth.assert_not_called()
+        self.assertEqual((tmp / "out.mp3").read_bytes(), b"ID3")
+
+    def test_window_reuses_a_repeat_outside_it(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.cues = rt.parse_srt_text(
+            "1\n00:00:00,000 --> 00:00:01,000\nYes.\n\n"
+            "2\n00:00:02,000 --> 00:00:03,000\nNo.\n\n"
+            "3\n00:00:04,000 --> 00:00:05,050\nYes.\n"
+        )
+        calls = []
+
+        def synth(cue, cfg, fmt, ref):
+            calls.append(cue.index)
+            return pcm(cue.index) * cue.duration_ms, cue.duration_ms / 1000.0
+
+        stretch = patch.object(
+            rt, "fit_duration_atempo",
+            side_effect=lambda audio, sr, target: rt.fit_duration_pad_trim(audio, target),
+        )
+        with stretch:
+            self._render(synth, output=tmp / "full.wav")
+            shutil.copyfile(str(tmp / "full.wav"), str(tmp / "out.wav"))
+            calls.clear()
+            with patch.object(rt.Renderer, "check_ready"), \
+                 patch.object(rt.Renderer, "synthesize", side_effect=synth), \
+                 patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio):
+                result = self.renderer.render_window(
+                    self.cues, {"default": {"voice_id": "v"}}, tmp / "out.wav", 3500, 6000
+                )
+        # Cue 3 is fitted from cue 1's synthesis, as in the full render.
+        self.assertEqual(calls, [1])
+        self.assertEqual([(s.index, s.reused_from) for s in result.segments], [(3, 1)])
+        self.assertEqual((result.synth_calls, result.report()["window_ms"]), (1, [3500, 5050]))
+        self.assertEqual((tmp / "out.wav").read_bytes(), (tmp / "full.wav").read_bytes())
+
+    def test_get_renderer_is_reused(self):
+        a = rt.get_renderer("noiz", api_key="key")
+        self.assertIs(a, rt.get_renderer("noiz", api_key="key"))
+        a.close()
+
+
+class TestMeasuredSrt(unittest.TestCase):
+
+    def test_render_after_measure_makes_no_tts_calls(self):
+        import text_to_srt
+        from segment_cache import SegmentCache
+
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        cache = SegmentCache(tmp)
+        voice_map = {"default": {"voice": "af_sky"}, "segments": {"2": {"voice": "am_adam"}}}
+        calls = []
+
+        def synth(cue, cfg, fmt="wav", ref=None, force_duration=True):
+            calls.append(cue.text)
+            return pcm(1) * (len(cue.text) * 37), -1.0
+
+        renderer = rt.Renderer("kokoro", workers=2, sample_rate=1000, segment_cache=cache)
+        self.addCleanup(renderer.close)
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", side_effect=synth), \
+             patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio), \
+             patch.object(rt, "fit_duration_atempo", side_effect=AssertionError("stretched")):
+            entries = list(text_to_srt.measure_timings(
+                renderer, ["Hello there.", "How are you?", "!"], voice_map, gap_ms=200, cache=cache,
+            ))
+            self.assertEqual(entries, [
+                (1, 0, 444, "Hello there."), (2, 644, 1088, "How are you?"),
+            ])
+            text_to_srt.write_srt(entries, tmp / "out.srt")
+            calls.clear()
+            result = renderer.render(rt.parse_srt(tmp / "out.srt"), voice_map)
+        self.assertEqual(calls, [])
+        self.assertEqual((result.synth_calls, result.cache_hits), (0, 2))
+
+    def test_cache_hits_are_fitted_to_the_cue(self):
+        from segment_cache import SegmentCache, segment_key
+
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        cache = SegmentCache(tmp)
+        cfg = {"voice_id": "v"}
+        cues = rt.parse_srt_text(SRT)
+        # Natural lengths: cue 1 (1000 ms) runs into cue 2 (500 ms), which is short.
+        for cue, samples in zip(cues, (1800, 300)):
+            cache.put(segment_key("noiz", cfg, cue.text, cue.duration_ms, 1000), pcm(1) * samples)
+
+        renderer = rt.Renderer("noiz", api_key="key", workers=2, sample_rate=1000, segment_cache=cache)
+        self.addCleanup(renderer.close)
+        stretch = patch.object(
+            rt, "fit_duration_atempo", side_effect=lambda audio, sr, target: pcm(1) * target
+        )
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", side_effect=AssertionError("synthesized")), \
+             stretch as atempo:
+            result = renderer.render(cues, {"default": cfg})
+        self.assertEqual(result.cache_hits, 2)
+        self.assertEqual([c.args[2] for c in atempo.call_args_list], [1000, 500])
+        mixed = array("h", result.pcm)
+        self.assertEqual((sum(mixed[:1500]), sum(mixed[1500:])), (1000, 500))
+
+
+class TestMainStdout(unittest.TestCase):
+
+    def test_dash_output_streams_wav_and_logs_to_stderr(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        (tmp / "in.srt").write_text(SRT, encoding="utf-8")
+        (tmp / "vm.json").write_text(json.dumps({"default": {"voice_id": "v"}}), encoding="utf-8")
+        stdout = io.TextIOWrapper(io.BytesIO())
+        stderr = io.StringIO()
+        with patch.object(rt.Renderer, "check_ready"), \
+             patch.object(rt.Renderer, "synthesize", return_value=(pcm(1) * 100, 1.0)), \
+             patch.object(rt, "decode_to_pcm", side_effect=lambda audio, sr: audio), \
+             patch.object(sys, "stdout", stdout), patch.object(sys, "stderr", stderr), \
+             patch.dict("os.environ", {"XDG_DATA_HOME": str(tmp)}):
+            code = rt.main([
+                "--srt", str(tmp / "in.srt"), "--voice-map", str(tmp / "vm.json"),
+                "--backend", "noiz", "--api-key", "k", "--output", "-",
+                "--work-dir", str(tmp), "--sample-rate", "1000",
+            ])
+        self.assertEqual(code, 0)
+        with wave.open(io.BytesIO(stdout.buffer.getvalue())) as w:
+            self.assertEqual(w.getnframes(), 2000)
+        self.assertIn("Done.", stderr.getvalue())
+        self.assertTrue((tmp / "noiz" / "speech_rates.json").exists())  # cue 2 overran
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
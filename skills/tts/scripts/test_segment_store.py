@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Unit tests for segment_store.py.
+
+Run: python3 -m pytest skills/tts/scripts/test_segment_store.py -v
+"""
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "segment_store", Path(__file__).parent / "segment_store.py"
+)
+ss = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ss)  # type: ignore[union-attr]
+
+
+class TestSegmentStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "segments"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_one_data_file_shared_by_instances(self):
+        store = ss.SegmentStore(self.root)
+        self.assertIsNone(store.get("a"))
+        store.put("a", b"\x01\x00" * 3)
+        store.put("b", b"\x02\x00")
+        store.put("a", b"\x03\x00")
+        other = ss.SegmentStore(self.root)
+        view = other.get("a")
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(view), b"\x03\x00")
+        self.assertEqual(len(other), 2)
+        store.put("c", b"\x04\x00")
+        self.assertIn("c", other)
+        self.assertEqual(
+            sorted(p.name for p in self.root.iterdir()), [".lock", "data.0.pcm", "index.jsonl"]
+        )
+
+    def test_torn_index_line_is_ignored(self):
+        store = ss.SegmentStore(self.root)
+        store.put("a", b"ab")
+        with (self.root / ss.INDEX_NAME).open("a", encoding="utf-8") as f:
+            f.write('{"key": "b", "offset": 2, "len')
+        reopened = ss.SegmentStore(self.root)
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(bytes(reopened.get("a")), b"ab")
+
+    def test_compact_keeps_live_entries(self):
+        store = ss.SegmentStore(self.root)
+        store.put("a", b"1111")
+        store.put("b", b"22")
+        store.put("a", b"33")
+        self.assertEqual(store.garbage_bytes(["a"]), 6)
+        self.assertEqual(store.compact(["a"]), 6)
+        self.assertEqual(bytes(store.get("a")), b"33")
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.data_bytes, 2)
+        self.assertFalse((self.root / "data.0.pcm").exists())
+
+    def test_compact_to_budget_drops_least_recently_used(self):
+        store = ss.SegmentStore(self.root)
+        for key in "abc":
+            store.put(key, key.encode() * 4)
+        store.touch("a")
+        store.compact(max_bytes=8)
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(bytes(store.get("a")), b"aaaa")
+        self.assertEqual(bytes(store.get("c")), b"cccc")
+
+    def test_touches_are_flushed_in_one_write(self):
+        store = ss.SegmentStore(self.root)
+        for key in "abc":
+            store.put(key, key.encode() * 4)
+        index = self.root / ss.INDEX_NAME
+        size = index.stat().st_size
+        for _ in range(3):
+            store.touch("a")
+        self.assertEqual(index.stat().st_size, size)
+        store.flush()
+        store.flush()
+        self.assertEqual(len(index.read_text().splitlines()), 5)
+        ss.SegmentStore(self.root).compact(max_bytes=8)
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(bytes(store.get("a")), b"aaaa")
+
+    def test_reader_follows_compaction_by_another_instance(self):
+        writer = ss.SegmentStore(self.root)
+        writer.put("a", b"1111")
+        writer.put("b", b"2222")
+        reader = ss.SegmentStore(self.root)
+        held = reader.get("b")
+        writer.compact(["b"])
+        self.assertEqual(bytes(reader.get("b")), b"2222")
+        self.assertIsNone(reader.get("a"))
+        self.assertEqual(bytes(held), b"2222")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Unit tests for srt_cues.py.
+
+Run: python3 -m pytest skills/tts/scripts/test_srt_cues.py -v
+"""
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "srt_cues", Path(__file__).parent / "srt_cues.py"
+)
+sc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sc)  # type: ignore[union-attr]
+
+SRT = """\ufeff1
+00:00:01,000 --> 00:00:02,500
+Hello
+  there
+
+2
+00:00:03,000 --> 00:00:04,000
+
+00:00:05,000 --> 00:00:06,250
+No index line
+
+
+7
+100:00:00.000 --> 100:00:01.000
+Long file
+"""
+
+
+class TestIterSrt(unittest.TestCase):
+
+    def test_blocks(self):
+        rows = list(sc.iter_srt(SRT.splitlines()))
+        self.assertEqual(rows, [
+            (1, 1000, 2500, "Hello\nthere"),
+            (2, 3000, 4000, ""),
+            (3, 5000, 6250, "No index line"),
+            (7, 360000000, 360001000, "Long file"),
+        ])
+
+    def test_invalid_timing_raises(self):
+        with self.assertRaises(ValueError):
+            list(sc.iter_srt(["1", "00:00:01 --> 00:00:02", "Hi"]))
+
+    def test_load_srt_streams_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "in.srt"
+            path.write_text(SRT, encoding="utf-8")
+            table = sc.load_srt(path)
+        self.assertEqual(list(table), list(sc.iter_srt(SRT.splitlines())))
+
+
+class TestCueTable(unittest.TestCase):
+
+    def test_columns_and_text_offsets(self):
+        rows = [(i + 1, i * 1000, i * 1000 + 500, "x" * (i % 3)) for i in range(3000)]
+        table = sc.CueTable(rows)
+        self.assertEqual(len(table), 3000)
+        self.assertEqual(list(table), rows)
+        self.assertEqual(table[1500], rows[1500])
+        self.assertEqual(table.text(-1), rows[-1][3])
+        self.assertEqual(table.start_ms[2999], 2999000)
+
+    def test_empty(self):
+        table = sc.CueTable()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(list(table), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -158,6 +158,121 @@ class TestCmdSpeakGuestMode(unittest.TestCase):
         self.assertEqual(rc, 1)
 
 
+# ── incremental sentence splitting ────────────────────────────────────
+
+class TestIterSentences(unittest.TestCase):
+
+    TEXT = "Hello there. How are you?! 你好。世界！\nNext line... done"
+
+    def setUp(self):
+        import text_to_srt
+        self.t2s = text_to_srt
+
+    def test_matches_split_sentences_for_any_chunking(self):
+        expected = self.t2s.split_sentences(self.TEXT)
+        for size in (1, 2, 5, 13, len(self.TEXT)):
+            chunks = [self.TEXT[i:i + size] for i in range(0, len(self.TEXT), size)]
+            self.assertEqual(list(self.t2s.iter_sentences(chunks)), expected)
+
+    def test_sentence_emitted_before_stream_ends(self):
+        def chunks():
+            yield "First one. Sec"
+            raise AssertionError("read past the first closed sentence")
+
+        self.assertEqual(next(self.t2s.iter_sentences(chunks())), "First one.")
+
+    def test_file_is_streamed_to_srt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "in.txt"
+            src.write_text(self.TEXT, encoding="utf-8")
+            chunks = list(self.t2s.read_text_file(src, size=4))
+            self.assertEqual("".join(chunks), self.TEXT)
+
+            out = Path(tmp) / "out.srt"
+            sentences = self.t2s.iter_input_sentences(src)
+            count, end_ms = self.t2s.write_srt(self.t2s.iter_timings(sentences, 4.0, 300), out)
+            expected = self.t2s.estimate_timings(self.t2s.split_sentences(self.TEXT), 4.0, 300)
+            self.assertEqual((count, end_ms), (len(expected), expected[-1][2]))
+            self.assertTrue(out.read_text(encoding="utf-8").startswith(
+                "1\n00:00:00,000 --> 00:00:03,000\nHello there.\n\n2\n"))
+
+    def test_failed_write_leaves_no_srt(self):
+        def entries():
+            yield 1, 0, 500, "One."
+            raise RuntimeError("synthesis failed")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "out.srt"
+            with self.assertRaises(RuntimeError):
+                self.t2s.write_srt(entries(), out)
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+
+# ── script mode parsing ───────────────────────────────────────────────
+
+class TestSynthesizeStream(unittest.TestCase):
+
+    def test_early_stop_releases_reader_and_cancels_jobs(self):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        import stream_tts
+
+        release = threading.Event()
+        calls = []
+
+        class FakeRenderer:
+            workers = 1
+            pool = ThreadPoolExecutor(max_workers=1)
+
+            def synthesize_pcm(self, cue, cfg):
+                calls.append(cue.index)
+                if cue.index > 1:
+                    release.wait(5)
+                return b"pcm"
+
+        renderer = FakeRenderer()
+        self.addCleanup(renderer.pool.shutdown)
+        sentences = ("Sentence {}.".format(i) for i in range(1, 1000))
+        stream = stream_tts.synthesize_stream(renderer, sentences, {}, max_pending=2)
+        self.assertEqual(next(stream)[0], 1)
+        stream.close()
+        release.set()
+        reader = [t for t in threading.enumerate() if t.name == "stream-reader"]
+        for t in reader:
+            t.join(2)
+        self.assertFalse(any(t.is_alive() for t in reader))
+        renderer.pool.shutdown(wait=True)
+        self.assertLessEqual(len(calls), 3)
+
+
+class TestParseScript(unittest.TestCase):
+
+    SCRIPT = (
+        "# Daily news\n\n"
+        "**Host A:** Welcome to [the show](https://example.com). What's *new*?\n\n"
+        "**Host B**: The takeaway is:\nit changes everything.\n"
+        "Host A: Great.\n"
+    )
+
+    def setUp(self):
+        import script_render
+        self.sr = script_render
+
+    def test_labels_and_markdown_are_stripped(self):
+        lines = self.sr.parse_script(self.SCRIPT)
+        self.assertEqual([ln.speaker for ln in lines], ["Host A", "Host B", "Host A"])
+        self.assertEqual(lines[0].text, "Welcome to the show. What's new?")
+
+    def test_unlabelled_line_continues_previous_speaker(self):
+        lines = self.sr.parse_script(self.SCRIPT, known_speakers=["host a", "Host B"])
+        self.assertEqual(lines[1].text, "The takeaway is: it changes everything.")
+
+    def test_unknown_speaker_in_voice_map_raises(self):
+        with self.assertRaises(ValueError):
+            self.sr.resolve_speaker_cfg("Host C", {"speakers": {"Host A": {}}})
+
+
 # ── live integration — real HTTP call to Noiz guest API ───────────────
 
 @unittest.skipUnless(os.getenv("TTS_LIVE_TEST"), "set TTS_LIVE_TEST=1 to run live tests")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Unit tests for voice_registry.py — no network access.
+
+Run: python3 -m pytest skills/tts/scripts/test_voice_registry.py -v
+"""
+import importlib.util
+import io
+import json
+import tempfile
+import unittest
+import urllib.parse
+from pathlib import Path
+from unittest.mock import patch
+
+_spec = importlib.util.spec_from_file_location(
+    "voice_registry", Path(__file__).parent / "voice_registry.py"
+)
+vr = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(vr)  # type: ignore[union-attr]
+
+VOICES = [
+    {"voice_id": "w1", "display_name": "Soft Whisper", "language": "en", "gender": "female"},
+    {"voice_id": "n1", "display_name": "News Anchor", "language": "en-us", "gender": "male"},
+    {"voice_id": "z1", "display_name": "晓晓", "language": "zh", "gender": "female",
+     "description": "whisper ASMR"},
+]
+
+
+def _fake_api(voices):
+    calls = []
+
+    def urlopen(req, timeout=None):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(req.full_url).query)
+        calls.append(query)
+        skip, limit = int(query["skip"][0]), int(query["limit"][0])
+        body = {"code": 0, "data": {"voices": voices[skip:skip + limit]}}
+        return io.BytesIO(json.dumps(body).encode("utf-8"))
+
+    return urlopen, calls
+
+
+class TestVoiceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.registry = vr.VoiceRegistry(Path(self._tmp.name) / "voices.db")
+
+    def tearDown(self):
+        self.registry.close()
+        self._tmp.cleanup()
+
+    def _sync(self, voices, **kwargs):
+        urlopen, calls = _fake_api(voices)
+        with patch("urllib.request.urlopen", side_effect=urlopen):
+            stats = self.registry.sync("key", voice_types=["built-in"], **kwargs)
+        return stats["built-in"], calls
+
+    def test_sync_and_keyword_search(self):
+        stats, _ = self._sync(VOICES)
+        self.assertEqual(stats, {"total": 3, "changed": 3, "removed": 0})
+        ids = [r["voice_id"] for r in self.registry.search("whisper")]
+        self.assertEqual(sorted(ids), ["w1", "z1"])
+        self.assertEqual([r["voice_id"] for r in self.registry.search(language="en")], ["n1", "w1"])
+
+    def test_fresh_index_skips_network(self):
+        self._sync(VOICES)
+        stats, calls = self._sync(VOICES)
+        self.assertEqual(stats, {"skipped": 1})
+        self.assertEqual(calls, [])
+
+    def test_resync_only_rewrites_changes(self):
+        self._sync(VOICES)
+        updated = [dict(VOICES[0], display_name="Softer Whisper"), VOICES[1]]
+        stats, _ = self._sync(updated, force=True)
+        self.assertEqual(stats, {"total": 2, "changed": 1, "removed": 1})
+        self.assertIsNone(self.registry.get("z1"))
+
+    def test_paginates(self):
+        many = [{"voice_id": f"v{i}", "display_name": f"Voice {i}"} for i in range(vr.PAGE_SIZE + 5)]
+        stats, calls = self._sync(many)
+        self.assertEqual(stats["total"], vr.PAGE_SIZE + 5)
+        self.assertEqual(len(calls), 2)
+
+    def test_designed_voices_and_feature_query(self):
+        self.registry.add_designed(
+            "d1", {"display_name": "Old Sailor", "gender": "male", "age": "old"},
+            "gravelly old sailor", "/tmp/preview.wav",
+        )
+        rows = self.registry.search(features={"age": "old"})
+        self.assertEqual([r["voice_id"] for r in rows], ["d1"])
+        self.assertEqual(rows[0]["preview_path"], "/tmp/preview.wav")
+        self.assertEqual(rows[0]["voice_type"], "designed")
+
+    def test_sync_keeps_locally_registered_voice(self):
+        self.registry.add_designed(
+            "d1", {"display_name": "Old Sailor", "age": "old"}, "gravelly", "/tmp/d1.wav"
+        )
+        stats, _ = self._sync(VOICES + [{"voice_id": "d1", "display_name": "API Sailor"}])
+        self.assertEqual(stats, {"total": 4, "changed": 3, "removed": 0})
+        row = self.registry.get("d1")
+        self.assertEqual(row["source"], "local")
+        self.assertEqual(row["name"], "Old Sailor")
+        self.assertEqual(row["preview_path"], "/tmp/d1.wav")
+        self.assertEqual(row["features"]["age"], "old")
+        self._sync(VOICES, force=True)
+        self.assertIsNotNone(self.registry.get("d1"))
+
+    def test_auto_select_uses_local_index(self):
+        self._sync(VOICES)
+        with patch("urllib.request.urlopen") as m:
+            self.assertEqual(vr.auto_select(self.registry, "whisper", "key"), "w1")
+        m.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -3,12 +3,20 @@
 
 Splits text into sentences, estimates duration per sentence based on
 character-per-second rate, and writes a valid SRT file.
+
+``measure_timings`` times entries from synthesized audio instead (``tts.py
+to-srt --measure``) and leaves the audio in the segment cache for ``render``.
+
+The input is read in chunks and entries are written as they are timed, so
+memory stays flat however long the text is.
 """
 import argparse
+import itertools
+import os
 import re
 import sys
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 SENTENCE_SPLIT_RE = re.compile(
@@ -22,23 +30,105 @@ def split_sentences(text: str) -> List[str]:
     return sentences
 
 
-def estimate_timings(
-    sentences: List[str],
+def iter_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """Yield sentences from a stream of text chunks as soon as they close.
+
+    Produces the same sentences as ``split_sentences`` on the joined text:
+    the split pattern only looks behind, so every piece but the last one in
+    the buffer is final and can be emitted before more text arrives. The
+    carried-over tail never ends in a terminator, so only the new chunk has
+    to be scanned and a boundary on a chunk edge is still found.
+    """
+    tail: List[str] = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pieces = SENTENCE_SPLIT_RE.split(chunk)
+        if len(pieces) == 1:
+            tail.append(chunk)
+            continue
+        tail.append(pieces[0])
+        pieces[0] = "".join(tail)
+        for piece in pieces[:-1]:
+            piece = piece.strip()
+            if piece:
+                yield piece
+        tail = [pieces[-1]]
+    last = "".join(tail).strip()
+    if last:
+        yield last
+
+
+def read_text_file(path: Path, size: int = 1 << 16) -> Iterator[str]:
+    """Yield a UTF-8 text file in chunks of ``size`` characters."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_timings(
+    sentences: Iterable[str],
     chars_per_second: float,
     gap_ms: int,
     start_offset_ms: int = 0,
-) -> List[Tuple[int, int, int, str]]:
-    """Return list of (index, start_ms, end_ms, text)."""
-    result = []
+) -> Iterator[Tuple[int, int, int, str]]:
+    """Yield (index, start_ms, end_ms, text) with durations from ``chars_per_second``."""
     cursor_ms = start_offset_ms
     for i, sentence in enumerate(sentences, start=1):
         char_count = len(sentence)
         duration_ms = max(500, int(char_count / chars_per_second * 1000))
         start_ms = cursor_ms
         end_ms = start_ms + duration_ms
-        result.append((i, start_ms, end_ms, sentence))
+        yield i, start_ms, end_ms, sentence
         cursor_ms = end_ms + gap_ms
-    return result
+
+
+def estimate_timings(
+    sentences: List[str],
+    chars_per_second: float,
+    gap_ms: int,
+    start_offset_ms: int = 0,
+) -> List[Tuple[int, int, int, str]]:
+    """Return list of (index, start_ms, end_ms, text)."""
+    return list(iter_timings(sentences, chars_per_second, gap_ms, start_offset_ms))
+
+
+def measure_timings(
+    renderer: Any,
+    sentences: Iterable[str],
+    voice_map: Dict[str, Any],
+    gap_ms: int,
+    start_offset_ms: int = 0,
+    cache: Optional[Any] = None,
+) -> Iterator[Tuple[int, int, int, str]]:
+    """Yield (index, start_ms, end_ms, text) timed by each sentence's real audio.
+
+    Sentences are synthesized concurrently on ``renderer`` at their natural
+    length with the voice-map cfg of their index, the same cfg ``render``
+    resolves for that cue. With a ``segment_cache.SegmentCache``, each
+    sentence's audio is stored under the key ``render`` will look up.
+    """
+    from render_timeline import SAMPLE_WIDTH, fit_duration_pad_trim, resolve_segment_cfg
+    from segment_cache import segment_key
+    from stream_tts import synthesize_stream
+
+    sample_rate = renderer.sample_rate
+    cursor_ms = start_offset_ms
+
+    def cfg_for(index: int) -> Dict[str, Any]:
+        return resolve_segment_cfg(index, voice_map)
+
+    for index, sentence, pcm in synthesize_stream(renderer, sentences, cfg_for):
+        samples = len(pcm) // SAMPLE_WIDTH
+        duration_ms = max(1, -(-samples * 1000 // sample_rate))
+        if cache is not None:
+            key = segment_key(renderer.backend, cfg_for(index), sentence, duration_ms, sample_rate)
+            cache.put(key, fit_duration_pad_trim(pcm, duration_ms * sample_rate // 1000))
+        yield index, cursor_ms, cursor_ms + duration_ms, sentence
+        cursor_ms += duration_ms + gap_ms
 
 
 def ms_to_srt_time(ms: int) -> str:
@@ -48,15 +138,35 @@ def ms_to_srt_time(ms: int) -> str:
     return f"{hour:02d}:{minute:02d}:{sec:02d},{millis:03d}"
 
 
-def write_srt(entries: List[Tuple[int, int, int, str]], path: Path) -> None:
-    lines = []
-    for idx, start_ms, end_ms, text in entries:
-        lines.append(str(idx))
-        lines.append(f"{ms_to_srt_time(start_ms)} --> {ms_to_srt_time(end_ms)}")
-        lines.append(text)
-        lines.append("")
+def write_srt(entries: Iterable[Tuple[int, int, int, str]], path: Path) -> Tuple[int, int]:
+    """Write entries as they come; ``path`` only appears once all are written.
+
+    Returns (entry count, end of the last entry in ms).
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text("\n".join(lines), encoding="utf-8")
+    tmp = path.with_name(path.name + ".partial")
+    count = end_ms = 0
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            for idx, start_ms, end_ms, text in entries:
+                if count:
+                    f.write("\n")
+                f.write(f"{idx}\n{ms_to_srt_time(start_ms)} --> {ms_to_srt_time(end_ms)}\n{text}\n")
+                count += 1
+        os.replace(str(tmp), str(path))
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return count, end_ms
+
+
+def iter_input_sentences(path: Path) -> Optional[Iterator[str]]:
+    """Stream the sentences of a text file, or return None if it has none."""
+    sentences = iter_sentences(read_text_file(path))
+    first = next(sentences, None)
+    if first is None:
+        return None
+    return itertools.chain([first], sentences)
 
 
 def main() -> int:
@@ -87,23 +197,18 @@ def main() -> int:
     args = parser.parse_args()
 
     try:
-        text = Path(args.input).read_text(encoding="utf-8").strip()
-        if not text:
+        sentences = iter_input_sentences(Path(args.input))
+        if sentences is None:
             raise ValueError("Input text is empty.")
 
-        sentences = split_sentences(text)
-        if not sentences:
-            raise ValueError("No sentences found after splitting.")
-
-        entries = estimate_timings(
+        entries = iter_timings(
             sentences,
             chars_per_second=args.chars_per_second,
             gap_ms=args.gap_ms,
             start_offset_ms=args.start_offset_ms,
         )
-        write_srt(entries, Path(args.output))
-        print(f"Done. {len(entries)} segments written to {args.output}")
-        total_ms = entries[-1][2] if entries else 0
+        count, total_ms = write_srt(entries, Path(args.output))
+        print(f"Done. {count} segments written to {args.output}")
         print(f"Total duration: {ms_to_srt_time(total_ms)}")
         return 0
     except Exception as exc:
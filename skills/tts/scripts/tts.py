@@ -3,7 +3,7 @@
 
 Supports Python 3.6-3.11.
 Default mode: speak (no subcommand required).
-Other subcommands: render, to-srt, config
+Other subcommands: stream, audiobook, render, script, to-srt, config
 """
 import argparse
 import base64
@@ -16,7 +16,7 @@ import subprocess
 import sys
 import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 SCRIPT_DIR = Path(__file__).parent
 if str(SCRIPT_DIR) not in sys.path:
@@ -97,6 +97,19 @@ def save_api_key(key: str) -> None:
     os.chmod(str(NOIZ_KEY_FILE), 0o600)
 
 
+def _require_api_key() -> Optional[str]:
+    """The configured key, or None after telling the user how to set one."""
+    api_key = load_api_key()
+    if not api_key:
+        print("Error: NOIZ_API_KEY not configured.", file=sys.stderr)
+        print("  Get your key at https://developers.noiz.ai/api-keys", file=sys.stderr)
+        print(
+            "  Then run: python3 skills/tts/scripts/tts.py config --set-api-key YOUR_KEY",
+            file=sys.stderr,
+        )
+    return api_key
+
+
 # ── Backend detection ─────────────────────────────────────────────────
 
 
@@ -142,17 +155,14 @@ def detect_text_lang(text: str) -> str:
 
 
 def prepare_ref_audio(ref_audio_input: str) -> str:
-    """Download ref audio if URL; return local path."""
-    if ref_audio_input.startswith("http://") or ref_audio_input.startswith("https://"):
-        import urllib.request
+    """Resolve ref audio to a local path, fetching URLs through the shared cache.
 
-        tmp = mktemp_suffixed(".wav")
-        print(
-            "[noiz] Downloading reference audio: {}".format(ref_audio_input),
-            file=sys.stderr,
-        )
-        urllib.request.urlretrieve(ref_audio_input, str(tmp))
-        return str(tmp)
+    The returned path for a URL belongs to the cache and must not be deleted.
+    """
+    from ref_cache import fetch as _fetch_ref, is_url
+
+    if is_url(ref_audio_input):
+        return str(_fetch_ref(ref_audio_input))
     return ref_audio_input
 
 
@@ -260,21 +270,12 @@ def cmd_speak(args: argparse.Namespace) -> int:
 
     # ── noiz (authenticated) ─────────────────────────────────────────
     else:
-        api_key = load_api_key()
+        api_key = _require_api_key()
         if not api_key:
-            print("Error: NOIZ_API_KEY not configured.", file=sys.stderr)
-            print(
-                "  Get your key at https://developers.noiz.ai/api-keys", file=sys.stderr
-            )
-            print(
-                "  Then run: python3 skills/tts/scripts/tts.py config --set-api-key YOUR_KEY",
-                file=sys.stderr,
-            )
             return 1
         ensure_noiz_ready()
 
         ref_audio = args.ref_audio or ""
-        downloaded_ref_path = None  # type: Optional[str]
 
         if not args.voice_id and not ref_audio:
             ref_lang = args.lang or ""
@@ -291,11 +292,8 @@ def cmd_speak(args: argparse.Namespace) -> int:
             )
             print("[noiz] Using default reference audio: {}".format(ref_audio), file=sys.stderr)
 
-        if ref_audio and (
-            ref_audio.startswith("http://") or ref_audio.startswith("https://")
-        ):
-            downloaded_ref_path = prepare_ref_audio(ref_audio)
-            ref_audio = downloaded_ref_path
+        if ref_audio:
+            ref_audio = prepare_ref_audio(ref_audio)
 
         from noiz_tts import synthesize as _noiz_synthesize, call_emotion_enhance as _noiz_emotion_enhance
 
@@ -306,29 +304,22 @@ def cmd_speak(args: argparse.Namespace) -> int:
         if args.auto_emotion:
             text = _noiz_emotion_enhance("https://noiz.ai/v1", api_key, text, 120)
 
-        try:
-            _noiz_synthesize(
-                base_url="https://noiz.ai/v1",
-                api_key=api_key,
-                text=text,
-                voice_id=args.voice_id,
-                reference_audio=Path(ref_audio) if ref_audio else None,
-                output_format=fmt,
-                speed=args.speed or 1.0,
-                emo=args.emo,
-                target_lang=args.lang,
-                similarity_enh=args.similarity_enh,
-                save_voice=args.save_voice,
-                duration=args.duration,
-                timeout=120,
-                out_path=Path(output),
-            )
-        finally:
-            if downloaded_ref_path and downloaded_ref_path != (args.ref_audio or ""):
-                try:
-                    os.unlink(downloaded_ref_path)
-                except OSError:
-                    pass
+        _noiz_synthesize(
+            base_url="https://noiz.ai/v1",
+            api_key=api_key,
+            text=text,
+            voice_id=args.voice_id,
+            reference_audio=Path(ref_audio) if ref_audio else None,
+            output_format=fmt,
+            speed=args.speed or 1.0,
+            emo=args.emo,
+            target_lang=args.lang,
+            similarity_enh=args.similarity_enh,
+            save_voice=args.save_voice,
+            duration=args.duration,
+            timeout=120,
+            out_path=Path(output),
+        )
 
     if play_mode:
         play_audio(output)
@@ -337,6 +328,181 @@ def cmd_speak(args: argparse.Namespace) -> int:
     return 0
 
 
+# ── stream ────────────────────────────────────────────────────────────
+
+
+def _voice_cfg(args: argparse.Namespace, backend: str, sample_text: str) -> dict:
+    """Per-segment cfg for Renderer from the stream/audiobook voice flags."""
+    cfg = {}  # type: dict
+    if args.speed is not None:
+        cfg["speed"] = args.speed
+    if backend == "kokoro":
+        cfg.update({"voice": args.voice, "lang": args.lang})
+    else:
+        cfg["voice_id"] = args.voice_id
+    if backend == "noiz":
+        cfg.update({"emo": args.emo, "target_lang": args.lang})
+        ref_audio = args.ref_audio or ""
+        if not args.voice_id and not ref_audio:
+            ref_lang = args.lang or detect_text_lang(sample_text)
+            ref_audio = (
+                DEFAULT_NOIZ_REF_AUDIO_URL_CN
+                if ref_lang == "zh"
+                else DEFAULT_NOIZ_REF_AUDIO_URL_EN
+            )
+            print("[noiz] Using default reference audio: {}".format(ref_audio), file=sys.stderr)
+        if ref_audio:
+            cfg["reference_audio"] = prepare_ref_audio(ref_audio)
+    return cfg
+
+
+def cmd_stream(args: argparse.Namespace) -> int:
+    import itertools
+    import time
+
+    backend = detect_backend(args.backend or "")
+    api_key = None  # type: Optional[str]
+    if backend == "noiz":
+        api_key = _require_api_key()
+        if not api_key:
+            return 1
+    if backend != "kokoro":
+        ensure_noiz_ready()
+    if backend == "noiz-guest" and not args.voice_id:
+        print(
+            "Error: --voice-id is required in guest mode (no API key configured).",
+            file=sys.stderr,
+        )
+        return 1
+
+    from duration_planner import DurationPlanner
+    from render_timeline import SAMPLE_WIDTH, Renderer, pcm_to_wav_bytes, write_audio
+    from stream_tts import read_text_chunks, synthesize_stream
+    from text_to_srt import iter_sentences
+
+    sentences = iter_sentences(read_text_chunks())
+    first = next(sentences, None)
+    if first is None:
+        print("Error: no text received on stdin.", file=sys.stderr)
+        return 1
+    t0 = time.monotonic()
+
+    cfg = _voice_cfg(args, backend, first)
+
+    pcm_parts = []  # type: List[bytes]
+    count = 0
+    try:
+        with Renderer(backend, api_key=api_key, workers=args.workers, planner=DurationPlanner()) as renderer:
+            renderer.check_ready()
+            gap = bytes(args.pause_ms * renderer.sample_rate // 1000 * SAMPLE_WIDTH)
+            stream = synthesize_stream(renderer, itertools.chain([first], sentences), cfg)
+            for index, sentence, pcm in stream:
+                if count == 0:
+                    print(
+                        "[stream] First audio ready after {:.2f}s".format(time.monotonic() - t0),
+                        file=sys.stderr,
+                    )
+                count += 1
+                print("[stream] {}: {}".format(index, sentence), file=sys.stderr)
+                if args.output:
+                    if pcm_parts:
+                        pcm_parts.append(gap)
+                    pcm_parts.append(pcm)
+                else:
+                    tmp = mktemp_suffixed(".wav")
+                    try:
+                        tmp.write_bytes(pcm_to_wav_bytes(pcm, renderer.sample_rate))
+                        play_audio(str(tmp))
+                    finally:
+                        unlink_silent(tmp)
+            if args.output:
+                write_audio(b"".join(pcm_parts), renderer.sample_rate, args.output)
+    except Exception as exc:
+        print("Error: {}".format(exc), file=sys.stderr)
+        return 1
+
+    if args.output:
+        print("Done. {} sentences written to {}".format(count, args.output))
+    return 0
+
+
+# ── audiobook ────────────────────────────────────────────────────────
+
+
+def cmd_audiobook(args: argparse.Namespace) -> int:
+    backend = detect_backend(args.backend or "")
+    api_key = None  # type: Optional[str]
+    if backend == "noiz":
+        api_key = _require_api_key()
+        if not api_key:
+            return 1
+    if backend != "kokoro":
+        ensure_noiz_ready()
+    if backend == "noiz-guest" and not args.voice_id:
+        print(
+            "Error: --voice-id is required in guest mode (no API key configured).",
+            file=sys.stderr,
+        )
+        return 1
+
+    from audiobook import assemble, plan_chapters, synthesize_chunks
+    from duration_planner import DurationPlanner
+    from render_timeline import Renderer
+
+    text_path = Path(args.text_file)
+    if not text_path.exists():
+        print("Error: text file not found: {}".format(args.text_file), file=sys.stderr)
+        return 1
+    chapters = plan_chapters(text_path.read_text(encoding="utf-8"), args.max_chars)
+    if not chapters:
+        print("Error: no text found in {}".format(args.text_file), file=sys.stderr)
+        return 1
+
+    output = Path(args.output)
+    work_dir = Path(args.work_dir) if args.work_dir else output.with_name(output.stem + "_audiobook")
+    chapters_dir = Path(args.chapters_dir) if args.chapters_dir else work_dir / "chapters"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    total = sum(len(ch.chunks) for ch in chapters)
+    print(
+        "[audiobook] {} chapters, {} chunks, work dir {}".format(len(chapters), total, work_dir),
+        file=sys.stderr,
+    )
+
+    try:
+        cfg = _voice_cfg(args, backend, chapters[0].chunks[0])
+        with Renderer(backend, api_key=api_key, workers=args.workers, planner=DurationPlanner()) as renderer:
+            renderer.check_ready()
+            reused, done, failed = synthesize_chunks(
+                renderer, chapters, cfg, work_dir,
+                progress=lambda msg: print("[audiobook] " + msg, file=sys.stderr),
+            )
+            print(
+                "[audiobook] {} chunks reused, {} synthesized, {} failed".format(
+                    reused, done, len(failed)
+                ),
+                file=sys.stderr,
+            )
+            if failed:
+                print(
+                    "Error: {} chunks failed ({}). Re-run the same command to retry "
+                    "only the missing chunks.".format(len(failed), ", ".join(failed[:5])),
+                    file=sys.stderr,
+                )
+                return 1
+            markers = assemble(
+                chapters, work_dir, output, chapters_dir, renderer.sample_rate,
+                pause_ms=args.pause_ms, chapter_pause_ms=args.chapter_pause_ms,
+                title=args.title or text_path.stem,
+            )
+    except Exception as exc:
+        print("Error: {}".format(exc), file=sys.stderr)
+        return 1
+
+    print("Done. Output: {}".format(output))
+    print("Chapters: {} files in {}".format(len(markers), chapters_dir))
+    return 0
+
+
 # ── render ────────────────────────────────────────────────────────────
 
 
@@ -366,16 +532,8 @@ def cmd_render(args: argparse.Namespace, extra: List[str]) -> int:
         return 1
 
     if backend == "noiz":
-        api_key = load_api_key()
+        api_key = _require_api_key()
         if not api_key:
-            print("Error: NOIZ_API_KEY not configured.", file=sys.stderr)
-            print(
-                "  Get your key at https://developers.noiz.ai/api-keys", file=sys.stderr
-            )
-            print(
-                "  Then run: python3 skills/tts/scripts/tts.py config --set-api-key YOUR_KEY",
-                file=sys.stderr,
-            )
             return 1
     else:
         api_key = None
@@ -387,33 +545,142 @@ def cmd_render(args: argparse.Namespace, extra: List[str]) -> int:
     render_argv += extra
 
     from render_timeline import main as _render_main
-    old_argv = sys.argv
+
+    return _render_main(render_argv)
+
+
+# ── script ────────────────────────────────────────────────────────────
+
+
+def cmd_script(args: argparse.Namespace) -> int:
+    import json
+
+    backend = detect_backend(args.backend or "")
+    api_key = None  # type: Optional[str]
+    if backend == "noiz":
+        api_key = _require_api_key()
+        if not api_key:
+            return 1
+    if backend != "kokoro":
+        ensure_noiz_ready()
+
+    voice_map = {}  # type: dict
+    if args.voice_map:
+        voice_map = json.loads(Path(args.voice_map).read_text(encoding="utf-8"))
+    speakers = dict(voice_map.get("speakers", {}))
+    voice_key = "voice" if backend == "kokoro" else "voice_id"
+    for item in args.speaker or []:
+        name, sep, voice = item.partition("=")
+        if not sep or not name.strip() or not voice.strip():
+            print("Error: --speaker expects NAME=VOICE, got: {}".format(item), file=sys.stderr)
+            return 1
+        speakers[name.strip()] = {voice_key: voice.strip()}
+    if not speakers:
+        print("Error: --voice-map or --speaker is required.", file=sys.stderr)
+        return 1
+    voice_map["speakers"] = speakers
+
+    from duration_planner import DurationPlanner
+    from render_timeline import Renderer, write_audio
+    from script_render import parse_script, render_script
+
+    lines = parse_script(Path(args.script).read_text(encoding="utf-8"), speakers)
+    if not lines:
+        print("Error: no lines for the configured speakers in {}".format(args.script), file=sys.stderr)
+        return 1
+
     try:
-        sys.argv = ["render_timeline.py"] + render_argv
-        return _render_main()
-    finally:
-        sys.argv = old_argv
+        with Renderer(backend, api_key=api_key, workers=args.workers, planner=DurationPlanner()) as renderer:
+            pcm, timings = render_script(
+                renderer, lines, voice_map,
+                pause_ms=args.pause_ms,
+                speaker_change_pause_ms=args.speaker_change_pause_ms,
+            )
+            write_audio(pcm, renderer.sample_rate, args.output)
+    except Exception as exc:
+        print("Error: {}".format(exc), file=sys.stderr)
+        return 1
+
+    report_path = Path(args.report) if args.report else Path(args.output).with_suffix(".timing.json")
+    report_path.write_text(
+        json.dumps({
+            "script": args.script,
+            "output": args.output,
+            "backend": backend,
+            "total_ms": timings[-1]["end_ms"],
+            "lines": timings,
+        }, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    print("Done. {} lines written to {}".format(len(timings), args.output))
+    print("Timing report: {}".format(report_path))
+    return 0
 
 
 # ── to-srt ────────────────────────────────────────────────────────────
 
 
 def cmd_to_srt(args: argparse.Namespace) -> int:
-    from text_to_srt import split_sentences, estimate_timings, write_srt
+    from text_to_srt import iter_input_sentences, iter_timings, write_srt
 
-    text = Path(args.input).read_text(encoding="utf-8").strip()
-    if not text:
+    # Sentences are read and SRT entries written incrementally.
+    sentences = iter_input_sentences(Path(args.input))
+    if sentences is None:
         print("Error: Input text is empty.", file=sys.stderr)
         return 1
-    sentences = split_sentences(text)
-    if not sentences:
-        print("Error: No sentences found after splitting.", file=sys.stderr)
-        return 1
-    cps = args.cps if args.cps is not None else 4.0
     gap = args.gap if args.gap is not None else 300
-    entries = estimate_timings(sentences, chars_per_second=cps, gap_ms=gap)
-    write_srt(entries, Path(args.output))
-    print("Done. {} segments written to {}".format(len(entries), args.output))
+    if args.measure:
+        return _to_srt_measured(args, sentences, gap)
+    cps = args.cps if args.cps is not None else 4.0
+    count, _ = write_srt(iter_timings(sentences, chars_per_second=cps, gap_ms=gap), Path(args.output))
+    print("Done. {} segments written to {}".format(count, args.output))
+    return 0
+
+
+def _to_srt_measured(args: argparse.Namespace, sentences: Iterable[str], gap: int) -> int:
+    """Time the SRT from synthesized audio and cache it for the next render."""
+    import json
+
+    if not args.voice_map:
+        print("Error: --measure requires --voice-map (the one you will render with).",
+              file=sys.stderr)
+        return 1
+    backend = detect_backend(args.backend or "")
+    if backend == "noiz-guest":
+        print("Error: --measure requires a Noiz API key or Kokoro backend.", file=sys.stderr)
+        return 1
+    api_key = None  # type: Optional[str]
+    if backend == "noiz":
+        api_key = _require_api_key()
+        if not api_key:
+            return 1
+
+    from duration_planner import DurationPlanner
+    from render_timeline import Renderer
+    from segment_cache import SegmentCache
+    from text_to_srt import measure_timings, ms_to_srt_time, write_srt
+
+    try:
+        voice_map = json.loads(Path(args.voice_map).read_text(encoding="utf-8"))
+        cache = SegmentCache()
+        with Renderer(backend, api_key=api_key, workers=args.workers, planner=DurationPlanner()) as renderer:
+            renderer.check_ready()
+            count, total_ms = write_srt(
+                measure_timings(renderer, sentences, voice_map, gap, cache=cache),
+                Path(args.output),
+            )
+        cache.prune()
+    except Exception as exc:
+        print("Error: {}".format(exc), file=sys.stderr)
+        return 1
+    if not count:
+        Path(args.output).unlink()
+        print("Error: No speakable sentences found.", file=sys.stderr)
+        return 1
+    print("Done. {} measured segments written to {} (total {})".format(
+        count, args.output, ms_to_srt_time(total_ms)))
+    print("Audio cached: `render --srt {} --voice-map {} --backend {}` makes no TTS calls.".format(
+        args.output, args.voice_map, backend))
     return 0
 
 
@@ -452,7 +719,7 @@ def cmd_config(args: argparse.Namespace) -> int:
 # ── Argument parser ───────────────────────────────────────────────────
 
 
-_SUBCOMMANDS = {"speak", "render", "to-srt", "config"}
+_SUBCOMMANDS = {"speak", "stream", "audiobook", "render", "script", "to-srt", "config"}
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -464,7 +731,11 @@ def build_parser() -> argparse.ArgumentParser:
             "  tts.py -t 'Hello world'               # same as: tts.py speak -t ...\n"
             "  tts.py -t 'Hi' --ref-audio ./my.wav -o clone.wav\n\n"
             "Other subcommands must be specified explicitly:\n"
+            "  llm ... | tts.py stream --voice-id 883b6b7c  # speak stdin sentence by sentence\n"
+            "  tts.py audiobook -f book.txt --voice-id 883b6b7c -o book.m4a\n"
             "  tts.py render --srt input.srt --voice-map vm.json -o output.wav\n"
+            "  tts.py script --script podcast.md --speaker 'Host A=883b6b7c' "
+            "--speaker 'Host B=0e4ab6ec' -o podcast.wav\n"
             "  tts.py to-srt -i article.txt -o article.srt\n"
             "  tts.py config --set-api-key YOUR_KEY"
         ),
@@ -508,17 +779,96 @@ def build_parser() -> argparse.ArgumentParser:
     sp.add_argument("--similarity-enh", dest="similarity_enh", action="store_true")
     sp.add_argument("--save-voice", dest="save_voice", action="store_true")
 
+    # stream
+    stp = sub.add_parser(
+        "stream", help="Speak text from stdin sentence by sentence as it arrives"
+    )
+    stp.add_argument("-v", "--voice", help="Kokoro voice name")
+    stp.add_argument("--voice-id", dest="voice_id", help="Noiz voice ID")
+    stp.add_argument("--ref-audio", dest="ref_audio",
+                     help="Reference audio for voice cloning: local path or URL (Noiz only)")
+    stp.add_argument("-o", "--output", help="Output file path (omit to play each sentence immediately)")
+    stp.add_argument("--lang", help="Language code (e.g. zh, en-us)")
+    stp.add_argument("--speed", type=float, help="Playback speed multiplier")
+    stp.add_argument("--emo", help='Emotion JSON string, e.g. \'{"Joy":0.5}\'')
+    stp.add_argument(
+        "--backend",
+        choices=["kokoro", "noiz", "noiz-guest"],
+        help="Force a specific backend (auto-detected by default)",
+    )
+    stp.add_argument("--workers", type=int, default=3,
+                     help="Sentences synthesized concurrently (default 3)")
+    stp.add_argument("--pause-ms", dest="pause_ms", type=int, default=150,
+                     help="Silence between sentences when writing --output (default 150)")
+
+    # audiobook
+    abp = sub.add_parser(
+        "audiobook", help="Book-length text to chaptered audio (resumable)"
+    )
+    abp.add_argument("-f", "--text-file", dest="text_file", required=True, help="Book text file")
+    abp.add_argument("-o", "--output", required=True,
+                     help="Combined output (m4a/mp3 get embedded chapter markers)")
+    abp.add_argument("-v", "--voice", help="Kokoro voice name")
+    abp.add_argument("--voice-id", dest="voice_id", help="Noiz voice ID")
+    abp.add_argument("--ref-audio", dest="ref_audio",
+                     help="Reference audio for voice cloning: local path or URL (Noiz only)")
+    abp.add_argument("--lang", help="Language code (e.g. zh, en-us)")
+    abp.add_argument("--speed", type=float, help="Playback speed multiplier")
+    abp.add_argument("--emo", help='Emotion JSON string, e.g. \'{"Joy":0.5}\'')
+    abp.add_argument(
+        "--backend",
+        choices=["kokoro", "noiz", "noiz-guest"],
+        help="Force a specific backend (auto-detected by default)",
+    )
+    abp.add_argument("--title", help="Book title for the output metadata (default: file name)")
+    abp.add_argument("--work-dir", dest="work_dir",
+                     help="Manifest and chunk audio (default: <output>_audiobook/)")
+    abp.add_argument("--chapters-dir", dest="chapters_dir",
+                     help="Per-chapter WAV files (default: <work-dir>/chapters)")
+    abp.add_argument("--max-chars", dest="max_chars", type=int, default=800,
+                     help="Max characters per synthesized chunk (default 800)")
+    abp.add_argument("--workers", type=int, default=4, help="Chunks synthesized concurrently")
+    abp.add_argument("--pause-ms", dest="pause_ms", type=int, default=300,
+                     help="Silence between chunks (default 300)")
+    abp.add_argument("--chapter-pause-ms", dest="chapter_pause_ms", type=int, default=1500,
+                     help="Silence between chapters in the combined output (default 1500)")
+
     # render
     rp = sub.add_parser("render", help="SRT to timeline-accurate audio")
     rp.add_argument("--srt", required=True, help="Input SRT file")
     rp.add_argument("--voice-map", dest="voice_map", required=True, help="Voice map JSON file")
-    rp.add_argument("-o", "--output", required=True, help="Output audio file")
+    rp.add_argument("-o", "--output", required=True,
+                    help="Output audio file, or - to stream WAV to stdout (e.g. into ffmpeg)")
     rp.add_argument(
         "--backend",
         choices=["kokoro", "noiz"],
         help="Backend to use (auto-detected by default)",
     )
 
+    # script
+    scp = sub.add_parser("script", help="Speaker-labelled Markdown script to one audio file")
+    scp.add_argument("--script", required=True, help="Markdown script ('**Host A:** ...' lines)")
+    scp.add_argument("-o", "--output", required=True, help="Output audio file")
+    scp.add_argument(
+        "--voice-map", dest="voice_map",
+        help="Voice map JSON with a 'speakers' block (speaker -> voice config)",
+    )
+    scp.add_argument(
+        "--speaker", action="append", metavar="NAME=VOICE",
+        help="Map a speaker label to a voice id (Kokoro: voice name); repeatable",
+    )
+    scp.add_argument(
+        "--backend",
+        choices=["kokoro", "noiz", "noiz-guest"],
+        help="Force a specific backend (auto-detected by default)",
+    )
+    scp.add_argument("--pause-ms", dest="pause_ms", type=int, default=400,
+                     help="Silence between lines of the same speaker (default 400)")
+    scp.add_argument("--speaker-change-pause-ms", dest="speaker_change_pause_ms", type=int,
+                     help="Silence when the speaker changes (default: --pause-ms)")
+    scp.add_argument("--workers", type=int, default=4, help="Lines synthesized concurrently")
+    scp.add_argument("--report", help="Timing report path (default: <output>.timing.json)")
+
     # to-srt
     tp = sub.add_parser("to-srt", help="Text file to SRT with auto timings")
     tp.add_argument("-i", "--input", required=True, help="Input text file")
@@ -529,6 +879,15 @@ def build_parser() -> argparse.ArgumentParser:
         help="Characters per second (default 4 for Chinese, ~15 for English)",
     )
     tp.add_argument("--gap", type=int, help="Gap between segments in milliseconds")
+    tp.add_argument("--measure", action="store_true",
+                    help="Synthesize each sentence and time the SRT from the real audio; "
+                         "the audio is cached so the following render reuses it")
+    tp.add_argument("--voice-map", dest="voice_map",
+                    help="Voice map JSON used for --measure (same as for render)")
+    tp.add_argument("--backend", choices=["kokoro", "noiz"],
+                    help="Backend for --measure (auto-detected by default)")
+    tp.add_argument("--workers", type=int, default=4,
+                    help="Sentences synthesized concurrently with --measure")
 
     # config
     cp = sub.add_parser("config", help="Check / set NOIZ_API_KEY")
@@ -559,8 +918,23 @@ def main() -> int:
             print("Unknown options: {}".format(" ".join(extra)), file=sys.stderr)
             return 1
         return cmd_speak(args)
+    elif args.command == "stream":
+        if extra:
+            print("Unknown options: {}".format(" ".join(extra)), file=sys.stderr)
+            return 1
+        return cmd_stream(args)
+    elif args.command == "audiobook":
+        if extra:
+            print("Unknown options: {}".format(" ".join(extra)), file=sys.stderr)
+            return 1
+        return cmd_audiobook(args)
     elif args.command == "render":
         return cmd_render(args, extra)
+    elif args.command == "script":
+        if extra:
+            print("Unknown options: {}".format(" ".join(extra)), file=sys.stderr)
+            return 1
+        return cmd_script(args)
     elif args.command == "to-srt":
         if extra:
             print("Unknown options: {}".format(" ".join(extra)), file=sys.stderr)
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""Local registry of Noiz voices for fast voice_id lookup.
+
+An SQLite index at ``$XDG_DATA_HOME/noiz/voices.db``
+(``~/.local/share/noiz/voices.db`` by default) of built-in voices synced
+from ``/voices``, plus voices designed with ``voice_design.py`` together
+with their features and preview files. Keyword and feature queries run
+locally, so callers such as ``speak.sh`` only hit the network when the
+index for a voice type is missing or older than its max age.
+
+``/voices`` has no modified-since filter, so a sync walks the pages,
+then, in one transaction, rewrites only rows whose content changed and
+drops voices that disappeared. Locally registered voices are never
+overwritten by a sync.
+
+    voice_registry.py sync [--force]
+    voice_registry.py search whisper --lang en
+    voice_registry.py auto-select whisper   # prints one voice_id
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_BASE_URL = "https://noiz.ai/v1"
+DEFAULT_MAX_AGE_SEC = 24 * 3600
+DEFAULT_TYPES = ("built-in", "custom")
+PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS voices (
+    voice_id     TEXT PRIMARY KEY,
+    source       TEXT NOT NULL,
+    voice_type   TEXT,
+    name         TEXT,
+    language     TEXT,
+    gender       TEXT,
+    description  TEXT,
+    features     TEXT,
+    preview_path TEXT,
+    content_hash TEXT,
+    updated_at   REAL
+);
+CREATE INDEX IF NOT EXISTS voices_type ON voices (voice_type);
+CREATE TABLE IF NOT EXISTS sync_state (
+    voice_type TEXT PRIMARY KEY,
+    synced_at  REAL,
+    count      INTEGER
+);
+"""
+
+
+def default_db_path() -> Path:
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(base) / "noiz" / "voices.db"
+
+
+def _first(row: Dict[str, Any], *keys: str) -> str:
+    for key in keys:
+        value = row.get(key)
+        if value:
+            return str(value)
+    return ""
+
+
+def _row_from_api(row: Dict[str, Any], voice_type: str) -> Dict[str, Any]:
+    features = {k: v for k, v in row.items() if k not in ("voice_id", "audio", "preview_audio")}
+    return {
+        "voice_id": str(row["voice_id"]),
+        "source": "api",
+        "voice_type": _first(row, "voice_type") or voice_type,
+        "name": _first(row, "display_name", "voice_name", "name"),
+        "language": _first(row, "language", "lang"),
+        "gender": _first(row, "gender"),
+        "description": _first(row, "description", "voice_description"),
+        "features": features,
+        "preview_path": "",
+    }
+
+
+class VoiceRegistry:
+    """SQLite-backed voice index. Use as a context manager or call ``close()``."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else default_db_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "VoiceRegistry":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ── writes ────────────────────────────────────────────────────────
+
+    def upsert(self, voice: Dict[str, Any]) -> bool:
+        """Insert or update one voice; returns True when anything changed.
+
+        A ``/voices`` row never replaces one registered locally (voice
+        design or a saved clone), whose preview and features the API lacks.
+        """
+        with self.conn:
+            return self._upsert(voice)
+
+    def _upsert(self, voice: Dict[str, Any]) -> bool:
+        features = json.dumps(voice.get("features") or {}, ensure_ascii=False, sort_keys=True)
+        fields = [
+            voice.get("source") or "api",
+            voice.get("voice_type") or "",
+            voice.get("name") or "",
+            voice.get("language") or "",
+            voice.get("gender") or "",
+            voice.get("description") or "",
+            features,
+            voice.get("preview_path") or "",
+        ]
+        content_hash = hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+        cur = self.conn.execute(
+            "INSERT INTO voices (voice_id, source, voice_type, name, language, gender,"
+            " description, features, preview_path, content_hash, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (voice_id) DO UPDATE SET"
+            " source = excluded.source, voice_type = excluded.voice_type,"
+            " name = excluded.name, language = excluded.language, gender = excluded.gender,"
+            " description = excluded.description, features = excluded.features,"
+            " preview_path = excluded.preview_path, content_hash = excluded.content_hash,"
+            " updated_at = excluded.updated_at"
+            " WHERE voices.content_hash IS NOT excluded.content_hash"
+            " AND (excluded.source = 'local' OR voices.source <> 'local')",
+            [voice["voice_id"]] + fields + [content_hash, time.time()],
+        )
+        return cur.rowcount > 0
+
+    def add_designed(
+        self,
+        voice_id: str,
+        features: Optional[Dict[str, Any]] = None,
+        description: str = "",
+        preview_path: str = "",
+        voice_type: str = "designed",
+    ) -> bool:
+        """Register a voice created locally (voice design, or a saved clone)."""
+        features = features or {}
+        return self.upsert({
+            "voice_id": voice_id,
+            "source": "local",
+            "voice_type": voice_type,
+            "name": _first(features, "display_name", "name"),
+            "language": _first(features, "language", "lang"),
+            "gender": _first(features, "gender"),
+            "description": description,
+            "features": features,
+            "preview_path": preview_path,
+        })
+
+    # ── queries ───────────────────────────────────────────────────────
+
+    def get(self, voice_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM voices WHERE voice_id = ?", (voice_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def search(
+        self,
+        keyword: str = "",
+        voice_type: str = "",
+        language: str = "",
+        gender: str = "",
+        features: Optional[Dict[str, str]] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Keyword (case-insensitive substring of name, description or features) and field filters."""
+        sql = "SELECT * FROM voices WHERE 1 = 1"
+        params: List[Any] = []
+        if keyword:
+            sql += " AND (lower(name) LIKE ? OR lower(description) LIKE ? OR lower(features) LIKE ?)"
+            params += ["%" + keyword.lower() + "%"] * 3
+        for column, value in (("voice_type", voice_type), ("gender", gender)):
+            if value:
+                sql += f" AND lower({column}) = ?"
+                params.append(value.lower())
+        if language:
+            sql += " AND lower(language) LIKE ?"
+            params.append(language.lower() + "%")
+        sql += " ORDER BY source, voice_type, name, voice_id"
+        rows = [self._to_dict(r) for r in self.conn.execute(sql, params)]
+        if features:
+            wanted = {k: str(v).lower() for k, v in features.items()}
+            rows = [
+                r for r in rows
+                if all(str(r["features"].get(k, "")).lower() == v for k, v in wanted.items())
+            ]
+        return rows[:limit] if limit else rows
+
+    def is_stale(self, voice_type: str, max_age: float = DEFAULT_MAX_AGE_SEC) -> bool:
+        row = self.conn.execute(
+            "SELECT synced_at FROM sync_state WHERE voice_type = ?", (voice_type,)
+        ).fetchone()
+        return row is None or time.time() - row["synced_at"] > max_age
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        out = dict(row)
+        out["features"] = json.loads(out.get("features") or "{}")
+        out.pop("content_hash", None)
+        return out
+
+    # ── sync ──────────────────────────────────────────────────────────
+
+    def sync(
+        self,
+        api_key: str,
+        base_url: str = DEFAULT_BASE_URL,
+        voice_types: Iterable[str] = DEFAULT_TYPES,
+        max_age: float = DEFAULT_MAX_AGE_SEC,
+        force: bool = False,
+        timeout: int = 30,
+    ) -> Dict[str, Dict[str, int]]:
+        """Refresh stale voice types from ``/voices``; returns per-type counts.
+
+        A type that fails to sync keeps its previous rows and reports ``error``.
+        """
+        stats: Dict[str, Dict[str, int]] = {}
+        fetched: Dict[str, List[Dict[str, Any]]] = {}
+        for voice_type in voice_types:
+            if not force and not self.is_stale(voice_type, max_age):
+                stats[voice_type] = {"skipped": 1}
+                continue
+            try:
+                fetched[voice_type] = self._fetch_type(api_key, base_url, voice_type, timeout)
+            except Exception as exc:
+                print(f"[voice-registry] sync of '{voice_type}' failed: {exc}", file=sys.stderr)
+                stats[voice_type] = {"error": 1}
+        # Pages are fetched first so the write lock is held only for the
+        # writes, which land in one transaction.
+        with self.conn:
+            for voice_type, voices in fetched.items():
+                stats[voice_type] = self._apply_type(voice_type, voices)
+        return stats
+
+    def _fetch_type(
+        self, api_key: str, base_url: str, voice_type: str, timeout: int
+    ) -> List[Dict[str, Any]]:
+        voices: List[Dict[str, Any]] = []
+        skip = 0
+        while True:
+            query = urllib.parse.urlencode(
+                {"voice_type": voice_type, "skip": skip, "limit": PAGE_SIZE}
+            )
+            req = urllib.request.Request(
+                f"{base_url.rstrip('/')}/voices?{query}", headers={"Authorization": api_key}
+            )
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                payload = json.loads(resp.read().decode("utf-8"))
+            page = (payload.get("data") or {}).get("voices") or []
+            voices += [_row_from_api(row, voice_type) for row in page if row.get("voice_id")]
+            if len(page) < PAGE_SIZE:
+                return voices
+            skip += PAGE_SIZE
+
+    def _apply_type(self, voice_type: str, voices: List[Dict[str, Any]]) -> Dict[str, int]:
+        seen = set()
+        changed = 0
+        for voice in voices:
+            seen.add(voice["voice_id"])
+            changed += self._upsert(voice)
+        stored = [
+            r["voice_id"] for r in self.conn.execute(
+                "SELECT voice_id FROM voices WHERE source = 'api' AND voice_type = ?", (voice_type,)
+            )
+        ]
+        removed = [vid for vid in stored if vid not in seen]
+        self.conn.executemany("DELETE FROM voices WHERE voice_id = ?", [(v,) for v in removed])
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (voice_type, synced_at, count) VALUES (?, ?, ?)",
+            (voice_type, time.time(), len(seen)),
+        )
+        return {"total": len(seen), "changed": changed, "removed": len(removed)}
+
+
+def auto_select(
+    registry: VoiceRegistry,
+    keyword: str,
+    api_key: Optional[str],
+    voice_type: str = "built-in",
+    base_url: str = DEFAULT_BASE_URL,
+    max_age: float = DEFAULT_MAX_AGE_SEC,
+) -> Optional[str]:
+    """Return the first voice matching ``keyword``, syncing only when the index is stale."""
+    if api_key and registry.is_stale(voice_type, max_age):
+        registry.sync(api_key, base_url, [voice_type], max_age=max_age)
+    matches = registry.search(keyword, voice_type=voice_type, limit=1)
+    return matches[0]["voice_id"] if matches else None
+
+
+def _load_api_key(explicit: Optional[str]) -> Optional[str]:
+    if explicit:
+        return explicit
+    if os.environ.get("NOIZ_API_KEY"):
+        # Callers such as speak.sh export an already-normalized key.
+        return os.environ["NOIZ_API_KEY"]
+    sys.path.insert(0, str(Path(__file__).parent))
+    from tts import load_api_key
+
+    return load_api_key()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local index of Noiz voices.")
+    parser.add_argument("--db", help=f"Registry database (default: {default_db_path()})")
+    parser.add_argument("--api-key", help="Noiz API key (auto-loaded if not provided)")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_SEC,
+                        help="Seconds before a synced voice type is refreshed (default 1 day)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sp = sub.add_parser("sync", help="Refresh the index from /voices")
+    sp.add_argument("--types", default=",".join(DEFAULT_TYPES),
+                    help="Comma-separated voice types (default: built-in,custom)")
+    sp.add_argument("--force", action="store_true", help="Sync even if the index is fresh")
+
+    qp = sub.add_parser("search", help="Query the local index")
+    qp.add_argument("keyword", nargs="?", default="")
+    qp.add_argument("--type", dest="voice_type", default="")
+    qp.add_argument("--lang", default="")
+    qp.add_argument("--gender", default="")
+    qp.add_argument("--feature", action="append", default=[], metavar="KEY=VALUE")
+    qp.add_argument("--limit", type=int, default=20)
+    qp.add_argument("--json", action="store_true", help="Print full records as JSON")
+
+    ap = sub.add_parser("auto-select", help="Print the first voice_id matching a keyword")
+    ap.add_argument("keyword")
+    ap.add_argument("--type", dest="voice_type", default="built-in")
+
+    dp = sub.add_parser("add", help="Register a designed or cloned voice")
+    dp.add_argument("--voice-id", required=True)
+    dp.add_argument("--type", dest="voice_type", default="designed",
+                    help="Voice type label, e.g. designed or cloned (default: designed)")
+    dp.add_argument("--description", default="")
+    dp.add_argument("--preview", default="", help="Path to a preview audio file")
+    dp.add_argument("--feature", action="append", default=[], metavar="KEY=VALUE")
+
+    args = parser.parse_args()
+
+    def parse_features(items: List[str]) -> Dict[str, str]:
+        out = {}
+        for item in items:
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"--feature expects KEY=VALUE, got '{item}'")
+            out[key.strip()] = value.strip()
+        return out
+
+    try:
+        with VoiceRegistry(Path(args.db) if args.db else None) as registry:
+            if args.command == "sync":
+                api_key = _load_api_key(args.api_key)
+                if not api_key:
+                    print("Error: NOIZ_API_KEY not configured.", file=sys.stderr)
+                    return 1
+                types = [t.strip() for t in args.types.split(",") if t.strip()]
+                stats = registry.sync(api_key, args.base_url, types, args.max_age, args.force)
+                for voice_type, counts in stats.items():
+                    detail = ", ".join(f"{k} {v}" for k, v in counts.items())
+                    print(f"{voice_type}: {detail}")
+                return 1 if any("error" in c for c in stats.values()) else 0
+
+            if args.command == "search":
+                rows = registry.search(
+                    args.keyword, args.voice_type, args.lang, args.gender,
+                    parse_features(args.feature), args.limit,
+                )
+                if args.json:
+                    print(json.dumps(rows, ensure_ascii=False, indent=2))
+                else:
+                    for r in rows:
+                        print(f"{r['voice_id']}\t{r['voice_type']}\t{r['language']}\t"
+                              f"{r['gender']}\t{r['name']}")
+                return 0 if rows else 1
+
+            if args.command == "auto-select":
+                voice_id = auto_select(
+                    registry, args.keyword, _load_api_key(args.api_key),
+                    args.voice_type, args.base_url, args.max_age,
+                )
+                if not voice_id:
+                    return 1
+                print(voice_id)
+                return 0
+
+            registry.add_designed(
+                args.voice_id, parse_features(args.feature), args.description, args.preview,
+                args.voice_type,
+            )
+            print(f"Registered {args.voice_id} in {registry.path}")
+            return 0
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
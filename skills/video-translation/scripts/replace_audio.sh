@@ -4,12 +4,15 @@ set -euo pipefail
 usage() {
   cat <<'EOF'
 Usage: replace_audio.sh --video <video_file> --audio <audio_file> --output <output_file> [--srt <srt_file>]
+       replace_audio.sh --video <video_file> --srt <srt_file> --voice-map <voice_map.json> --output <output_file> [-- <render options>]
 
 Options:
-  --video    Original video file path
-  --audio    New audio file path (WAV/MP3)
-  --output   Final output video file path
-  --srt      Original or translated SRT file (optional). If provided, keeps original audio where there are no subtitles.
+  --video      Original video file path
+  --audio      New audio file path (WAV/MP3), or - to read a WAV stream from stdin
+  --output     Final output video file path
+  --srt        Original or translated SRT file (optional). If provided, keeps original audio where there are no subtitles.
+  --voice-map  Render the dubbed audio from --srt with tts.py and pipe it straight into the mux
+               (no intermediate audio file). Arguments after -- are passed to tts.py render.
 EOF
   exit "${1:-0}"
 }
@@ -18,6 +21,8 @@ VIDEO=""
 AUDIO=""
 OUTPUT=""
 SRT=""
+VOICE_MAP=""
+RENDER_ARGS=()
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
@@ -25,13 +30,27 @@ while [[ $# -gt 0 ]]; do
     --audio)  AUDIO="$2"; shift 2 ;;
     --output) OUTPUT="$2"; shift 2 ;;
     --srt)    SRT="$2"; shift 2 ;;
+    --voice-map) VOICE_MAP="$2"; shift 2 ;;
+    --) shift; RENDER_ARGS=("$@"); break ;;
     -h|--help) usage 0 ;;
     *) echo "Unknown option: $1"; usage 1 ;;
   esac
 done
 
+if [[ -n "$VOICE_MAP" ]]; then
+  if [[ -n "$AUDIO" || -z "$SRT" ]]; then
+    echo "Error: --voice-map renders from --srt (required) and replaces --audio." >&2
+    usage 1
+  fi
+  if [[ ! -f "$VOICE_MAP" ]]; then
+    echo "Error: Voice map not found: $VOICE_MAP" >&2
+    exit 1
+  fi
+  AUDIO="-"
+fi
+
 if [[ -z "$VIDEO" || -z "$AUDIO" || -z "$OUTPUT" ]]; then
-  echo "Error: --video, --audio, and --output are all required." >&2
+  echo "Error: --video, --audio (or --voice-map), and --output are all required." >&2
   usage 1
 fi
 
@@ -40,38 +59,54 @@ if [[ ! -f "$VIDEO" ]]; then
   exit 1
 fi
 
-if [[ ! -f "$AUDIO" ]]; then
+if [[ "$AUDIO" != "-" && ! -f "$AUDIO" ]]; then
   echo "Error: Audio file not found: $AUDIO" >&2
   exit 1
 fi
 
 # Use ffmpeg to replace or mix the audio track
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+TTS_PY="$SCRIPT_DIR/../../tts/scripts/tts.py"
+
+AUDIO_IN="$AUDIO"
+[[ "$AUDIO" == "-" ]] && AUDIO_IN="pipe:0"
+
+# Decode, duck, mix and mux in one ffmpeg pass; the video stream is copied.
+mux() {
+  if [[ -n "$SRT" && -f "$SRT" ]]; then
+    # [0:a] is original audio, [1:a] is dubbed audio
+    # We duck the original audio where subtitles exist, then mix it with the dubbed audio.
+    ffmpeg -y -i "$VIDEO" -i "$AUDIO_IN" \
+      -filter_complex "[0:a]asendcmd=f='${CMD_FILE}',volume=1.0:eval=frame[orig_ducked];[orig_ducked][1:a]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]" \
+      -map 0:v:0 -map "[aout]" \
+      -c:v copy -c:a aac -b:a 192k \
+      -shortest \
+      "$OUTPUT"
+  else
+    ffmpeg -y -i "$VIDEO" -i "$AUDIO_IN" \
+      -map 0:v:0 -map 1:a:0 \
+      -c:v copy -c:a aac -b:a 192k \
+      -shortest \
+      "$OUTPUT"
+  fi
+}
 
 if [[ -n "$SRT" && -f "$SRT" ]]; then
   echo "Mixing original audio with dubbed audio using SRT timestamps -> $OUTPUT"
   CMD_FILE="$(mktemp /tmp/duck_cmd.XXXXXX.txt)"
-  
+  trap 'rm -f "$CMD_FILE"' EXIT
+
   # Generate asendcmd volume ducking file
   python3 "$SCRIPT_DIR/srt_to_duck.py" "$SRT" "$CMD_FILE"
-  
-  # [0:a] is original audio, [1:a] is dubbed audio
-  # We duck the original audio where subtitles exist, then mix it with the dubbed audio.
-  ffmpeg -y -i "$VIDEO" -i "$AUDIO" \
-    -filter_complex "[0:a]asendcmd=f='${CMD_FILE}',volume=1.0[orig_ducked];[orig_ducked][1:a]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]" \
-    -map 0:v:0 -map "[aout]" \
-    -c:v copy -c:a aac -b:a 192k \
-    -shortest \
-    "$OUTPUT"
-    
-  rm -f "$CMD_FILE"
 else
   echo "Replacing audio in $VIDEO with $AUDIO -> $OUTPUT"
-  ffmpeg -y -i "$VIDEO" -i "$AUDIO" \
-    -map 0:v:0 -map 1:a:0 \
-    -c:v copy -c:a aac -b:a 192k \
-    -shortest \
-    "$OUTPUT"
+fi
+
+if [[ -n "$VOICE_MAP" ]]; then
+  # The rendered timeline goes to ffmpeg as a WAV stream; render status is on stderr.
+  python3 "$TTS_PY" render --srt "$SRT" --voice-map "$VOICE_MAP" -o - ${RENDER_ARGS[@]+"${RENDER_ARGS[@]}"} | mux
+else
+  mux
 fi
 
 echo "Done! Output saved to $OUTPUT"
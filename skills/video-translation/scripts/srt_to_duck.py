@@ -1,43 +1,181 @@
 #!/usr/bin/env python3
+"""Generate ffmpeg ducking commands for the original audio from SRT timings.
+
+Cue intervals are sorted and merged in one pass; gaps shorter than
+--bridge are bridged so the original track is not briefly restored
+between close cues. Each duck fades in and out with a short ramp instead
+of a hard 0/1 step, which clicks.
+
+Output modes:
+  cmd   (default) an asendcmd script of "T [enter] volume volume V;" lines,
+        two per merged duck. Each ramp is a time expression, so the volume
+        filter it drives needs eval=frame ("asendcmd=f=FILE,volume=1:eval=frame").
+        With --steps N each ramp is instead N constant-volume commands, which
+        works with any volume filter.
+  expr  a single volume filter, "volume=volume='...':eval=frame:enable='...'",
+        with linear ramps; use it as a filter in -filter_complex(_script).
+"""
+import argparse
 import sys
-import re
-
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: srt_to_duck.py <srt_file> <output_cmd_file>", file=sys.stderr)
-        sys.exit(1)
-        
-    srt_file = sys.argv[1]
-    cmd_file = sys.argv[2]
-    
+from pathlib import Path
+from typing import List, Tuple
+
+TTS_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "tts" / "scripts"
+if str(TTS_SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TTS_SCRIPTS_DIR))
+
+from srt_cues import CueTable, iter_srt, load_srt  # noqa: E402
+
+Interval = Tuple[float, float]
+
+
+def table_intervals(table: CueTable) -> List[Interval]:
+    """(start, end) in seconds of every cue with a positive duration."""
+    return [
+        (start / 1000.0, end / 1000.0)
+        for start, end in zip(table.start_ms, table.end_ms)
+        if end > start
+    ]
+
+
+def parse_intervals(content: str) -> List[Interval]:
+    return table_intervals(CueTable(iter_srt(content.splitlines())))
+
+
+def merge_intervals(intervals: List[Interval], bridge: float = 0.0) -> List[Interval]:
+    """Merge overlapping intervals and those separated by at most ``bridge`` seconds.
+
+    SRT cues are almost always in order already, so the sort is linear in
+    practice and the merge is a single pass.
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start - merged[-1][1] <= bridge:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.3f}"
+
+
+def asendcmd_script(
+    intervals: List[Interval], level: float = 0.0, fade: float = 0.05, steps: int = 0
+) -> List[str]:
+    """asendcmd lines: ramp down to ``level`` ending at each start, back up from each end.
+
+    ``steps`` = 0 emits one expression command per ramp (needs eval=frame);
+    ``steps`` > 0 emits that many constant-volume commands per ramp.
+    """
+    commands = ["0.0 [enter] volume volume 1.0;"]
+    if fade <= 0:
+        for start, end in intervals:
+            commands.append(f"{_fmt(start)} [enter] volume volume {level:.3f};")
+            commands.append(f"{_fmt(end)} [enter] volume volume 1.000;")
+        return commands
+    if steps <= 0:
+        depth = f"{1.0 - level:g}*" if level else ""
+        base = f"{level:g}+" if level else ""
+        for start, end in intervals:
+            commands.append(
+                f"{_fmt(max(start - fade, 0.0))} [enter] volume volume "
+                f"'{base}{depth}clip(({_fmt(start)}-t)/{fade:g},0,1)';"
+            )
+            commands.append(
+                f"{_fmt(end)} [enter] volume volume "
+                f"'{base}{depth}clip((t-{_fmt(end)})/{fade:g},0,1)';"
+            )
+        # Settle on an exact constant once the last ramp is over.
+        if intervals:
+            commands.append(f"{_fmt(intervals[-1][1] + fade)} [enter] volume volume 1.0;")
+        return commands
+    for start, end in intervals:
+        for i in range(steps):
+            t = max(start - fade + fade * (i + 1) / steps, 0.0)
+            v = 1.0 - (1.0 - level) * (i + 1) / steps
+            commands.append(f"{_fmt(t)} [enter] volume volume {v:.3f};")
+        for i in range(steps):
+            t = end + fade * i / steps
+            v = level + (1.0 - level) * (i + 1) / steps
+            commands.append(f"{_fmt(t)} [enter] volume volume {v:.3f};")
+    return commands
+
+
+def volume_filter_expr(intervals: List[Interval], level: float = 0.0, fade: float = 0.05) -> str:
+    """One volume filter with a trapezoid per interval, enabled only around the ducks.
+
+    Merged intervals are at least 2 * fade apart, so at most one trapezoid
+    is non-zero at any time.
+    """
+    if not intervals:
+        return "volume=volume=1"
+    terms = []
+    windows = []
+    for start, end in intervals:
+        lo = max(start - fade, 0.0)
+        hi = end + fade
+        if fade > 0:
+            terms.append(
+                f"clip((t-{_fmt(lo)})/{fade:g},0,1)*clip(({_fmt(hi)}-t)/{fade:g},0,1)"
+            )
+        else:
+            terms.append(f"between(t,{_fmt(start)},{_fmt(end)})")
+        windows.append(f"between(t,{_fmt(lo)},{_fmt(hi)})")
+    duck = "+".join(terms)
+    expr = f"1-{1.0 - level:g}*({duck})" if level else f"1-({duck})"
+    enable = "+".join(windows)
+    return f"volume=volume='{expr}':eval=frame:enable='{enable}'"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Generate ffmpeg ducking commands from SRT timings."
+    )
+    ap.add_argument("srt_file")
+    ap.add_argument("output_file", help="asendcmd script (cmd) or filter text (expr)")
+    ap.add_argument("--mode", choices=["cmd", "expr"], default="cmd")
+    ap.add_argument("--level", type=float, default=0.0,
+                    help="Volume of the original audio under a cue (default 0 = muted)")
+    ap.add_argument("--fade", type=float, default=0.05,
+                    help="Ramp length in seconds at each end of a duck (default 0.05)")
+    ap.add_argument("--steps", type=int, default=0,
+                    help="cmd mode: constant-volume commands per ramp; 0 (default) uses "
+                         "one expression command per ramp, which needs volume eval=frame")
+    ap.add_argument("--bridge", type=float, default=0.3,
+                    help="Merge cues separated by gaps up to this many seconds (default 0.3)")
+    args = ap.parse_args()
+
     try:
-        with open(srt_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        table = load_srt(args.srt_file)
     except Exception as e:
         print(f"Error reading SRT: {e}", file=sys.stderr)
-        sys.exit(1)
-        
-    pattern = r"(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})"
-    matches = re.findall(pattern, content)
-    
-    commands = []
-    # Start with volume 1.0
-    commands.append("0.0 [enter] volume volume 1.0;")
-    
-    for m in matches:
-        h1, m1, s1, ms1 = int(m[0]), int(m[1]), int(m[2]), int(m[3])
-        h2, m2, s2, ms2 = int(m[4]), int(m[5]), int(m[6]), int(m[7])
-        
-        start = h1*3600 + m1*60 + s1 + ms1/1000.0
-        end = h2*3600 + m2*60 + s2 + ms2/1000.0
-        
-        # small padding to avoid overlapping commands if timings are tight, 
-        # but exact float should be fine.
-        commands.append(f"{start:.3f} [enter] volume volume 0.0;")
-        commands.append(f"{end:.3f} [enter] volume volume 1.0;")
-        
-    with open(cmd_file, 'w', encoding='utf-8') as f:
-        f.write("\n".join(commands) + "\n")
+        return 1
+
+    if not 0.0 <= args.level <= 1.0:
+        print("Error: --level must be between 0 and 1.", file=sys.stderr)
+        return 1
+    fade = max(args.fade, 0.0)
+    # Ramps of neighbouring ducks must not overlap.
+    bridge = max(args.bridge, 2 * fade)
+    cues = table_intervals(table)
+    intervals = merge_intervals(cues, bridge)
+
+    if args.mode == "cmd":
+        lines = asendcmd_script(intervals, args.level, fade, args.steps)
+        text = "\n".join(lines) + "\n"
+        detail = f"{len(lines)} commands"
+    else:
+        text = volume_filter_expr(intervals, args.level, fade) + "\n"
+        detail = f"{len(text)} chars"
+
+    with open(args.output_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    print(f"{len(cues)} cues -> {len(intervals)} duck intervals ({detail})", file=sys.stderr)
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""Dub a video from a translated SRT as one resumable job.
+
+Runs everything after subtitle translation: reference slicing from the
+original audio, per-cue synthesis, timeline mixing, ducking and muxing.
+
+  - The source track is decoded once. Each reference slice goes to the
+    synthesis pool as soon as the decode has passed its cue, so slicing
+    and synthesis overlap.
+  - The mixed timeline is streamed into a single ffmpeg pass that ducks
+    the original audio, mixes and muxes with the video stream copied; no
+    intermediate dubbed.wav is written.
+  - Progress is kept in <work-dir>/job.json. Finished cues are stored as
+    PCM in one append-only segment store under <work-dir>/segments/ (a
+    data file and its index, not a file per cue), keyed by text, timing
+    and voice config, so a re-run after a crash or an SRT edit only synthesizes
+    what is missing or changed, and a finished job returns immediately.
+
+Several languages can be dubbed from the same video in one run
+(``--srt fr=fr.srt --srt de=de.srt -o "out_{lang}.mp4"``): the source is
+decoded and sliced once and every slice is shared by all languages, their
+cues share one synthesis pool (--workers is the global budget), and each
+language gets its own output and job directory.
+
+A per-stage timing breakdown is printed and saved in job.json.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TTS_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "tts" / "scripts"
+if str(TTS_SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TTS_SCRIPTS_DIR))
+
+from render_timeline import (  # noqa: E402
+    DEFAULT_SAMPLE_RATE,
+    DEFAULT_WORKERS,
+    Cue,
+    PcmSource,
+    Renderer,
+    ensure_ffmpeg,
+    iter_mix_blocks,
+    iter_reference_slices,
+    needs_reference_slice,
+    parse_srt,
+    resolve_segment_cfg,
+)
+from segment_store import SegmentStore  # noqa: E402
+from srt_to_duck import asendcmd_script, merge_intervals  # noqa: E402
+
+JOB_VERSION = 1
+
+_log_lock = threading.Lock()
+
+
+def _log(message: str, stream: Any = None) -> None:
+    """print() from worker threads without interleaving lines."""
+    with _log_lock:
+        print(message, file=stream or sys.stdout, flush=True)
+
+
+class JobState:
+    """job.json: per-cue and per-stage progress, saved atomically after every change."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {"version": JOB_VERSION, "cues": {}, "stages": {}}
+        if path.exists():
+            try:
+                loaded = json.loads(path.read_text(encoding="utf-8"))
+                if loaded.get("version") == JOB_VERSION:
+                    self.data = loaded
+            except ValueError:
+                pass
+
+    def cue_done(self, index: int, key: str) -> bool:
+        entry = self.data["cues"].get(str(index))
+        return bool(entry and entry.get("status") == "done" and entry.get("key") == key)
+
+    def done_keys(self) -> List[str]:
+        return [e["key"] for e in self.data["cues"].values() if e.get("status") == "done"]
+
+    def update_cue(self, index: int, **fields: Any) -> None:
+        with self._lock:
+            self.data["cues"].setdefault(str(index), {}).update(fields)
+            self._save()
+
+    def set_stage(self, name: str, **fields: Any) -> None:
+        with self._lock:
+            self.data["stages"][name] = fields
+            self._save()
+
+    def set(self, **fields: Any) -> None:
+        with self._lock:
+            self.data.update(fields)
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(str(tmp), str(self.path))
+
+
+def _sha256(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def source_stamp(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cue_key(
+    cue: Cue, cfg: Dict[str, Any], backend: str, sample_rate: int,
+    auto_emotion: bool, source: Dict[str, Any],
+) -> str:
+    """Everything that changes a cue's audio; the source only matters when it is cloned."""
+    return _sha256([
+        cue.text, cue.start_ms, cue.end_ms, cfg, backend, sample_rate, auto_emotion,
+        source if needs_reference_slice(cfg) else None,
+    ])
+
+
+@dataclass
+class Job:
+    """One target language: its cues, voice map, output and resumable state."""
+
+    lang: Optional[str]
+    cues: List[Cue]
+    voice_map: Dict[str, Any]
+    output: Path
+    work_dir: Path
+    state: JobState
+    timings: Dict[str, Any] = field(default_factory=dict)
+    failed: List[int] = field(default_factory=list)
+    store: SegmentStore = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.store = SegmentStore(self.work_dir / "segments")
+
+    @property
+    def label(self) -> str:
+        return self.lang or self.output.name
+
+
+def synthesize_jobs(
+    renderer: Renderer,
+    jobs: List[Job],
+    video: Path,
+    auto_emotion: bool = False,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Slice and synthesize every cue not already done, across all jobs.
+
+    The source is decoded once for all jobs, and each reference slice is
+    shared by every job with a cue on that span. All cues go through the
+    renderer's pool, so its worker count is the global concurrency budget.
+    Per-job timings and failed cue indices are stored on each job;
+    failures are recorded in the job state and do not stop other cues.
+    Returns the shared slicing timings.
+    """
+    source = source_stamp(video)
+    todo: List[Tuple[Job, Cue, Dict[str, Any], str]] = []
+    for job in jobs:
+        keep = {str(c.index) for c in job.cues}
+        for index in list(job.state.data["cues"]):
+            if index not in keep:
+                job.state.data["cues"].pop(index)
+        pending = 0
+        for cue in job.cues:
+            cfg = resolve_segment_cfg(cue.index, job.voice_map)
+            key = cue_key(cue, cfg, renderer.backend, renderer.sample_rate, auto_emotion, source)
+            if force or not (job.state.cue_done(cue.index, key) and key in job.store):
+                todo.append((job, cue, cfg, key))
+                pending += 1
+        job.failed = []
+        job.timings = {"cues": len(job.cues), "reused": len(job.cues) - pending, "busy_s": 0.0}
+    busy_lock = threading.Lock()
+
+    def work(job: Job, cue: Cue, cfg: Dict[str, Any], key: str,
+             ref_audio: Optional[bytes]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        _, pcm, seg = renderer.render_cue(
+            cue, cfg, ref_audio, auto_emotion,
+            ref_label=f"{video}@{cue.start_ms}ms" if ref_audio is not None else None,
+        )
+        job.store.put(key, pcm)
+        with busy_lock:
+            job.timings["busy_s"] += time.perf_counter() - t0
+        return seg.to_report()
+
+    def record(job: Job, cue: Cue, key: str, fut: "Future[Dict[str, Any]]") -> None:
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc is not None:
+            job.failed.append(cue.index)
+            job.state.update_cue(cue.index, status="failed", key=key, error=str(exc))
+            _log(f"  [{job.label}] cue {cue.index} failed: {exc}", sys.stderr)
+        else:
+            job.state.update_cue(cue.index, status="done", key=key, segment=fut.result())
+
+    # Slices are decoded faster than network TTS consumes them; cap how many
+    # wait in the pool so queued slices stay a few cues long, not the track.
+    slice_gate = threading.BoundedSemaphore(2 * max(1, renderer.workers))
+
+    def submit(job: Job, cue: Cue, cfg: Dict[str, Any], key: str,
+               ref_audio: Optional[bytes]) -> Future:
+        if ref_audio is None:
+            fut = renderer.pool.submit(work, job, cue, cfg, key, None)
+            fut.add_done_callback(lambda f, j=job, c=cue, k=key: record(j, c, k, f))
+            return fut
+        slice_gate.acquire()
+        try:
+            fut = renderer.pool.submit(work, job, cue, cfg, key, ref_audio)
+        except BaseException:
+            slice_gate.release()
+            raise
+
+        def done(f: Future, j: Job = job, c: Cue = cue, k: str = key) -> None:
+            slice_gate.release()
+            record(j, c, k, f)
+
+        fut.add_done_callback(done)
+        return fut
+
+    # Cues cloning the source are grouped by span; translated SRTs usually
+    # keep the original timestamps, so languages share most slices.
+    by_span: Dict[Tuple[int, int], List[Tuple[Job, Cue, Dict[str, Any], str]]] = {}
+    t_start = time.perf_counter()
+    futures: List[Future] = []
+    try:
+        for item in todo:
+            _, cue, cfg, _ = item
+            if needs_reference_slice(cfg):
+                by_span.setdefault((cue.start_ms, cue.end_ms), []).append(item)
+            else:
+                futures.append(submit(*item, None))
+        spans = [Cue(n, start, end, "") for n, (start, end) in enumerate(by_span)]
+        for span, ref_audio in iter_reference_slices(video, spans):
+            for item in by_span[(span.start_ms, span.end_ms)]:
+                futures.append(submit(*item, ref_audio))
+        slice_wall = time.perf_counter() - t_start
+        wait(futures)
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    wall = time.perf_counter() - t_start
+    for job in jobs:
+        # Re-synthesized and removed cues leave dead copies in the store;
+        # rewrite it once they outweigh the live audio.
+        live = job.state.done_keys()
+        if job.store.garbage_bytes(live) > job.store.data_bytes // 2:
+            job.store.compact(live)
+        job.failed.sort()
+        job.timings.update(
+            synthesized=job.timings["cues"] - job.timings["reused"] - len(job.failed),
+            failed=len(job.failed),
+            busy_s=round(job.timings["busy_s"], 3),
+        )
+    return {
+        "slices": len(spans),
+        "slice_wall_s": round(slice_wall, 3),
+        "wall_s": round(wall, 3),
+    }
+
+
+def write_duck_script(cues: List[Cue], path: Path, level: float, fade: float, bridge: float) -> int:
+    """asendcmd script ducking the original track under the cues; returns the duck count."""
+    intervals = merge_intervals(
+        [(c.start_ms / 1000.0, c.end_ms / 1000.0) for c in cues], max(bridge, 2 * fade)
+    )
+    path.write_text("\n".join(asendcmd_script(intervals, level, fade)) + "\n", encoding="utf-8")
+    return len(intervals)
+
+
+def mix_and_mux(
+    placed: Sequence[Tuple[int, PcmSource]],
+    total: int,
+    work_dir: Path,
+    video: Path,
+    output: Path,
+    sample_rate: int,
+    duck: bool = True,
+) -> Dict[str, Any]:
+    """Mix the stored segments and stream them through one ffmpeg duck/mix/mux pass.
+
+    ``placed`` holds (start sample, PCM) pairs and ``total`` is the track
+    length in samples. The mix is produced block by block from store views
+    as ffmpeg consumes it, so memory stays flat however long the video is.
+    """
+    t0 = time.perf_counter()
+
+    partial = output.with_name(output.stem + ".partial" + output.suffix)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(video.resolve()),
+           "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0"]
+    if duck:
+        # The command file is addressed relative to work_dir so its path
+        # needs no escaping inside the filter graph.
+        cmd += ["-filter_complex",
+                "[0:a]asendcmd=f=duck.txt,volume=1.0:eval=frame[orig];"
+                "[orig][1:a]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]",
+                "-map", "0:v:0", "-map", "[aout]"]
+    else:
+        cmd += ["-map", "0:v:0", "-map", "1:a:0"]
+    cmd += ["-c:v", "copy", "-c:a", "aac", "-b:a", "192k", "-shortest", str(partial.resolve())]
+
+    with tempfile.TemporaryFile() as err:
+        # stderr goes to a file so a chatty ffmpeg can never block on it
+        # while the mix is still being written.
+        proc = subprocess.Popen(cmd, cwd=str(work_dir), stdin=subprocess.PIPE, stderr=err)
+        done = False
+        try:
+            try:
+                for block in iter_mix_blocks(placed, total):
+                    proc.stdin.write(block)
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its status and stderr say why
+            if proc.wait() != 0:
+                err.seek(0)
+                raise RuntimeError(
+                    "ffmpeg mux failed:\n" + err.read().decode("utf-8", errors="replace")
+                )
+            done = True
+        finally:
+            if not done:
+                proc.kill()
+                proc.wait()
+                partial.unlink(missing_ok=True)
+            with contextlib.suppress(OSError):
+                proc.stdin.close()
+    os.replace(str(partial), str(output))
+    return {"wall_s": round(time.perf_counter() - t0, 3)}
+
+
+def finish_job(job: Job, video: Path, args: argparse.Namespace) -> None:
+    """Mix, duck and mux one job unless its output is already up to date."""
+    keys = [job.state.data["cues"][str(c.index)]["key"] for c in job.cues]
+    mux_key = _sha256([
+        keys,
+        source_stamp(video), str(job.output.resolve()), args.sample_rate,
+        None if args.no_duck else [args.duck_level, args.fade, args.bridge],
+    ])
+    previous = job.state.data["stages"].get("mux", {})
+    if (not args.force and previous.get("status") == "done"
+            and previous.get("key") == mux_key and job.output.exists()):
+        _log(f"[{job.label}] output is up to date: {job.output}")
+        return
+    ducks = 0
+    if not args.no_duck:
+        ducks = write_duck_script(
+            job.cues, job.work_dir / "duck.txt", args.duck_level, max(args.fade, 0.0), args.bridge
+        )
+    _log(f"[{job.label}] mixing and muxing{f' with {ducks} ducks' if ducks else ''} -> {job.output}")
+    placed = []
+    for cue, key in zip(job.cues, keys):
+        pcm = job.store.get(key)
+        if pcm is None:
+            raise RuntimeError(f"segment for cue {cue.index} is missing from {job.store.root}")
+        placed.append((cue.start_ms * args.sample_rate // 1000, pcm))
+    total = max(c.end_ms for c in job.cues) * args.sample_rate // 1000
+    job.timings["mux"] = mix_and_mux(
+        placed, total, job.work_dir, video, job.output, args.sample_rate, duck=not args.no_duck
+    )
+    job.state.set_stage("mux", status="done", key=mux_key, **job.timings["mux"])
+
+
+def print_timings(shared: Dict[str, Any], jobs: List[Job], total_s: float) -> None:
+    print("Timing:")
+    if shared["slices"]:
+        print(f"  slice   {shared['slice_wall_s']:8.2f}s  ({shared['slices']} reference slices, "
+              f"source decoded once, overlapped with synthesis)")
+    print(f"  synth   {shared['wall_s']:8.2f}s  wall")
+    for job in jobs:
+        t = job.timings
+        line = (f"    {job.label:<10} {t['busy_s']:8.2f}s busy over {t['synthesized']} cues "
+                f"({t['reused']} reused)")
+        if "mux" in t:
+            line += f", mix+mux {t['mux']['wall_s']:.2f}s"
+        print(line)
+    print(f"  total   {total_s:8.2f}s")
+
+
+def _default_backend() -> str:
+    from tts import load_api_key
+
+    return "noiz" if load_api_key() else "kokoro"
+
+
+def parse_srt_args(values: List[str]) -> List[Tuple[Optional[str], str]]:
+    """``--srt PATH`` or repeated ``--srt LANG=PATH`` -> [(lang, path)]."""
+    pairs: List[Tuple[Optional[str], str]] = []
+    for value in values:
+        lang, sep, path = value.partition("=")
+        if sep and lang and "/" not in lang and not Path(value).exists():
+            pairs.append((lang.strip(), path))
+        else:
+            pairs.append((None, value))
+    if len(pairs) > 1 and any(lang is None for lang, _ in pairs):
+        raise ValueError("with several --srt files, each must be given as LANG=PATH")
+    langs = [lang for lang, _ in pairs]
+    if len(set(langs)) != len(langs):
+        raise ValueError("each language may only be given once")
+    return pairs
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Dub a video from translated SRTs in one resumable job."
+    )
+    ap.add_argument("--video", required=True, help="Original video (also the voice reference)")
+    ap.add_argument("--srt", required=True, action="append",
+                    help="Translated SRT; repeat as LANG=PATH to dub several languages at once")
+    ap.add_argument("--voice-map", required=True, help="Voice-map JSON (see tts render)")
+    ap.add_argument("-o", "--output", required=True,
+                    help="Dubbed video; with several languages a template containing {lang}")
+    ap.add_argument("--backend", choices=["kokoro", "noiz"],
+                    help="TTS backend (default: noiz when an API key is configured)")
+    ap.add_argument("--auto-emotion", action="store_true",
+                    help="Noiz backend only: call /emotion-enhance before TTS")
+    ap.add_argument("--work-dir",
+                    help="Job state and segments (default: <output>_job/, one per language)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help=f"Cues synthesized concurrently across all languages "
+                         f"(default: {DEFAULT_WORKERS})")
+    ap.add_argument("--mux-jobs", type=int, default=2,
+                    help="Languages mixed and muxed concurrently (default 2)")
+    ap.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    ap.add_argument("--timeout-sec", type=int, default=120)
+    ap.add_argument("--no-duck", action="store_true",
+                    help="Replace the original audio instead of ducking it under the cues")
+    ap.add_argument("--duck-level", type=float, default=0.0,
+                    help="Volume of the original audio under a cue (default 0 = muted)")
+    ap.add_argument("--fade", type=float, default=0.05, help="Duck ramp in seconds (default 0.05)")
+    ap.add_argument("--bridge", type=float, default=0.3,
+                    help="Merge ducks separated by gaps up to this many seconds (default 0.3)")
+    ap.add_argument("--force", action="store_true", help="Ignore finished work and redo every stage")
+    args = ap.parse_args()
+
+    video = Path(args.video)
+    if not video.exists():
+        print(f"Error: video not found: {video}", file=sys.stderr)
+        return 1
+    try:
+        srts = parse_srt_args(args.srt)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if len(srts) > 1 and "{lang}" not in args.output:
+        print("Error: with several languages, -o must contain {lang}.", file=sys.stderr)
+        return 1
+
+    try:
+        ensure_ffmpeg()
+        voice_map = json.loads(Path(args.voice_map).read_text(encoding="utf-8"))
+        jobs: List[Job] = []
+        for lang, srt in srts:
+            cues = parse_srt(Path(srt))
+            if not cues:
+                raise ValueError(f"no cues in {srt}")
+            job_map = voice_map
+            if lang:
+                # The label is the default target language; per-segment
+                # entries in the voice map still override it.
+                job_map = json.loads(json.dumps(voice_map))
+                job_map.setdefault("default", {})["target_lang"] = lang
+            output = Path(args.output.replace("{lang}", lang or ""))
+            if args.work_dir:
+                work_dir = Path(args.work_dir) / lang if len(srts) > 1 else Path(args.work_dir)
+            else:
+                work_dir = output.with_name(output.stem + "_job")
+            work_dir.mkdir(parents=True, exist_ok=True)
+            state = JobState(work_dir / "job.json")
+            state.set(video=str(video), srt=srt, lang=lang, output=str(output))
+            jobs.append(Job(lang, cues, job_map, output, work_dir, state))
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    backend = args.backend or _default_backend()
+    api_key = None
+    if backend == "noiz":
+        from tts import load_api_key
+
+        api_key = load_api_key()
+        if not api_key:
+            print("Error: NOIZ_API_KEY not configured.", file=sys.stderr)
+            print("  Run: python3 skills/tts/scripts/tts.py config --set-api-key YOUR_KEY",
+                  file=sys.stderr)
+            return 1
+
+    t0 = time.perf_counter()
+    try:
+        with Renderer(backend, api_key=api_key, timeout=args.timeout_sec,
+                      workers=args.workers, sample_rate=args.sample_rate) as renderer:
+            renderer.check_ready()
+            total = sum(len(job.cues) for job in jobs)
+            print(f"Synthesizing {total} cues in {len(jobs)} "
+                  f"language{'s' if len(jobs) > 1 else ''} ({backend}, {args.workers} workers)...")
+            shared = synthesize_jobs(renderer, jobs, video, args.auto_emotion, args.force)
+        for job in jobs:
+            job.state.set_stage("synth", status="failed" if job.failed else "done", **job.timings)
+            if job.failed:
+                print(f"Error: [{job.label}] {len(job.failed)} cues failed "
+                      f"({', '.join(map(str, job.failed[:10]))}"
+                      f"{', ...' if len(job.failed) > 10 else ''}). Re-run to retry them.",
+                      file=sys.stderr)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    ready = [job for job in jobs if not job.failed]
+    done: List[Job] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(args.mux_jobs, len(ready) or 1))) as pool:
+        futures = {pool.submit(finish_job, job, video, args): job for job in ready}
+        for fut, job in futures.items():
+            try:
+                fut.result()
+                done.append(job)
+            except Exception as exc:
+                print(f"Error: [{job.label}] {exc}", file=sys.stderr)
+
+    total_s = round(time.perf_counter() - t0, 3)
+    for job in jobs:
+        job.state.set(timings={"shared": shared, **job.timings, "total_s": total_s})
+    print_timings(shared, jobs, total_s)
+    for job in done:
+        print(f"Done. [{job.label}] {job.output}  (job state: {job.work_dir / 'job.json'})")
+    return 0 if len(done) == len(jobs) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())